@@ -0,0 +1,129 @@
+'''
+Stitch every polyline group of an Onshape SVG with the native and the
+networkx engine, check both give the same paths as an independent reference
+walk and time them.
+
+The networkx engine only swaps how the adjacency is built, it walks the 
+chains with the same walk_chains as the native one. The reference walks the
+networkx graph node by node instead, so a bug in walk_chains shows up as a
+difference rather than in both engines at once.
+
+Usage: python benchmarks/compare_stitchers.py [input.svg] [repeats]
+'''
+import pathlib
+import sys
+import time
+
+#Run from a source checkout without installing it, as a script or as
+#python -m benchmarks.compare_stitchers
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT/'benchmarks')]
+
+import numpy as np
+
+import onshape2shaper.svg2svg as s2s
+
+EXAMPLE = ROOT/'examples'/'WallBrace.svg'
+
+def canonical(path, decimals=2):
+    '''
+    Rotate and orient a path to a canonical form, dropping repeated points,
+    so two traversals of the same geometry compare equal
+    '''
+    path = np.round(np.asarray(path), decimals)
+    keep = np.ones(len(path), dtype=bool)
+    keep[1:] = np.any(path[1:] != path[:-1], axis=1)
+    path = path[keep]
+    
+    is_closed = len(path) > 2 and np.array_equal(path[0], path[-1])
+    if is_closed:
+        path = path[:-1]
+        start = np.lexsort((path[:, 1], path[:, 0]))[0]
+        path = np.roll(path, -start, axis=0)
+        if tuple(path[-1]) < tuple(path[1]):
+            path = np.roll(path[::-1], 1, axis=0)
+    elif tuple(path[-1]) < tuple(path[0]):
+        path = path[::-1]
+        
+    return (is_closed, tuple(map(tuple, path)))
+
+def reference_stitch(polyline_list):
+    '''
+    Merge connected polylines by walking a networkx.Graph one node at a 
+    time. Chains run between nodes which are not degree 2 and components of
+    only degree 2 nodes are closed loops, as in walk_chains.
+    '''
+    import networkx as nx
+    
+    graph = nx.Graph()
+    for polyline in polyline_list:
+        points = list(map(tuple, polyline))
+        graph.add_edges_from((point1, point2) for point1, point2 
+                             in zip(points[:-1], points[1:])
+                             if point1 != point2)
+    
+    used = set()
+    
+    def follow(start, current):
+        path = [start, current]
+        used.add(frozenset((start, current)))
+        while graph.degree(current) == 2 and current != start:
+            following = [node for node in graph[current] 
+                         if frozenset((current, node)) not in used][0]
+            used.add(frozenset((current, following)))
+            path.append(following)
+            current = following
+        return np.array(path)
+    
+    paths = []
+    for node in graph.nodes:
+        if graph.degree(node) != 2:
+            paths += [follow(node, neighbour) for neighbour in graph[node]
+                      if frozenset((node, neighbour)) not in used]
+    for node in graph.nodes:
+        neighbour = next(iter(graph[node]))
+        if frozenset((node, neighbour)) not in used:
+            paths.append(follow(node, neighbour))
+    return paths
+
+def group_polylines(input_path):
+    svg = s2s.vector_object(input_path)
+    svg.read_document()
+    svg.group_styles()
+    
+    return [record.polylines() for record in svg.document.records]
+
+def main(input_path=EXAMPLE, repeats=20):
+    groups = group_polylines(input_path)
+    
+    methods = {'reference': reference_stitch,
+               'networkx': lambda group: s2s.order_polylines(
+                   group, method='networkx'),
+               'native': lambda group: s2s.order_polylines(
+                   group, method='native')}
+    
+    results = {}
+    for method, stitch in methods.items():
+        start = time.perf_counter()
+        for _ in range(repeats):
+            merged = [stitch(group) for group in groups]
+        elapsed = (time.perf_counter() - start)/repeats
+        results[method] = merged
+        print('{:>9}: {:.3f} ms per file'.format(method, elapsed*1e3))
+    
+    for method in ('networkx', 'native'):
+        for count, (reference, stitched) in enumerate(
+                zip(results['reference'], results[method])):
+            if (sorted(map(canonical, reference)) 
+                    != sorted(map(canonical, stitched))):
+                print('group {}: {} paths differ from the reference'.format(
+                    count, method))
+                return 1
+    
+    print('stitched paths identical in {} group(s)'.format(len(groups)))
+    return 0
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    sys.exit(main(pathlib.Path(args[0]) if args else EXAMPLE,
+                  int(args[1]) if len(args) > 1 else 20))
@@ -0,0 +1,66 @@
+'''
+Micro-benchmark of the points string parsers against the original
+string2numpy.
+
+Usage: python benchmarks/parse_points.py [n_points] [n_strings]
+'''
+import pathlib
+import sys
+import timeit
+
+#Run from a source checkout without installing it, as a script or as
+#python -m benchmarks.parse_points
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT/'benchmarks')]
+
+import numpy as np
+
+import onshape2shaper.svg2svg as s2s
+
+def string2numpy_legacy(s):
+    # The split/map/filter parser string2numpy used before parse_points
+    rows = s.split(' ')
+    arr = np.array([list(map(float, filter(lambda x: x != '', 
+                                           row.split(','))\
+                             )) for row in rows if row != ''])
+    return arr
+
+def make_strings(n_points, n_strings, seed=0):
+    rng = np.random.default_rng(seed)
+    strings = []
+    for _ in range(n_strings):
+        points = rng.uniform(0, 3508, size=(n_points, 2))
+        strings.append(' '.join(['{:g},{:g}'.format(x, y) 
+                                 for x, y in points]) + ' ')
+    return strings
+
+def best_of(function, repeats=5, number=3):
+    return min(timeit.repeat(function, repeat=repeats, number=number))/number
+
+def main(n_points=30, n_strings=2000):
+    strings = make_strings(n_points, n_strings)
+    
+    legacy = [string2numpy_legacy(s) for s in strings]
+    points, offsets = s2s.parse_points_batch(strings)
+    for i, reference in enumerate(legacy):
+        assert np.array_equal(reference, points[offsets[i]:offsets[i + 1]])
+        assert np.array_equal(reference, s2s.parse_points(strings[i]))
+    
+    timings = {
+        'string2numpy (legacy)': 
+            best_of(lambda: [string2numpy_legacy(s) for s in strings]),
+        'parse_points': 
+            best_of(lambda: [s2s.parse_points(s) for s in strings]),
+        'parse_points_batch': 
+            best_of(lambda: s2s.parse_points_batch(strings)),
+        }
+    
+    print('{} strings x {} points'.format(n_strings, n_points))
+    reference = timings['string2numpy (legacy)']
+    for name, elapsed in timings.items():
+        print('{:>22}: {:8.2f} ms  {:5.1f}x'.format(name, elapsed*1e3, 
+                                                   reference/elapsed))
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*args)
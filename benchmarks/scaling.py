@@ -0,0 +1,199 @@
+'''
+Time the conversion stages on synthetic drawings of growing size, report
+how each scales and check the times against a stored baseline.
+
+Usage: python benchmarks/scaling.py [--sizes 1e2 1e3 1e4 1e5 1e6]
+           [--repeats N] [--baseline benchmarks/baseline.json]
+           [--threshold 0.5] [--min-seconds 0.005] [--save-baseline PATH]
+           [--json PATH]
+
+Targets are parse_points_batch over every points string, group_styles,
+order_polylines over every grouped record, stitch_groups and the end to end
+onshape2shaper. A target fails, and the script exits with 1, when it is 
+slower than (1 + threshold) times its baseline at the same size and by more
+than --min-seconds, so timer noise on the smallest sizes does not fail it. 
+The baseline is machine specific, save one with --save-baseline on the 
+machine that checks it. baseline.json goes up to 1e6 segments, which is 
+only checked when --sizes asks for it.
+'''
+import argparse
+import json
+import math
+import pathlib
+import sys
+import tempfile
+import time
+
+#Run from a source checkout without installing it, as a script or as
+#python -m benchmarks.scaling
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT/'benchmarks')]
+
+import synthetic_svg
+
+import onshape2shaper.svg2svg as s2s
+
+TARGETS = ('parse_points_batch', 'group_styles', 'order_polylines', 
+           'stitch_groups', 'onshape2shaper')
+
+SVG_NAMESPACE = '{http://www.w3.org/2000/svg}'
+
+def loaded(input_path, grouped=False):
+    # A vector_object with its document read, ready for group_styles, or 
+    #with grouped for stitch_groups
+    svg = s2s.vector_object(input_path)
+    svg.read_document()
+    svg._get_pixels_per_mm()
+    svg._add_shaper_xmlns()
+    if grouped:
+        svg.group_styles()
+    return svg
+
+def time_targets(input_path, output_path, repeats):
+    '''
+    Best of repeats seconds of each target on one file
+    '''
+    from xml.etree import ElementTree
+    
+    strings = [polyline.get('points') for polyline 
+               in ElementTree.parse(input_path).iter(SVG_NAMESPACE 
+                                                     + 'polyline')]
+    groups = [record.polylines() 
+              for record in loaded(input_path, grouped=True).document.records
+              if not record.is_anchor]
+
+    def timed(function, *args):
+        start = time.perf_counter()
+        function(*args)
+        return time.perf_counter() - start
+
+    def order():
+        for group in groups:
+            s2s.order_polylines(group)
+
+    # group_styles and stitch_groups work in place, so each run gets a 
+    #fresh document
+    targets = {
+        'parse_points_batch': lambda: timed(s2s.parse_points_batch, strings),
+        'group_styles': lambda: timed(loaded(input_path).group_styles),
+        'order_polylines': lambda: timed(order),
+        'stitch_groups': lambda: timed(loaded(input_path, 
+                                              grouped=True).stitch_groups),
+        'onshape2shaper': lambda: timed(
+            s2s.vector_object(input_path).onshape2shaper, output_path)}
+
+    return {target: min(targets[target]() for _ in range(repeats)) 
+            for target in TARGETS}
+
+def scaling_exponents(sizes, seconds):
+    '''
+    Slope of log(time) against log(size) between consecutive sizes, 1 is
+    linear
+    '''
+    exponents = []
+    for (n0, t0), (n1, t1) in zip(zip(sizes, seconds),
+                                  zip(sizes[1:], seconds[1:])):
+        if t0 > 0 and t1 > 0:
+            exponents.append(math.log(t1/t0)/math.log(n1/n0))
+        else:
+            exponents.append(math.nan)
+    return exponents
+
+def compare(results, baseline, threshold, min_seconds=0.005):
+    '''
+    Lines of (target, size, seconds, baseline seconds, ratio, passed) for
+    every size the baseline has
+    '''
+    rows = []
+    for target, by_size in results.items():
+        for size, seconds in by_size.items():
+            reference = baseline.get(target, {}).get(size)
+            if reference is None:
+                continue
+            ratio = seconds/reference
+            passed = (ratio <= 1 + threshold
+                      or seconds - reference <= min_seconds)
+            rows.append((target, size, seconds, reference, ratio, passed))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=float, nargs='+',
+                        default=[1e2, 1e3, 1e4, 1e5],
+                        help='segment counts (default: 1e2 1e3 1e4 1e5)')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--arc-points', type=int, default=31)
+    parser.add_argument('--groups', type=int, default=3)
+    parser.add_argument('--baseline', default=None,
+                        help='baseline JSON to check against')
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='allowed slowdown over the baseline '
+                             '(default: 0.5, i.e. 50%%)')
+    parser.add_argument('--min-seconds', type=float, default=0.005,
+                        help='slowdowns smaller than this always pass '
+                             '(default: 0.005)')
+    parser.add_argument('--save-baseline', default=None,
+                        help='write the results as a baseline JSON')
+    parser.add_argument('--json', default=None,
+                        help='write the results and exponents as JSON')
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes]
+    results = {target: {} for target in TARGETS}
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            input_path = pathlib.Path(directory)/'synthetic_{}.svg'.format(
+                size)
+            synthetic_svg.write(input_path, size, arc_points=args.arc_points,
+                                n_groups=args.groups)
+            seconds = time_targets(input_path,
+                                   pathlib.Path(directory)/'out.svg',
+                                   args.repeats)
+            for target in TARGETS:
+                results[target][str(size)] = seconds[target]
+            print('{:>9} segments  '.format(size) + '  '.join(
+                ['{} {:.4f}s'.format(target, seconds[target])
+                 for target in TARGETS]), flush=True)
+
+    print('\nscaling exponent between sizes (1 is linear)')
+    print('{:<20}'.format('target') + ''.join(
+        ['{:>16}'.format('{}->{}'.format(n0, n1))
+         for n0, n1 in zip(sizes, sizes[1:])]))
+    exponents = {}
+    for target in TARGETS:
+        exponents[target] = scaling_exponents(
+            sizes, [results[target][str(size)] for size in sizes])
+        print('{:<20}'.format(target) + ''.join(
+            ['{:>16.2f}'.format(exponent)
+             for exponent in exponents[target]]))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'sizes': sizes, 'seconds': results,
+                       'exponents': exponents}, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    rows = compare(results, baseline, args.threshold, args.min_seconds)
+    print('\nagainst {} (threshold +{:.0%})'.format(args.baseline,
+                                                   args.threshold))
+    for target, size, seconds, reference, ratio, passed in rows:
+        print('{:<4}  {:<20}{:>9}  {:.4f}s vs {:.4f}s  x{:.2f}'.format(
+            'ok' if passed else 'FAIL', target, size, seconds, reference,
+            ratio))
+    if not rows:
+        print('no sizes in common with the baseline')
+
+    return 0 if all(row[-1] for row in rows) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+'''
+Start the conversion server on a free localhost port, send it concurrent
+requests, check every reply against an in-process conversion and report
+latency percentiles and throughput, next to converting each request in a
+fresh interpreter.
+
+Usage: python benchmarks/server_load.py [input.svg] [--requests N]
+           [--concurrency N] [--workers N]
+'''
+import argparse
+import concurrent.futures
+import pathlib
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+#Run from a source checkout without installing it, as a script or as
+#python -m benchmarks.server_load
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT/'benchmarks')]
+
+from onshape2shaper.server import conversion_server, worker_pool
+from onshape2shaper.svg2svg import convert
+
+EXAMPLE = pathlib.Path(__file__).resolve().parents[1]/'examples'/'WallBrace.svg'
+
+COLD = ('import sys; from onshape2shaper.svg2svg import convert; '
+        'sys.stdout.buffer.write(convert(sys.stdin.buffer.read()))')
+
+def post(url, data):
+    start = time.perf_counter()
+    request = urllib.request.Request(url, data=data, method='POST')
+    with urllib.request.urlopen(request) as response:
+        body = response.read()
+    return time.perf_counter() - start, body
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction*len(values)))]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('input', nargs='?', default=EXAMPLE)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cold', type=int, default=5,
+                        help='requests converted in fresh interpreters')
+    args = parser.parse_args(argv)
+
+    data = pathlib.Path(args.input).read_bytes()
+    expected = convert(data)
+
+    pool = worker_pool(args.workers, timeout=60,
+                       queue_size=args.concurrency)
+    server = conversion_server(('127.0.0.1', 0), pool)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = 'http://127.0.0.1:{}/convert'.format(server.server_address[1])
+
+    try:
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(
+                args.concurrency) as executor:
+            results = list(executor.map(lambda _: post(url, data),
+                                        range(args.requests)))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        server.server_close()
+        pool.close()
+
+    mismatched = sum(body != expected for _, body in results)
+    latencies = [seconds for seconds, _ in results]
+    print('server: {} requests, {} workers, {} concurrent'.format(
+        args.requests, pool.size, args.concurrency))
+    print('  {:.1f} requests/s, p50 {:.1f} ms, p95 {:.1f} ms, '
+          'p99 {:.1f} ms'.format(args.requests/elapsed,
+                                 percentile(latencies, 0.5)*1e3,
+                                 percentile(latencies, 0.95)*1e3,
+                                 percentile(latencies, 0.99)*1e3))
+
+    cold = []
+    for _ in range(args.cold):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, '-c', COLD], input=data,
+                                   capture_output=True, check=True)
+        cold.append(time.perf_counter() - start)
+        mismatched += completed.stdout != expected
+    if cold:
+        print('fresh interpreter: p50 {:.1f} ms per request'.format(
+            percentile(cold, 0.5)*1e3))
+
+    if mismatched:
+        print('{} replies differ from convert()'.format(mismatched))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+'''
+Report the vertices and path data bytes simplify_paths leaves on synthetic
+drawings of growing size, with and without arcs, the largest deviation from
+the original geometry and the time the stage adds to a conversion.
+
+Usage: python benchmarks/simplify.py [--sizes 1e3 1e4 1e5]
+           [--tolerance MM]
+'''
+import argparse
+import pathlib
+import sys
+import tempfile
+import time
+
+#Run from a source checkout without installing it, as a script or as
+#python -m benchmarks.simplify
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT/'benchmarks')]
+
+import synthetic_svg
+
+import onshape2shaper.svg2svg as s2s
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=float, nargs='+',
+                        default=[1e3, 1e4, 1e5],
+                        help='segment counts (default: 1e3 1e4 1e5)')
+    parser.add_argument('--tolerance', type=float, default=0.05,
+                        help='simplify tolerance in mm (default: 0.05)')
+    args = parser.parse_args(argv)
+
+    print('{:>9}  {:>4}  {:>9}  {:>9}  {:>10}  {:>10}  {:>9}  {:>7}'.format(
+        'segments', 'arcs', 'vertices', 'kept', 'bytes', 'kept bytes',
+        'max mm', 'added s'))
+    with tempfile.TemporaryDirectory() as directory:
+        for size in [int(size) for size in args.sizes]:
+            input_path = pathlib.Path(directory)/'synthetic.svg'
+            synthetic_svg.write(input_path, size)
+
+            start = time.perf_counter()
+            s2s.vector_object(input_path).onshape2shaper(
+                pathlib.Path(directory)/'out.svg')
+            base = time.perf_counter() - start
+
+            for fit_arcs in (False, True):
+                svg = s2s.vector_object(input_path, simplify=args.tolerance,
+                                        fit_arcs=fit_arcs)
+                start = time.perf_counter()
+                svg.onshape2shaper(pathlib.Path(directory)/'out.svg')
+                seconds = time.perf_counter() - start
+
+                report = svg.simplify_report
+                print('{:>9}  {:>4}  {:>9}  {:>9}  {:>10}  {:>10}  {:>9.4f}  '
+                      '{:>7.3f}'.format(size, 'yes' if fit_arcs else 'no',
+                                        report['vertices_before'],
+                                        report['vertices_after'],
+                                        report['bytes_before'],
+                                        report['bytes_after'],
+                                        report['max_deviation'],
+                                        seconds - base))
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
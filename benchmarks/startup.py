@@ -0,0 +1,97 @@
+'''
+Guard the start up cost of the package: time imports with
+python -X importtime in fresh interpreters and check that heavy
+dependencies are only loaded by the code paths that need them.
+
+Usage: python benchmarks/startup.py [--repeats N] [--max-ms MS]
+
+Exits with 1 if a module that should load lazily is imported, or with
+--max-ms, if the best cold start of the CLI is slower than that.
+'''
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+#Entry point, what it runs, modules it must not load
+CHECKS = (
+    ('import onshape2shaper.svg2svg', 'import onshape2shaper.svg2svg',
+     ('networkx', 'xmltodict', 'matplotlib')),
+    ('import onshape2shaper.cli', 'import onshape2shaper.cli',
+     ('numpy', 'networkx', 'xmltodict', 'matplotlib')),
+    ('onshape2shaper --help',
+     'import sys; sys.argv = ["onshape2shaper", "--help"]\n'
+     'from onshape2shaper.cli import main\n'
+     'try:\n    main()\nexcept SystemExit:\n    pass',
+     ('numpy', 'networkx', 'xmltodict', 'matplotlib')),
+    )
+
+IMPORT_TIME = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+def run(code, importtime=False):
+    '''
+    Run code in a fresh interpreter, return its stderr and the modules it
+    loaded
+    '''
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    code += '\nimport sys\nprint(" ".join(sorted(sys.modules)))'
+    completed = subprocess.run(command + ['-c', code], capture_output=True,
+                               text=True, check=True, env=_environment())
+    return completed.stderr, set(completed.stdout.splitlines()[-1].split())
+
+def _environment():
+    # Let the checks run from a source checkout without installing it
+    environment = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment['PYTHONPATH'] = os.pathsep.join(
+        filter(None, [root, environment.get('PYTHONPATH')]))
+    return environment
+
+def top_level_imports(stderr):
+    '''
+    (module, cumulative microseconds) of imports made directly by the code
+    run, largest first
+    '''
+    imports = []
+    for match in IMPORT_TIME.finditer(stderr):
+        if len(match.group(3)) == 1:
+            imports.append((match.group(4), int(match.group(2))))
+    return sorted(imports, key=lambda item: -item[1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='fail if the CLI imports take longer than this')
+    args = parser.parse_args(argv)
+
+    failed = False
+    for name, code, lazy in CHECKS:
+        best = None
+        for _ in range(args.repeats):
+            stderr, modules = run(code, importtime=True)
+            imports = top_level_imports(stderr)
+            total = sum(microseconds for _, microseconds in imports)
+            if best is None or total < best[0]:
+                best = (total, imports)
+
+        loaded = sorted(module for module in lazy if module in modules)
+        status = 'FAIL' if loaded else 'ok'
+        if args.max_ms is not None and name != CHECKS[0][0] \
+          and best[0]/1e3 > args.max_ms:
+            status = 'FAIL'
+        failed |= status == 'FAIL'
+
+        print('{:<4}  {:<30}{:>9.1f} ms'.format(status, name, best[0]/1e3))
+        for module, microseconds in best[1][:5]:
+            print('      {:<30}{:>9.1f} ms'.format(module, microseconds/1e3))
+        if loaded:
+            print('      loaded eagerly: {}'.format(', '.join(loaded)))
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+'''
+Generate Onshape style drawing SVGs of any size for benchmarking.
+
+The layout is the one vector_object expects: the white border rect, then
+one svg/g/g per colour and width holding a polyline per sketch segment.
+Contours are rounded rectangles, each four lines and four tessellated arcs,
+whose segments are written in shuffled order and direction the way Onshape
+exports them.
+
+Usage: python benchmarks/synthetic_svg.py n_segments output.svg
+           [--arc-points N] [--groups N] [--open-fraction F] [--noise PX]
+'''
+import argparse
+
+import numpy as np
+
+HEADER = '''<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<svg width="297.011mm" height="209.973mm"
+ viewBox="0 0 3508 2480"
+ xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink"  version="1.2" baseProfile="tiny">
+<defs>
+</defs>
+<g fill="none" stroke="black" stroke-width="1" fill-rule="evenodd" stroke-linecap="square" stroke-linejoin="bevel" >
+
+<g fill="#ffffff" fill-opacity="1" stroke="none" transform="matrix(1,0,0,1,0,0)"
+font-family="Arial" font-size="12" font-weight="400" font-style="normal"
+>
+<rect x="0" y="0" width="3508" height="2480"/>
+</g>
+'''
+
+GROUP = '''
+<g fill="#000000" fill-opacity="1" stroke="{stroke}" stroke-opacity="1" stroke-width="{width}" stroke-linecap="round" stroke-linejoin="bevel" transform="matrix(1,0,0,1,0,0)"
+font-family="Arial" font-size="12" font-weight="400" font-style="normal"
+>
+'''
+
+POLYLINE = '<polyline fill="none" vector-effect="none" points="{}" />\n'
+
+FOOTER = '''</g>
+</svg>
+'''
+
+#Onshape line widths are 0.2mm per cut type, interior to guide
+PIXELS_PER_MM = 2480/209.973
+SEGMENTS_PER_CONTOUR = 8
+
+def group_styles(n_groups):
+    '''
+    (stroke, stroke-width) of each group, cycling through the cut types and
+    a depth in 1/10th mm per group so every group is distinct
+    '''
+    styles = []
+    for i in range(n_groups):
+        cut_type = 1 + i % 5
+        depth = 5 + 5*(i//5)
+        styles.append(('#{:06d}'.format(depth),
+                       '{:g}'.format(round(0.2*cut_type*PIXELS_PER_MM, 3))))
+    return styles
+
+def rounded_rectangle(rng, arc_points):
+    '''
+    The eight segments of a rounded rectangle, lines and arcs alternating
+    '''
+    width, height = rng.uniform(40, 400, 2)
+    radius = rng.uniform(0.05, 0.45)*min(width, height)
+    x0, y0 = rng.uniform(20, 3488 - width), rng.uniform(20, 2460 - height)
+
+    centres = [(x0 + width - radius, y0 + radius),
+               (x0 + width - radius, y0 + height - radius),
+               (x0 + radius, y0 + height - radius),
+               (x0 + radius, y0 + radius)]
+
+    segments = []
+    for i, (cx, cy) in enumerate(centres):
+        t = np.linspace(-np.pi/2 + i*np.pi/2, i*np.pi/2, arc_points)
+        arc = np.c_[cx + radius*np.cos(t), cy + radius*np.sin(t)]
+        if segments:
+            segments.append(np.array([segments[-1][-1], arc[0]]))
+        segments.append(arc)
+    segments.append(np.array([segments[-1][-1], segments[0][0]]))
+
+    return segments
+
+def format_points(points):
+    return ' '.join(['{:g},{:g}'.format(x, y) for x, y in points]) + ' '
+
+def generate(n_segments, arc_points=31, n_groups=3, open_fraction=0.0,
+             noise=0.0, anchor=True, seed=0):
+    '''
+    Build the SVG text of a synthetic Onshape drawing
+
+    Parameters
+    ----------
+    n_segments : int
+        Approximate number of polylines, rounded to whole contours.
+    arc_points : int, optional
+        Points per tessellated arc. The default is 31.
+    n_groups : int, optional
+        Number of colour and width groups. The default is 3.
+    open_fraction : float, optional
+        Fraction of contours missing a segment. The default is 0.0.
+    noise : float, optional
+        Standard deviation in pixels added to every endpoint, so shared
+        corners no longer match exactly. The default is 0.0.
+    anchor : bool, optional
+        Add the red anchor triangle. The default is True.
+    seed : int, optional
+        Random seed. The default is 0.
+
+    Returns
+    -------
+    str
+        The SVG.
+
+    '''
+    rng = np.random.default_rng(seed)
+    n_contours = max(1, int(round(n_segments/SEGMENTS_PER_CONTOUR)))
+
+    groups = [[] for _ in range(n_groups)]
+    for i in range(n_contours):
+        segments = rounded_rectangle(rng, arc_points)
+        if rng.random() < open_fraction:
+            del segments[rng.integers(len(segments))]
+
+        for segment in segments:
+            if noise:
+                segment[[0, -1]] += rng.normal(0, noise, (2, 2))
+            if rng.random() < 0.5:
+                segment = segment[::-1]
+            groups[i % n_groups].append(format_points(segment))
+
+    parts = [HEADER]
+    if anchor:
+        parts.append(GROUP.format(stroke='#ff0000', width='14'))
+        parts.extend([POLYLINE.format(points) for points in
+                      ('10,10 20,10 ', '20,10 10,30 ', '10,30 10,10 ')])
+        parts.append('</g>\n')
+
+    for (stroke, width), polylines in zip(group_styles(n_groups), groups):
+        rng.shuffle(polylines)
+        parts.append(GROUP.format(stroke=stroke, width=width))
+        parts.extend([POLYLINE.format(points) for points in polylines])
+        parts.append('</g>\n')
+    parts.append(FOOTER)
+
+    return ''.join(parts)
+
+def write(output_path, n_segments, **options):
+    with open(output_path, 'w') as f:
+        f.write(generate(n_segments, **options))
+    return output_path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('n_segments', type=int)
+    parser.add_argument('output')
+    parser.add_argument('--arc-points', type=int, default=31)
+    parser.add_argument('--groups', type=int, default=3)
+    parser.add_argument('--open-fraction', type=float, default=0.0)
+    parser.add_argument('--noise', type=float, default=0.0)
+    parser.add_argument('--no-anchor', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    write(args.output, args.n_segments, arc_points=args.arc_points,
+          n_groups=args.groups, open_fraction=args.open_fraction,
+          noise=args.noise, anchor=not args.no_anchor, seed=args.seed)
+
+if __name__ == '__main__':
+    main()
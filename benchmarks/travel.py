@@ -0,0 +1,57 @@
+'''
+Report the travel between cuts before and after order_paths on synthetic
+drawings of growing size, with the time the ordering adds to a 
+conversion.
+
+Usage: python benchmarks/travel.py [--sizes 1e3 1e4 1e5]
+           [--open-fraction F]
+'''
+import argparse
+import pathlib
+import sys
+import tempfile
+import time
+
+#Run from a source checkout without installing it, as a script or as
+#python -m benchmarks.travel
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT/'benchmarks')]
+
+import synthetic_svg
+
+import onshape2shaper.svg2svg as s2s
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=float, nargs='+',
+                        default=[1e3, 1e4, 1e5],
+                        help='segment counts (default: 1e3 1e4 1e5)')
+    parser.add_argument('--open-fraction', type=float, default=0.2,
+                        help='share of contours left open (default: 0.2)')
+    args = parser.parse_args(argv)
+
+    print('{:>9}  {:>6}  {:>12}  {:>12}  {:>7}  {:>8}'.format(
+        'segments', 'paths', 'before mm', 'after mm', 'ratio', 'order s'))
+    with tempfile.TemporaryDirectory() as directory:
+        for size in [int(size) for size in args.sizes]:
+            input_path = pathlib.Path(directory)/'synthetic.svg'
+            synthetic_svg.write(input_path, size,
+                                open_fraction=args.open_fraction)
+
+            seconds = []
+            for order_paths in (False, True):
+                svg = s2s.vector_object(input_path, order_paths=order_paths)
+                start = time.perf_counter()
+                svg.onshape2shaper(pathlib.Path(directory)/'out.svg')
+                seconds.append(time.perf_counter() - start)
+            travel = svg.travel_report
+            print('{:>9}  {:>6}  {:>12.1f}  {:>12.1f}  {:>7.3f}  {:>8.3f}'
+                  .format(size, travel['paths'], travel['before'],
+                          travel['after'],
+                          travel['after']/max(travel['before'], 1e-9),
+                          seconds[1] - seconds[0]))
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
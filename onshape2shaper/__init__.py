@@ -0,0 +1,6 @@
+__version__ = '1.0.0'
+
+#Version of the converted output, part of every cache key. Bump it with any
+#change to what a conversion writes or how groups are stitched, so cached
+#results from before are not reused
+OUTPUT_VERSION = 1
@@ -0,0 +1,5 @@
+import sys
+
+from onshape2shaper.cli import main
+
+sys.exit(main())
@@ -0,0 +1,396 @@
+'''
+Content addressed caches of converted files and stitched colour groups
+
+An entry is keyed on the SHA-256 of the input bytes, the conversion 
+options, the package version and onshape2shaper.OUTPUT_VERSION, so a 
+re-exported drawing that has not changed is copied from the cache instead 
+of being converted again. The cache is capped in size and the least 
+recently used entries are evicted.
+
+numpy is only imported by group_cache, so checking the conversion cache 
+stays cheap at start up.
+'''
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+from collections import OrderedDict
+
+from onshape2shaper import OUTPUT_VERSION, __version__
+
+class conversion_cache():
+    '''
+    On-disk cache of converted SVGs
+
+    Parameters
+    ----------
+    directory : str or pathlib.Path
+        Where entries are stored, created if needed.
+    max_bytes : int, optional
+        Size cap, least recently used entries are removed beyond it. The 
+        default is 1 GiB.
+    '''
+    
+    suffix = '.svg'
+    
+    def __init__(self, directory, max_bytes=1 << 30):
+        
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self.size = sum(path.stat().st_size for entry in self._entries()
+                        for path in self._files(entry))
+        
+    def key(self, input_path, options=None, chunk_size=1 << 20):
+        '''
+        Hash the input file together with the options, package version 
+        and output version
+
+        Parameters
+        ----------
+        input_path : str or pathlib.Path
+            File to be converted.
+        options : dict, optional
+            Conversion options that change the output, must be JSON 
+            serializable. The default is None.
+        chunk_size : int, optional
+            Bytes hashed at a time. The default is 1 MiB.
+
+        Returns
+        -------
+        str
+            Hex digest.
+
+        '''
+        digest = hashlib.sha256()
+        digest.update('{} {}'.format(__version__, OUTPUT_VERSION).encode())
+        digest.update(json.dumps(options or {}, sort_keys=True).encode())
+        
+        with open(input_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+                
+        return digest.hexdigest()
+    
+    def _path(self, key):
+        return self.directory/key[:2]/(key + self.suffix)
+    
+    def _entries(self):
+        return self.directory.glob('*/*' + self.suffix)
+    
+    def _files(self, entry):
+        # The entry and the extra files stored beside it
+        return [entry] + sorted(entry.parent.glob(entry.stem + '.*.extra'))
+    
+    def fetch(self, key, output_path, extras=None):
+        '''
+        Copy a cached result to output_path
+
+        Parameters
+        ----------
+        key : str
+            From key().
+        output_path : str or pathlib.Path
+            Where to copy the entry.
+        extras : dict, optional
+            Name to destination path of extra files, e.g. a report, stored 
+            with the entry. An entry without all of them is a miss. The 
+            default is None.
+
+        Returns
+        -------
+        bool
+            True on a hit, False if there is no entry.
+
+        '''
+        entry = self._path(key)
+        copies = [(self._extra_path(entry, name), path) 
+                  for name, path in (extras or {}).items()]
+        copies.append((entry, output_path))
+        
+        # Nothing is copied unless the whole entry is there, so a miss 
+        #never leaves the extras of another conversion behind
+        if not all(source.exists() for source, _ in copies):
+            self.misses += 1
+            return False
+        
+        copied = []
+        try:
+            for source, target in copies:
+                shutil.copyfile(source, target)
+                copied.append(target)
+        except FileNotFoundError:
+            # Evicted by another process while copying
+            for target in copied:
+                pathlib.Path(target).unlink(missing_ok=True)
+            self.misses += 1
+            return False
+        
+        # The modification time records use for LRU eviction
+        os.utime(entry)
+        self.hits += 1
+        
+        return True
+    
+    def _extra_path(self, entry, name):
+        return entry.parent/'{}.{}.extra'.format(entry.stem, name)
+    
+    def store(self, key, output_path, extras=None):
+        '''
+        Add a converted file to the cache, then evict down to the size cap
+
+        Parameters
+        ----------
+        key : str
+            From key().
+        output_path : str or pathlib.Path
+            Converted file to copy in.
+        extras : dict, optional
+            Name to path of extra files to keep with the entry, see fetch.
+            The default is None.
+
+        Returns
+        -------
+        None.
+
+        '''
+        entry = self._path(key)
+        entry.parent.mkdir(exist_ok=True)
+        
+        # Extras first, an entry is only complete once its file is there
+        copies = [(path, self._extra_path(entry, name)) 
+                  for name, path in (extras or {}).items()]
+        copies.append((output_path, entry))
+        for source, target in copies:
+            previous = target.stat().st_size if target.exists() else 0
+            
+            # Copy beside the entry and rename so readers never see half a 
+            #file
+            handle, temporary = tempfile.mkstemp(dir=entry.parent, 
+                                                 suffix='.tmp')
+            os.close(handle)
+            try:
+                shutil.copyfile(source, temporary)
+                os.replace(temporary, target)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+            
+            self.size += target.stat().st_size - previous
+        
+        if self.size > self.max_bytes:
+            self.evict()
+            
+    def evict(self):
+        '''
+        Remove least recently used entries until the cache fits its cap
+        '''
+        entries = []
+        for entry in self._entries():
+            files = self._files(entry)
+            entries.append((entry.stat().st_mtime, 
+                            sum(path.stat().st_size for path in files), 
+                            files))
+        entries.sort()
+        
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, files in entries:
+            if self.size <= self.max_bytes:
+                break
+            for path in files:
+                path.unlink(missing_ok=True)
+            self.size -= size
+            self.evictions += 1
+            
+    def stats(self):
+        '''
+        Hit, miss and eviction counters and the current size in bytes
+        '''
+        return {'hits': self.hits, 'misses': self.misses, 
+                'evictions': self.evictions, 'bytes': self.size}
+
+class group_cache():
+    '''
+    Stitched polylines of colour groups, keyed on the group's points, its 
+    attributes and the stitching options, so a re-export where only some 
+    groups changed only re-stitches those. Entries are kept in memory and,
+    if a directory is given, on disk so separate runs can share them.
+
+    Parameters
+    ----------
+    directory : str or pathlib.Path, optional
+        Where entries are stored as .npz files. The default of None keeps 
+        them in memory only.
+    max_entries : int, optional
+        Number of entries kept, in memory and on disk, least recently used
+        entries are dropped first. The entries on disk are listed when the
+        cache is opened, ones another process adds later are not counted 
+        until then. The default is 4096.
+    '''
+    
+    def __init__(self, directory=None, max_entries=4096):
+        
+        self.directory = None
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        #Keys of the entries on disk, least recently used first, read once
+        #so storing a group never lists the directory
+        self.disk_entries = OrderedDict()
+        if directory is not None:
+            self.directory = pathlib.Path(directory)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            paths = sorted(self.directory.glob('*.npz'), 
+                           key=lambda entry: entry.stat().st_mtime)
+            self.disk_entries.update((path.stem, None) for path in paths)
+        
+        self.hits = 0
+        self.misses = 0
+        
+    def key(self, points, offsets, attributes, options):
+        '''
+        Hash of a group's polyline points and everything else that changes
+        its stitched result
+
+        Parameters
+        ----------
+        points : numpy.ndarray
+            (N, 2) points of all polylines in the group.
+        offsets : numpy.ndarray
+            Polyline offsets into points.
+        attributes : tuple
+            Hashable group attributes, e.g. svg2svg.style_key(group).
+        options : tuple
+            Stitching options.
+
+        Returns
+        -------
+        str
+            Hex digest.
+
+        '''
+        import numpy as np
+        
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(repr((__version__, OUTPUT_VERSION, attributes, options)).encode())
+        digest.update(np.ascontiguousarray(points, dtype=np.float64).data)
+        digest.update(np.ascontiguousarray(offsets, dtype=np.int64).data)
+        
+        return digest.hexdigest()
+    
+    def get(self, key):
+        '''
+        Look up a group
+
+        Returns
+        -------
+        tuple or None
+            (merged_polylines, snaps) on a hit, None on a miss.
+
+        '''
+        entry = self.entries.get(key)
+        if entry is None and self.directory is not None:
+            entry = self._load(key)
+            
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        self._trim()
+        self.hits += 1
+        
+        import numpy as np
+        
+        points, offsets, snaps = entry
+        return np.split(points, offsets[1:-1]), snaps
+    
+    def put(self, key, merged_polylines, snaps=None):
+        '''
+        Store the stitched polylines of a group
+
+        Parameters
+        ----------
+        key : str
+            From key().
+        merged_polylines : list of numpy.ndarray
+            Stitched paths.
+        snaps : int, optional
+            Endpoints snapped while stitching. The default is None.
+
+        Returns
+        -------
+        None.
+
+        '''
+        import numpy as np
+        
+        lengths = [len(polyline) for polyline in merged_polylines]
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        if merged_polylines:
+            points = np.concatenate(merged_polylines)
+        else:
+            points = np.empty((0, 2))
+        
+        self.entries[key] = (points, offsets, snaps)
+        self.entries.move_to_end(key)
+        self._trim()
+        
+        if self.directory is not None:
+            self._save(key, points, offsets, snaps)
+            
+    def _trim(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+    
+    def _load(self, key):
+        import numpy as np
+        
+        path = self.directory/(key + '.npz')
+        try:
+            with np.load(path) as data:
+                snaps = int(data['snaps'])
+                entry = (data['points'], data['offsets'], 
+                         None if snaps < 0 else snaps)
+        except (OSError, KeyError, ValueError):
+            return None
+        
+        os.utime(path)
+        self.disk_entries[key] = None
+        self.disk_entries.move_to_end(key)
+        return entry
+    
+    def _save(self, key, points, offsets, snaps):
+        import numpy as np
+        
+        path = self.directory/(key + '.npz')
+        handle, temporary = tempfile.mkstemp(dir=self.directory, 
+                                             suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                np.savez(f, points=points, offsets=offsets, 
+                         snaps=-1 if snaps is None else snaps)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        
+        self.disk_entries[key] = None
+        self.disk_entries.move_to_end(key)
+        while len(self.disk_entries) > self.max_entries:
+            oldest, _ = self.disk_entries.popitem(last=False)
+            (self.directory/(oldest + '.npz')).unlink(missing_ok=True)
+            
+    def stats(self):
+        '''
+        Hit and miss counters
+        '''
+        return {'hits': self.hits, 'misses': self.misses}
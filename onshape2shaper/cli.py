@@ -0,0 +1,488 @@
+'''
+Command line batch conversion of Onshape SVGs to Shaper SVGs
+
+    onshape2shaper drawings/*.svg -o shaper/ --jobs 8
+
+Files are converted in parallel in a process pool. A failing file is 
+reported and the rest of the batch carries on, the exit status is non-zero
+if any file failed.
+'''
+import argparse
+import concurrent.futures
+import glob
+import logging
+import os
+import pathlib
+import sys
+import time
+
+from onshape2shaper.cache import conversion_cache
+
+logger = logging.getLogger(__name__)
+
+def convert_file(input_path, output_path, stream=False, group_workers=None,
+                 group_cache_dir=None, profile_dir=None, preview_dir=None, 
+                 validate_dir=None, **options):
+    '''
+    Convert one file, this is what runs in each worker
+
+    Parameters
+    ----------
+    input_path : str or pathlib.Path
+        Onshape SVG.
+    output_path : str or pathlib.Path
+        Where to write the Shaper SVG.
+    stream : bool, optional
+        Use stream_onshape2shaper. The default is False.
+    group_workers : int, optional
+        Worker processes for the colour groups within the file. The default
+        is None.
+    group_cache_dir : str, optional
+        Reuse the stitched colour groups kept in this directory. The default
+        is None.
+    profile_dir : str, optional
+        Write a stage profile of the conversion to <name>.profile.json in 
+        this directory, not with stream. The default is None.
+    preview_dir : str, optional
+        Write a PNG preview of the paths to <name>.png in this directory.
+        The default is None.
+    validate_dir : str, optional
+        Check the stitched paths and write the findings to 
+        <name>.validation.json in this directory. ValueError with stream.
+        The default is None.
+    **options
+        Passed to vector_object.
+
+    Returns
+    -------
+    float
+        Seconds taken.
+
+    '''
+    # Loaded here so --help and cache hits never import numpy or xmltodict
+    from onshape2shaper.cache import group_cache
+    from onshape2shaper.svg2svg import vector_object
+    
+    start = time.perf_counter()
+    logger.info('Converting %s', input_path)
+    
+    if group_cache_dir:
+        options['group_cache'] = group_cache(group_cache_dir)
+    
+    preview_png = None
+    if preview_dir:
+        preview_png = preview_path_for(input_path, preview_dir)
+    
+    if stream and validate_dir:
+        raise ValueError('validate_dir cannot be combined with streaming')
+    
+    svg = vector_object(input_path, **options)
+    if stream:
+        svg.stream_onshape2shaper(output_path)
+        if preview_png:
+            preview_file(output_path, preview_png)
+    else:
+        profile_json = None
+        if profile_dir:
+            profile_json = pathlib.Path(profile_dir)/(
+                pathlib.Path(input_path).stem + '.profile.json')
+        validation_json = None
+        if validate_dir:
+            validation_json = validation_path_for(input_path, validate_dir)
+        svg.onshape2shaper(output_path, workers=group_workers, 
+                           profile_json=profile_json, preview_png=preview_png,
+                           validation_json=validation_json)
+        
+    return time.perf_counter() - start
+
+def preview_path_for(input_path, preview_dir):
+    return pathlib.Path(preview_dir)/(pathlib.Path(input_path).stem + '.png')
+
+def validation_path_for(input_path, validate_dir):
+    return pathlib.Path(validate_dir)/(pathlib.Path(input_path).stem 
+                                       + '.validation.json')
+
+def preview_file(svg_path, png_path):
+    '''
+    Write the PNG preview of an already converted .svg or .svgz file
+    '''
+    import gzip
+    from onshape2shaper.svg2svg import vector_object
+    
+    if str(svg_path).lower().endswith('.svgz'):
+        source = gzip.open(svg_path, 'rb')
+    else:
+        source = open(svg_path, 'rb')
+        
+    with source:
+        svg = vector_object(source)
+        svg.read_document()
+    svg.preview(png_path)
+
+def expand_inputs(patterns):
+    '''
+    Expand glob patterns, plain paths are passed through as given
+
+    Parameters
+    ----------
+    patterns : list of str
+        Paths or glob patterns.
+
+    Returns
+    -------
+    paths : list of pathlib.Path
+        Matched files, without duplicates, in the order given.
+    unmatched : list of str
+        Patterns that matched nothing.
+
+    '''
+    paths = []
+    unmatched = []
+    seen = set()
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = [pattern] if os.path.exists(pattern) else []
+            
+        if not matches:
+            unmatched.append(pattern)
+            
+        for match in matches:
+            path = pathlib.Path(match)
+            if path.resolve() not in seen:
+                seen.add(path.resolve())
+                paths.append(path)
+                
+    return paths, unmatched
+
+def output_path_for(input_path, output_dir, compress=False):
+    name = pathlib.Path(input_path).name
+    if compress:
+        name = pathlib.Path(name).with_suffix('.svgz').name
+    return pathlib.Path(output_dir)/name
+
+def run_batch(jobs, workers, stream=False, options=None, report=print,
+              cache=None, verbose=False):
+    '''
+    Convert (input, output) pairs, in a process pool when workers > 1
+
+    Parameters
+    ----------
+    jobs : list of tuple
+        (input_path, output_path) pairs.
+    workers : int
+        Number of worker processes, 1 converts in this process.
+    stream : bool, optional
+        Use the streaming conversion. The default is False.
+    options : dict, optional
+        Passed to vector_object.
+    report : callable, optional
+        Called with a line of text as each file finishes. The default is 
+        print.
+    cache : onshape2shaper.cache.conversion_cache, optional
+        Copy unchanged files from this cache instead of converting them, 
+        and add new conversions to it. Validation reports are cached with
+        the files. The default is None.
+    verbose : bool, optional
+        Log the stage reports of each conversion in the worker processes 
+        too, see configure_logging. The default is False.
+
+    Returns
+    -------
+    list of tuple
+        (input_path, seconds, error) for each job in order, error is None
+        on success.
+
+    '''
+    options = options or {}
+    results = [None]*len(jobs)
+    keys = {}
+    
+    def extras(input_path):
+        # Reports written beside the output, cached with it
+        if options.get('validate_dir'):
+            return {'validation': validation_path_for(
+                input_path, options['validate_dir'])}
+        return {}
+    
+    def finished(index, elapsed, error, status='ok'):
+        input_path, output_path = jobs[index]
+        results[index] = (input_path, elapsed, error)
+        if error is not None:
+            report('FAIL  {:8.3f}s  {}: {}'.format(elapsed, input_path, 
+                                                   error))
+            return
+        
+        if index in keys and status == 'ok':
+            cache.store(keys[index], output_path, extras(input_path))
+        report('{:<4}  {:8.3f}s  {}'.format(status, elapsed, input_path))
+    
+    pending = []
+    for index, (input_path, output_path) in enumerate(jobs):
+        if cache is None:
+            pending.append(index)
+            continue
+        
+        start = time.perf_counter()
+        try:
+            keys[index] = cache.key(input_path, cache_options(stream, 
+                                                              options,
+                                                              output_path))
+            if cache.fetch(keys[index], output_path, extras(input_path)):
+                if options.get('preview_dir'):
+                    preview_file(output_path, preview_path_for(
+                        input_path, options['preview_dir']))
+                finished(index, time.perf_counter() - start, None, 'hit')
+                continue
+        except Exception as error:
+            finished(index, time.perf_counter() - start, _describe(error))
+            continue
+        pending.append(index)
+    
+    if workers <= 1:
+        for index in pending:
+            input_path, output_path = jobs[index]
+            start = time.perf_counter()
+            try:
+                elapsed = convert_file(input_path, output_path, stream, 
+                                       **options)
+                finished(index, elapsed, None)
+            except Exception as error:
+                finished(index, time.perf_counter() - start, 
+                         _describe(error))
+        return results
+    
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=configure_logging, 
+            initargs=(verbose,)) as pool:
+        submitted = {}
+        for index in pending:
+            input_path, output_path = jobs[index]
+            future = pool.submit(convert_file, input_path, output_path, 
+                                 stream, **options)
+            submitted[future] = (index, time.perf_counter())
+            
+        for future in concurrent.futures.as_completed(submitted):
+            index, start = submitted[future]
+            try:
+                finished(index, future.result(), None)
+            except Exception as error:
+                # Time in the queue is included as the worker never reported
+                finished(index, time.perf_counter() - start, 
+                         _describe(error))
+                
+    return results
+
+def cache_options(stream, options, output_path=None):
+    '''
+    The options that change the converted file, for the cache key, with 
+    whether output_path is compressed
+    '''
+    key_options = {key: value for key, value in options.items() 
+                   if key not in ('group_workers', 'group_cache_dir', 
+                                  'profile_dir', 'preview_dir', 
+                                  'validate_dir')}
+    key_options['stream'] = stream
+    if output_path is not None:
+        key_options['compress'] = str(output_path).lower().endswith('.svgz')
+    
+    return key_options
+
+def configure_logging(verbose):
+    '''
+    With verbose, print the reports the conversion stages log, such as 
+    snapped endpoints, reused groups, travel, simplification and removed 
+    duplicates, to stderr. Lines are prefixed with the process converting
+    the file, as files convert in parallel.
+    '''
+    if verbose:
+        logging.basicConfig(level=logging.INFO, 
+                            format='%(processName)s: %(message)s')
+
+def _describe(error):
+    return '{}: {}'.format(type(error).__name__, error)
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='onshape2shaper',
+        description='Convert Onshape drawing SVGs to Shaper Origin SVGs.')
+    
+    parser.add_argument('inputs', nargs='+', 
+                        help='SVG files or glob patterns, e.g. "parts/*.svg"')
+    parser.add_argument('-o', '--output-dir', required=True,
+                        help='directory the converted files are written to')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help='worker processes (default: number of CPUs)')
+    parser.add_argument('--group-workers', type=int, default=None,
+                        help='worker processes per file for its colour '
+                             'groups, for a few very large files')
+    parser.add_argument('--stream', action='store_true',
+                        help='convert group by group with bounded memory')
+    parser.add_argument('--cache-dir', default=None,
+                        help='reuse conversions of unchanged files from '
+                             'this directory')
+    parser.add_argument('--cache-size', type=float, default=1024, 
+                        metavar='MB', help='cache size cap (default: 1024)')
+    parser.add_argument('--group-cache-dir', default=None,
+                        help='reuse stitched colour groups that did not '
+                             'change from this directory')
+    parser.add_argument('--profile-dir', default=None,
+                        help='write per stage timings and peak memory of '
+                             'each conversion as JSON to this directory')
+    parser.add_argument('--preview-dir', default=None,
+                        help='write a PNG preview of each converted file '
+                             'to this directory, open paths marked in red')
+    parser.add_argument('--validate-dir', default=None,
+                        help='check each converted file for open cuts, '
+                             'crossing paths and winding, and write the '
+                             'findings as JSON to this directory (not '
+                             'with --stream)')
+    parser.add_argument('--svgz', action='store_true',
+                        help='write gzip compressed .svgz files')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='report what each conversion stage did, e.g. '
+                             'snapped endpoints and travel saved')
+    add_conversion_arguments(parser)
+    return parser
+
+def add_conversion_arguments(parser):
+    '''
+    Arguments for the vector_object options, see conversion_options
+    '''
+    parser.add_argument('--compact', action='store_true',
+                        help='write the SVG without indentation')
+    parser.add_argument('--stitcher', choices=('native', 'networkx'), 
+                        default='native', 
+                        help='polyline stitching engine, networkx needs '
+                             'the legacy extra')
+    parser.add_argument('--join-tolerance', type=float, default=None,
+                        metavar='MM', 
+                        help='join polyline ends closer than this')
+    parser.add_argument('--precision', type=int, default=2,
+                        help='decimal places in path data (default: 2)')
+    parser.add_argument('--relative', action='store_true',
+                        help='write relative path commands')
+    parser.add_argument('--drop-collinear', action='store_true',
+                        help='leave out points on straight runs')
+    parser.add_argument('--dedup', action='store_true',
+                        help='drop duplicated and overlapping segments '
+                             'before stitching (not with --stream)')
+    parser.add_argument('--order-paths', action='store_true',
+                        help='order paths inside out and to cut down travel'
+                             ' (not with --stream)')
+    parser.add_argument('--simplify', type=float, default=None, 
+                        metavar='MM', 
+                        help='leave out points within this of the paths '
+                             '(not with --stream)')
+    parser.add_argument('--fit-arcs', action='store_true',
+                        help='with --simplify, write runs of points on a '
+                             'circle as arcs (not with --relative or '
+                             '--drop-collinear)')
+    parser.add_argument('--normalize-winding', action='store_true',
+                        help='wind outer contours clockwise and the ones in '
+                             'them anticlockwise (not with --stream)')
+    
+def check_conversion_arguments(parser, args):
+    '''
+    Exit through parser.error on add_conversion_arguments that cannot be
+    combined
+    '''
+    if args.fit_arcs and (args.relative or args.drop_collinear):
+        parser.error('--fit-arcs cannot be combined with --relative or '
+                     '--drop-collinear')
+    
+def conversion_options(args):
+    '''
+    vector_object keyword arguments from add_conversion_arguments
+    '''
+    return {'stitcher': args.stitcher,
+            'join_tolerance': args.join_tolerance,
+            'precision': args.precision,
+            'relative_paths': args.relative,
+            'drop_collinear': args.drop_collinear,
+            'pretty': not args.compact,
+            'order_paths': args.order_paths,
+            'simplify': args.simplify,
+            'fit_arcs': args.fit_arcs,
+            'normalize_winding': args.normalize_winding,
+            'dedup': args.dedup}
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    check_conversion_arguments(parser, args)
+    configure_logging(args.verbose)
+    if args.stream:
+        #Options stream_onshape2shaper refuses, see STREAM_UNSUPPORTED
+        unsupported = [name for name in ('order_paths', 'simplify', 
+                                         'fit_arcs', 'normalize_winding',
+                                         'validate_dir', 'dedup')
+                       if getattr(args, name)]
+        if unsupported:
+            parser.error('--stream cannot be combined with {}'.format(
+                ', '.join('--' + name.replace('_', '-') 
+                          for name in unsupported)))
+    
+    paths, unmatched = expand_inputs(args.inputs)
+    for pattern in unmatched:
+        print('FAIL  no files match {}'.format(pattern), file=sys.stderr)
+        
+    output_dir = pathlib.Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    jobs = []
+    rejected = len(unmatched)
+    #Input each output path is claimed by, so no two write the same file
+    claimed = {}
+    for input_path in paths:
+        output_path = output_path_for(input_path, output_dir, args.svgz)
+        if output_path.resolve() == input_path.resolve():
+            rejected += 1
+            print('FAIL  {} would be overwritten, choose another output '
+                  'directory'.format(input_path), file=sys.stderr)
+        elif output_path.resolve() in claimed:
+            rejected += 1
+            print('FAIL  {} would be written to {} as {} is, rename one of '
+                  'them'.format(input_path, output_path, 
+                                claimed[output_path.resolve()]), 
+                  file=sys.stderr)
+        else:
+            claimed[output_path.resolve()] = input_path
+            jobs.append((input_path, output_path))
+    
+    for directory in (args.profile_dir, args.preview_dir, 
+                      args.validate_dir):
+        if directory:
+            pathlib.Path(directory).mkdir(parents=True, exist_ok=True)
+    
+    options = {'group_workers': args.group_workers,
+               'profile_dir': args.profile_dir,
+               'group_cache_dir': args.group_cache_dir,
+               'preview_dir': args.preview_dir,
+               'validate_dir': args.validate_dir,
+               **conversion_options(args)}
+    
+    cache = None
+    if args.cache_dir:
+        cache = conversion_cache(args.cache_dir, 
+                                 int(args.cache_size*(1 << 20)))
+    
+    start = time.perf_counter()
+    results = run_batch(jobs, max(1, min(args.jobs or 1, len(jobs))), 
+                        args.stream, options, cache=cache, 
+                        verbose=args.verbose)
+    elapsed = time.perf_counter() - start
+    
+    converted = sum(error is None for _, _, error in results)
+    failed = rejected + len(results) - converted
+    print('{} converted, {} failed in {:.3f}s'.format(converted, failed, 
+                                                      elapsed))
+    if cache is not None:
+        print('cache: {hits} hits, {misses} misses, {evictions} evicted, '
+              '{bytes} bytes'.format(**cache.stats()))
+    
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,354 @@
+'''
+Remove duplicated and overlapping segments before stitching
+
+    vector_object(input_path, dedup=True).onshape2shaper(output_path)
+
+Onshape exports the shared edges of adjacent sketch regions once for each
+region, as the same polyline, the same segment, or collinear segments that
+only partly overlap. Each copy doubles the cut and leaves nodes where more
+than two ends meet, so stitching has to pick a way through arbitrarily.
+
+Polylines that repeat another, either way round, are dropped whole. The
+remaining segments are keyed on their quantized endpoints, in a canonical
+order, to drop exact copies. Segments on the same line are then found by
+sorting on direction, within a fixed angle, and on the offset of both ends
+from a line in the shared direction, and swept along the line: where two
+or more overlap the stretch is kept once, split at every segment end so no
+vertex other polylines meet at is lost. Segments that only touch end to end
+are left alone.
+'''
+import numpy as np
+
+from onshape2shaper.model import pack_polylines
+
+#Onshape writes coordinates to about six significant figures, ends closer
+#than this in drawing units are the same point
+DEFAULT_QUANTUM = 1e-3
+
+#Segments whose directions differ by more than this, in radians, are never
+#on the same line
+ANGLE_TOLERANCE = 1e-3
+
+def polyline_lengths(points, offsets):
+    '''
+    Length of each polyline of packed points
+    '''
+    lengths = np.zeros(len(offsets) - 1)
+    if len(points) < 2:
+        return lengths
+
+    steps = np.hypot(*np.diff(points, axis=0).T)
+    #Steps from the end of one polyline to the next one do not count
+    steps[offsets[1:-1][offsets[1:-1] > 0] - 1] = 0
+    counts = np.diff(offsets)
+    index = np.repeat(np.arange(len(counts)), counts)[:-1]
+    np.add.at(lengths, index, steps)
+    return lengths
+
+def duplicate_polylines(points, offsets, quantum=DEFAULT_QUANTUM):
+    '''
+    Polylines identical to an earlier one, either way round
+
+    Candidates share a point count and quantized ends, they are confirmed
+    with check_identical_polyline.
+
+    Parameters
+    ----------
+    points, offsets : numpy.ndarray
+        Packed polylines, see dedup_segments.
+    quantum : float, optional
+        Grid size ends are matched on. The default is DEFAULT_QUANTUM.
+
+    Returns
+    -------
+    numpy.ndarray
+        (M,) True for the polylines to drop.
+
+    '''
+    from onshape2shaper.svg2svg import check_identical_polyline
+
+    counts = np.diff(offsets)
+    is_duplicate = np.zeros(len(counts), dtype=bool)
+    filled = np.flatnonzero(counts > 0)
+    keys = np.round(points/quantum).astype(np.int64)
+    firsts = keys[offsets[filled]].tolist()
+    lasts = keys[offsets[filled + 1] - 1].tolist()
+
+    candidates = {}
+    for count, first, last in zip(filled.tolist(), firsts, lasts):
+        key = (counts[count], *sorted((tuple(first), tuple(last))))
+        polyline = points[offsets[count]:offsets[count + 1]]
+        for earlier in candidates.get(key, ()):
+            other = points[offsets[earlier]:offsets[earlier + 1]]
+            if (check_identical_polyline(polyline, other)
+                    or check_identical_polyline(polyline, other[::-1])):
+                is_duplicate[count] = True
+                break
+        else:
+            candidates.setdefault(key, []).append(count)
+    return is_duplicate
+
+def _anchored_groups(values, tolerance):
+    # Group id of each of the sorted values, a group takes every value
+    #within tolerance of its first one, so groups never chain
+    if not len(values):
+        return np.zeros(0, dtype=np.intp)
+
+    #Gaps wider than the tolerance always split, only the runs between
+    #them that span more than it are walked
+    starts = np.flatnonzero(np.concatenate(([True],
+                                            np.diff(values) > tolerance)))
+    stops = np.append(starts[1:], len(values))
+    is_start = np.zeros(len(values), dtype=bool)
+    is_start[starts] = True
+    wide = values[stops - 1] - values[starts] > tolerance
+    for first, stop in zip(starts[wide].tolist(), stops[wide].tolist()):
+        end = values[stop - 1]
+        while values[first] + tolerance < end:
+            first = first + np.searchsorted(values[first:stop],
+                                            values[first] + tolerance,
+                                            'right')
+            is_start[first] = True
+    return np.cumsum(is_start) - 1
+
+def _line_clusters(start, end, quantum):
+    '''
+    Line each segment lies on, -1 for segments alone on theirs
+
+    Segments are grouped on their direction, taken modulo pi, within
+    ANGLE_TOLERANCE of the first of the group, and the longest of each
+    group sets the direction all of them are measured along. Segments
+    with both ends within quantum of the same line through that direction
+    share it.
+
+    Returns the line of each segment and the unit direction of each line.
+    '''
+    delta = end - start
+    length = np.hypot(*delta.T)
+    angle = np.mod(np.arctan2(delta[:, 1], delta[:, 0]), np.pi)
+    #Directions just short of pi are the same as those just over 0
+    angle[angle > np.pi - ANGLE_TOLERANCE/2] -= np.pi
+
+    order = np.argsort(angle, kind='stable')
+    direction = np.empty(len(order), dtype=np.intp)
+    direction[order] = _anchored_groups(angle[order], ANGLE_TOLERANCE)
+
+    longest = np.full(direction.max() + 1, -1, dtype=np.intp)
+    by_length = np.argsort(length, kind='stable')
+    longest[direction[by_length]] = by_length
+    unit = delta[longest]/length[longest, None]
+
+    #Offsets of both ends from the line through the origin
+    normal = np.stack((-unit[direction, 1], unit[direction, 0]), axis=1)
+    offset_start = np.einsum('ij,ij->i', start, normal)
+    offset_end = np.einsum('ij,ij->i', end, normal)
+    on_line = np.abs(offset_end - offset_start) <= quantum
+    offset = (offset_start + offset_end)/2
+
+    line = np.full(len(start), -1, dtype=np.intp)
+    candidates = np.flatnonzero(on_line)
+    order = candidates[np.lexsort((offset[candidates],
+                                   direction[candidates]))]
+    if not len(order):
+        return line, unit[:0]
+    #Lines never span two directions, offsets are shifted apart by more
+    #than the tolerance for each one
+    span = offset[order].max() - offset[order].min() + 2*quantum
+    key = offset[order] + span*np.unique(direction[order],
+                                         return_inverse=True)[1]
+    line[order] = _anchored_groups(key, quantum)
+
+    sizes = np.bincount(line[order])
+    line[on_line] = np.where(sizes[line[on_line]] < 2, -1, line[on_line])
+    line_direction = np.zeros(len(sizes), dtype=np.intp)
+    line_direction[line[order]] = direction[order]
+    return line, unit[line_direction]
+
+def _sweep_lines(points, start_index, end_index, line, direction, quantum):
+    '''
+    Replace the segments of every line that overlap another by more than
+    quantum with the stretches between all their ends, each kept once
+
+    Returns which segments are replaced, the pieces that replace them as
+    (start point index, end point index) pairs, and the length covered
+    more than once.
+    '''
+    shared = line >= 0
+    segment = np.flatnonzero(shared)
+    line = line[segment]
+    a, b = start_index[segment], end_index[segment]
+
+    #Position along the shared direction of the line
+    t_a = np.einsum('ij,ij->i', points[a], direction[line])
+    t_b = np.einsum('ij,ij->i', points[b], direction[line])
+    flip = t_a > t_b
+    low_point, high_point = np.where(flip, b, a), np.where(flip, a, b)
+    low, high = np.minimum(t_a, t_b), np.maximum(t_a, t_b)
+
+    #Runs of segments along a line that each overlap the ones before,
+    #tracked by the rank of the highest end so far
+    order = np.lexsort((low, line))
+    segment, line = segment[order], line[order]
+    low_point, high_point = low_point[order], high_point[order]
+    low, high = low[order], high[order]
+    high_rank = np.empty(len(high), dtype=np.int64)
+    high_rank[np.argsort(high, kind='stable')] = np.arange(len(high))
+    reach_rank = np.maximum.accumulate(high_rank + line*len(high))
+    reach = np.sort(high)[reach_rank - line*len(high)]
+    new_run = np.concatenate(([True], (line[1:] != line[:-1])
+                              | (low[1:] >= reach[:-1] - quantum)))
+    run = np.cumsum(new_run) - 1
+    replaced = np.bincount(run)[run] > 1
+
+    is_replaced = np.zeros(len(shared), dtype=bool)
+    is_replaced[segment[replaced]] = True
+    if not replaced.any():
+        return is_replaced, np.zeros((0, 2), dtype=np.intp), 0.0
+
+    #Every replaced segment starts covering its run at its low end and
+    #stops at its high end
+    run = run[replaced]
+    event_point = np.concatenate((low_point[replaced], high_point[replaced]))
+    event_t = np.concatenate((low[replaced], high[replaced]))
+    event_run = np.concatenate((run, run))
+    event_step = np.concatenate((np.ones(len(run), dtype=np.intp),
+                                 -np.ones(len(run), dtype=np.intp)))
+
+    order = np.lexsort((-event_step, event_t, event_run))
+    event_point, event_t = event_point[order], event_t[order]
+    event_run, event_step = event_run[order], event_step[order]
+    coverage = np.cumsum(event_step)
+
+    #Ends within quantum of each other are one breakpoint, its point is
+    #the first end and its coverage the one after the last
+    new_break = np.concatenate(([True], (np.diff(event_t) > quantum)
+                                | (np.diff(event_run) != 0)))
+    breaks = np.flatnonzero(new_break)
+    last = np.concatenate((breaks[1:], [len(event_t)])) - 1
+    break_point = event_point[breaks]
+    break_t = event_t[breaks]
+    break_run = event_run[breaks]
+    break_coverage = coverage[last]
+
+    #No segment ends between consecutive breakpoints, so a stretch that
+    #is covered lies inside every segment covering it
+    piece = np.flatnonzero((break_run[1:] == break_run[:-1])
+                           & (break_coverage[:-1] > 0))
+    removed = float(((break_coverage[piece] - 1)
+                     *(break_t[piece + 1] - break_t[piece])).sum())
+
+    return (is_replaced,
+            np.stack((break_point[piece], break_point[piece + 1]), axis=1),
+            removed)
+
+def dedup_segments(points, offsets, quantum=DEFAULT_QUANTUM):
+    '''
+    Drop duplicated polylines and segments, and the overlapping stretches
+    of collinear segments, of packed polylines
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        (N, 2) points of all polylines.
+    offsets : numpy.ndarray
+        Polyline i is points[offsets[i]:offsets[i+1]].
+    quantum : float, optional
+        Distance in drawing units under which ends are the same point and
+        segments on the same line. The default is DEFAULT_QUANTUM.
+
+    Returns
+    -------
+    points, offsets : numpy.ndarray
+        The polylines left, the arrays given when nothing was removed.
+        Polylines are split where segments were dropped and the kept
+        stretches of overlapping segments are added at the end as two
+        point polylines. Points sharing a cell of the quantum grid are 
+        moved onto the first of them, so the ends of the copies kept meet
+        the ends that met the copies dropped.
+    report : dict
+        Counts of 'duplicate_polylines', 'duplicate_segments' and
+        'overlapping_segments' replaced by their pieces, and the
+        'removed_length' in drawing units.
+
+    '''
+    from onshape2shaper.svg2svg import index_endpoints, quantize_points
+    
+    report = {'duplicate_polylines': 0, 'duplicate_segments': 0,
+              'overlapping_segments': 0, 'removed_length': 0.0}
+    is_duplicate = duplicate_polylines(points, offsets, quantum)
+    if is_duplicate.any():
+        report['duplicate_polylines'] = int(is_duplicate.sum())
+        report['removed_length'] += float(
+            polyline_lengths(points, offsets)[is_duplicate].sum())
+        points, offsets = pack_polylines([
+            polyline for polyline, duplicate 
+            in zip(np.split(points, offsets[1:-1]), is_duplicate)
+            if not duplicate])
+
+    #Segment k joins point k to k + 1, those of zero length are left alone
+    lengths = np.diff(offsets)
+    is_segment = np.ones(len(points), dtype=bool)
+    is_segment[offsets[1:][lengths > 0] - 1] = False
+    segment = np.flatnonzero(is_segment)
+    segment = segment[np.any(points[segment] != points[segment + 1], axis=1)]
+    removed = np.zeros(len(points), dtype=bool)
+    pieces = np.zeros((0, 2), dtype=np.intp)
+
+    if len(segment) > 1:
+        #Ends in a canonical order, so copies either way round match
+        keys = np.round(points/quantum).astype(np.int64)
+        start_index, end_index = segment, segment + 1
+        swap = ((keys[start_index, 0] > keys[end_index, 0])
+                | ((keys[start_index, 0] == keys[end_index, 0])
+                   & (keys[start_index, 1] > keys[end_index, 1])))
+        start_index, end_index = (np.where(swap, end_index, start_index),
+                                  np.where(swap, start_index, end_index))
+
+        _, first = np.unique(np.concatenate((keys[start_index],
+                                             keys[end_index]), axis=1),
+                             axis=0, return_index=True)
+        is_copy = np.ones(len(segment), dtype=bool)
+        is_copy[first] = False
+        if is_copy.any():
+            report['duplicate_segments'] = int(is_copy.sum())
+            report['removed_length'] += float(np.hypot(*(
+                points[end_index[is_copy]]
+                - points[start_index[is_copy]]).T).sum())
+            removed[segment[is_copy]] = True
+
+        unique = ~is_copy
+        line, direction = _line_clusters(points[start_index[unique]],
+                                         points[end_index[unique]], quantum)
+        if (line >= 0).any():
+            is_replaced, pieces, overlap = _sweep_lines(
+                points, start_index[unique], end_index[unique], line,
+                direction, quantum)
+            report['overlapping_segments'] = int(is_replaced.sum())
+            report['removed_length'] += overlap
+            removed[segment[unique][is_replaced]] = True
+
+    if not removed.any() and not report['duplicate_polylines']:
+        return points, offsets, report
+
+    kept = []
+    for start, stop in zip(offsets[:-1].tolist(), offsets[1:].tolist()):
+        if not removed[start:stop - 1].any():
+            kept.append(points[start:stop])
+            continue
+        #Runs of kept segments, split where one was removed
+        run = start
+        for k in np.flatnonzero(removed[start:stop - 1]).tolist():
+            if start + k > run:
+                kept.append(points[run:start + k + 1])
+            run = start + k + 1
+        if stop - 1 > run:
+            kept.append(points[run:stop])
+
+    kept.extend(points[piece] for piece in pieces)
+    points, offsets = pack_polylines(kept)
+    
+    #Copies were matched to within quantum, so the ends of what is left 
+    #are moved onto one point per cell for stitching to join them without
+    #a join tolerance
+    node_ids, first = index_endpoints(quantize_points(points, quantum))
+    return points[first][node_ids], offsets, report
@@ -0,0 +1,426 @@
+'''
+Compact geometry model the conversion pipeline works on
+
+    document = read_document(open('drawing.svg', 'rb'))
+    for record in document.records:
+        record.points, record.offsets
+
+An Onshape SVG is read incrementally and each colour group becomes a
+group_record: its style attributes, the Shaper cut type and depth once
+decoded, and the points of all its polylines in one (N, 2) float64 array
+with the start of each polyline in an offsets array, about 16 bytes per
+vertex. Everything that is not a colour group is kept as parsed and
+written back unchanged, the SVG is only built again when the document is
+written.
+'''
+import enum
+
+import numpy as np
+
+class cut_type(enum.IntEnum):
+    '''
+    Shaper cut types, numbered like the Onshape stroke widths that select
+    them in 0.2mm steps
+    '''
+    interior = 1
+    exterior = 2
+    pocket = 3
+    on_line = 4
+    guide = 5
+    anchor = 6
+
+#Stroke and fill Shaper reads each cut type from
+CUT_FORMATS = {
+    cut_type.interior: ('black', 'white'),
+    cut_type.exterior: ('black', 'black'),
+    cut_type.pocket: ('none', 'grey'),
+    cut_type.on_line: ('grey', 'none'),
+    cut_type.guide: ('blue', 'none'),
+    cut_type.anchor: ('#ff0000', '#ff0000'),
+    }
+
+#Cut type of stroke widths that are missing or not a cut type width
+DEFAULT_CUT = cut_type.on_line
+
+class style_table():
+    '''
+    Cut type and depth of every Onshape style of a document, decoded once
+    
+    Stroke width is the cut type in steps of 0.2mm, from interior at 0.2mm
+    to anchor at 1.2mm. The stroke colour, read as a decimal number, is the
+    depth in 1/10th mm, so #000030 is 3mm deep. Pure red groups are the 
+    anchor. All widths and colours are converted in one pass over the 
+    distinct styles, groups then look their style up.
+    
+    Styles that cannot be fully decoded are listed in problems rather than
+    silently given a default.
+
+    Parameters
+    ----------
+    styles : iterable of tuple
+        (stroke, stroke-width) attribute strings of each group, None where
+        the group has no such attribute.
+    pixels_per_mm : float
+        Scale of the drawing.
+    '''
+    
+    def __init__(self, styles, pixels_per_mm):
+        
+        styles = list(dict.fromkeys(styles))
+        #(cut_type or None, depth in mm or None) of each style
+        self.entries = {}
+        self.problems = []
+        
+        widths = np.array([_to_float(width) for _, width in styles], 
+                          dtype=np.float64).reshape(-1)
+        with np.errstate(invalid='ignore'):
+            types = np.trunc(np.round(widths/pixels_per_mm*10)/2)
+        is_type = (types >= 1) & (types <= len(cut_type))
+        depths = np.array([_to_float(stroke.strip('#')) if stroke else np.nan
+                           for stroke, _ in styles], 
+                          dtype=np.float64).reshape(-1)/10
+        has_depth = np.isfinite(depths)
+        
+        for count, (stroke, width) in enumerate(styles):
+            if stroke is not None and stroke.strip('#') == 'ff0000':
+                self.entries[stroke, width] = (cut_type.anchor, None)
+                continue
+            
+            depth = float(depths[count]) if has_depth[count] else None
+            if depth is None:
+                self._problem(stroke, width, 
+                              'stroke colour does not encode a depth')
+            
+            if width is None:
+                cut = None
+                self._problem(stroke, width, 
+                              'no stroke-width, cut type left unset')
+            elif np.isnan(widths[count]):
+                cut = DEFAULT_CUT
+                self._problem(stroke, width, 
+                              'stroke-width is not a number, cut on line')
+            elif not is_type[count]:
+                cut = DEFAULT_CUT
+                self._problem(stroke, width, 
+                              'stroke-width of {:g}mm is not a cut type, '
+                              'cut on line'.format(
+                                  widths[count]/pixels_per_mm))
+            else:
+                cut = cut_type(int(types[count]))
+                
+            self.entries[stroke, width] = (cut, depth)
+            
+    def _problem(self, stroke, width, problem):
+        self.problems.append({'stroke': stroke, 'stroke-width': width, 
+                              'problem': problem})
+        
+    def lookup(self, stroke, width):
+        '''
+        (cut_type or None, depth in mm or None) of a style in the table
+        '''
+        return self.entries[stroke, width]
+
+def _to_float(value):
+    # NaN for missing or unreadable numbers, so they go through numpy
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+class group_record():
+    '''
+    One colour group: the polylines of every Onshape group of a style, or
+    once stitched, the paths they were joined into
+
+    Parameters
+    ----------
+    attributes : dict
+        Style attributes in xmltodict layout, e.g. {'@stroke': '#000030'}.
+    points : numpy.ndarray
+        (N, 2) points of all polylines, one after the other.
+    offsets : numpy.ndarray
+        Polyline i is points[offsets[i]:offsets[i+1]].
+    is_anchor : bool, optional
+        The group is the Shaper anchor and is written as a polygon. The
+        default is False.
+    '''
+    __slots__ = ('attributes', 'points', 'offsets', 'is_anchor',
+                 'is_stitched', 'cut', 'depth', 'arcs', 'path_data')
+
+    def __init__(self, attributes, points, offsets, is_anchor=False):
+
+        self.attributes = attributes
+        self.points = points
+        self.offsets = offsets
+        self.is_anchor = is_anchor
+        #Set once the polylines are replaced by stitched paths
+        self.is_stitched = False
+        #cut_type and depth in mm, set when the style is decoded
+        self.cut = None
+        self.depth = None
+        #(N, 3) radius and flags of the arc ending at each point once
+        #simplified with arcs, see onshape2shaper.simplify
+        self.arcs = None
+        #Path data of each path when a worker process already formatted
+        #it, or as read from a converted document, None once the points 
+        #change
+        self.path_data = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def polylines(self):
+        '''
+        Views of the points of each polyline, nothing is copied
+        '''
+        if len(self) == 0:
+            return []
+        return np.split(self.points, self.offsets[1:-1])
+
+    def set_polylines(self, polylines):
+        '''
+        Replace the points with these polylines, packed into one array
+        '''
+        self.points, self.offsets = pack_polylines(polylines)
+        self.arcs = None
+        self.path_data = None
+
+    def output_attributes(self):
+        '''
+        Attributes of the group once its cut type is applied
+        '''
+        attributes = dict(self.attributes)
+        if self.is_anchor:
+            del attributes['@stroke']
+            attributes['@fill'] = CUT_FORMATS[cut_type.anchor][1]
+        elif self.cut is not None:
+            attributes['@stroke'], attributes['@fill'] = CUT_FORMATS[self.cut]
+        return attributes
+
+class svg_document():
+    '''
+    A document read by read_document
+
+    Children of the svg and of its outer group are kept in xmltodict
+    layout, as lists of elements by tag in order of first appearance,
+    except for the colour groups which are the records.
+    '''
+    __slots__ = ('attributes', 'children', 'group', 'group_children',
+                 'records')
+
+    def __init__(self):
+
+        self.attributes = {}
+        self.children = {}
+        #Attributes of the outer group, None until it is read
+        self.group = None
+        self.group_children = {}
+        self.records = []
+
+    def counts(self):
+        '''
+        Number of groups, polylines, vertices and paths, for 
+        onshape2shaper.profiling
+        '''
+        counts = {'groups': len(self.records), 'polylines': 0,
+                  'vertices': 0, 'paths': 0}
+        for record in self.records:
+            if record.points is None:
+                continue
+            counts['paths' if record.is_stitched else 'polylines'] \
+                += len(record)
+            counts['vertices'] += len(record.points)
+        return counts
+
+    def nbytes(self):
+        '''
+        Bytes held by the point and offset arrays of the records
+        '''
+        return sum(record.points.nbytes + record.offsets.nbytes
+                   for record in self.records if record.points is not None)
+
+def pack_polylines(polylines):
+    '''
+    Concatenate polylines into one points array and their offsets
+
+    Parameters
+    ----------
+    polylines : list of numpy.ndarray
+        (N, 2) points of each polyline.
+
+    Returns
+    -------
+    points : numpy.ndarray
+        (N, 2) points of all polylines.
+    offsets : numpy.ndarray
+        Polyline i is points[offsets[i]:offsets[i+1]].
+
+    '''
+    offsets = np.zeros(len(polylines) + 1, dtype=np.int64)
+    np.cumsum([len(polyline) for polyline in polylines], out=offsets[1:])
+    if not polylines:
+        return np.empty((0, 2)), offsets
+
+    return np.concatenate(polylines).reshape(-1, 2), offsets
+
+def _append_child(children, name, value):
+    children.setdefault(name, []).append(value)
+
+def read_group(value):
+    '''
+    Record of one colour group as collected by iter_svg_items
+
+    Parameters
+    ----------
+    value : dict or None
+        The group in xmltodict layout, None when it is empty.
+
+    Returns
+    -------
+    group_record
+        The record, its points are None when the group has no polylines.
+        The path data of a group of paths, as in an already converted 
+        document, is kept as its path_data.
+
+    '''
+    from onshape2shaper.svg2svg import STYLE_KEYS, group_points, is_anchor
+
+    if not isinstance(value, dict):
+        value = {}
+    attributes = {key: value[key] for key in value if key in STYLE_KEYS}
+    points, offsets = None, None
+    if 'polyline' in value:
+        points, offsets = group_points(value)
+    record = group_record(attributes, points, offsets, is_anchor(attributes))
+    
+    paths = value.get('path')
+    if points is None and paths is not None:
+        record.path_data = [path['@d'] for path 
+                            in (paths if isinstance(paths, list) else [paths])
+                            if path and '@d' in path]
+    return record
+
+def read_document(source, chunk_size=65536):
+    '''
+    Read an Onshape SVG into an svg_document, one group at a time
+
+    Each group inside the outer group becomes a record holding its style
+    attributes and parsed points. Groups are not merged here, see
+    vector_object.group_styles.
+
+    Parameters
+    ----------
+    source : file
+        Binary file object to read.
+    chunk_size : int, optional
+        Bytes read at a time. The default is 65536.
+
+    Returns
+    -------
+    svg_document
+        The document, records in document order. Groups without polylines
+        get a record whose points are None.
+
+    '''
+    from onshape2shaper.svg2svg import iter_svg_items, _is_stream_item
+
+    document = svg_document()
+
+    for event, path, value in iter_svg_items(source, _is_stream_item,
+                                             chunk_size):
+        depth = len(path)
+
+        if event == 'item' and depth == 3 and path[2] == 'g':
+            document.records.append(read_group(value))
+
+        elif event == 'item' and depth == 3:
+            _append_child(document.group_children, path[-1], value)
+
+        elif event == 'item':
+            _append_child(document.children, path[-1], value)
+
+        elif event == 'start' and depth == 1:
+            document.attributes = value
+
+        elif event == 'start':
+            if document.group is not None:
+                raise ValueError('Expected a single outer group')
+            document.group = value
+            _append_child(document.children, 'g', None)
+
+    #The colour groups are written where the first of them was
+    document.group_children.setdefault('g', [])
+
+    return document
+
+def write_document(document, writer, write_record):
+    '''
+    Write a document with a pretty_xml_writer
+
+    Parameters
+    ----------
+    document : svg_document
+        The document.
+    writer : onshape2shaper.svg2svg.pretty_xml_writer
+        Writer the document is written to.
+    write_record : callable
+        Called with each record to write its groups.
+
+    Returns
+    -------
+    None.
+
+    '''
+    writer.start('svg', document.attributes)
+    for name, values in document.children.items():
+        if name != 'g':
+            for value in values:
+                writer.element(name, value)
+            continue
+
+        writer.start('g', document.group)
+        for child_name, child_values in document.group_children.items():
+            if child_name != 'g':
+                for value in child_values:
+                    writer.element(child_name, value)
+                continue
+
+            #Anchors are written before the paths
+            for record in document.records:
+                if record.is_anchor:
+                    write_record(record)
+            for record in document.records:
+                if not record.is_anchor:
+                    write_record(record)
+        writer.end()
+    writer.end()
+
+def merge_records(records):
+    '''
+    One record holding the polylines of all records with points, in order,
+    styled like the first
+
+    Parameters
+    ----------
+    records : list of group_record
+        Records of one style, the first with points.
+
+    Returns
+    -------
+    group_record
+        The merged record, the first record itself when it is the only one
+        with points.
+
+    '''
+    records = [record for record in records if record.points is not None]
+    first = records[0]
+    if len(records) == 1:
+        return first
+
+    counts = np.concatenate([np.diff(record.offsets) for record in records])
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    return group_record(first.attributes,
+                        np.concatenate([record.points for record in records]),
+                        offsets, first.is_anchor)
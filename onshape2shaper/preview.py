@@ -0,0 +1,199 @@
+'''
+Headless PNG previews of stitched paths
+
+    vector_object(input_path).onshape2shaper(output_path,
+                                             preview_png='preview.png')
+
+Every path is drawn in its own colour straight into a NumPy image buffer
+and the ends of open paths are marked with red dots, so joins that did not
+happen stand out. The PNG is encoded with zlib, nothing needs a display.
+'''
+import struct
+import zlib
+
+import numpy as np
+
+#Colour of the dots on the ends of open paths, path hues avoid it
+ENDPOINT_COLOUR = (230, 0, 0)
+
+def path_colours(n):
+    '''
+    n distinct RGB colours, hues spread by the golden ratio and kept away
+    from red
+
+    Parameters
+    ----------
+    n : int
+        Number of colours.
+
+    Returns
+    -------
+    numpy.ndarray
+        (n, 3) uint8 colours.
+
+    '''
+    hue = 0.15 + 0.7*((np.arange(n)*0.6180339887) % 1)
+    saturation, value = 0.85, 0.8
+
+    sector = np.floor(hue*6)
+    f = hue*6 - sector
+    sector = sector.astype(int) % 6
+    p = value*(1 - saturation)
+    q = value*(1 - saturation*f)
+    t = value*(1 - saturation*(1 - f))
+
+    red = np.choose(sector, [value, q, p, p, t, value])
+    green = np.choose(sector, [t, value, value, q, p, p])
+    blue = np.choose(sector, [p, p, t, value, value, q])
+
+    return np.rint(np.stack((red, green, blue), axis=1)*255).astype(np.uint8)
+
+def render(paths, width=1024, height=None, margin=8, line_width=1,
+           endpoint_radius=3, background=(255, 255, 255)):
+    '''
+    Rasterize paths into an RGB image
+
+    Parameters
+    ----------
+    paths : list of numpy.ndarray
+        (N, 2) points of each path, in SVG coordinates.
+    width : int, optional
+        Image width in pixels. The default is 1024.
+    height : int, optional
+        Image height in pixels. The default of None follows the aspect
+        ratio of the drawing.
+    margin : int, optional
+        Blank pixels around the drawing. The default is 8.
+    line_width : int, optional
+        Line width in pixels. The default is 1.
+    endpoint_radius : int, optional
+        Radius of the dots on the ends of open paths, 0 for none. The
+        default is 3.
+    background : tuple, optional
+        RGB background. The default is white.
+
+    Returns
+    -------
+    numpy.ndarray
+        (height, width, 3) uint8 image.
+
+    '''
+    paths = [path for path in paths if len(path)]
+    lengths = np.array([len(path) for path in paths], dtype=np.intp)
+    points = np.concatenate(paths) if paths else np.zeros((1, 2))
+
+    #Bounds of every path at once
+    low = points.min(axis=0)
+    span = np.maximum(points.max(axis=0) - low, 1e-9)
+
+    inner = max(1, width - 2*margin - 1)
+    if height is None:
+        height = int(np.ceil(inner*span[1]/span[0])) + 2*margin + 1
+        height = min(max(height, 2*margin + 2), 8*width)
+    scale = min(inner/span[0], max(1, height - 2*margin - 1)/span[1])
+
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[...] = background
+    if not paths:
+        return image
+
+    pixels = (points - low)*scale + margin
+    colours = path_colours(len(paths))
+
+    #Segment k joins point k to k + 1 unless k ends a path
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    path_of_point = np.repeat(np.arange(len(paths)), lengths)
+    is_segment = np.ones(len(points), dtype=bool)
+    is_segment[offsets[1:] - 1] = False
+    segments = np.flatnonzero(is_segment)
+
+    start = pixels[segments]
+    delta = pixels[segments + 1] - start
+    steps = np.ceil(np.abs(delta).max(axis=1)).astype(np.intp) + 1
+
+    #Evenly spaced samples along every segment, at least one per pixel
+    owner = np.repeat(np.arange(len(segments)), steps)
+    first = np.repeat(np.cumsum(steps) - steps, steps)
+    t = (np.arange(len(owner)) - first)/np.repeat(np.maximum(steps - 1, 1),
+                                                   steps)
+    samples = start[owner] + delta[owner]*t[:, None]
+    sample_colours = colours[path_of_point[segments]][owner]
+
+    #Paths of a single point are drawn as a dot of their colour
+    single = offsets[:-1][lengths == 1]
+    samples = np.concatenate((samples, pixels[single]))
+    sample_colours = np.concatenate((sample_colours,
+                                     colours[path_of_point[single]]))
+
+    _stamp(image, samples, sample_colours, (line_width - 1)/2)
+
+    if endpoint_radius > 0:
+        first_points = pixels[offsets[:-1]]
+        last_points = pixels[offsets[1:] - 1]
+        is_open = np.any(points[offsets[:-1]] != points[offsets[1:] - 1],
+                         axis=1)
+        ends = np.concatenate((first_points[is_open], last_points[is_open]))
+        _stamp(image, ends, np.array([ENDPOINT_COLOUR], dtype=np.uint8),
+               endpoint_radius)
+
+    return image
+
+def _stamp(image, centres, colours, radius):
+    # Colour every pixel within radius of the centres, clipped to the image
+    reach = int(np.ceil(radius))
+    dy, dx = np.mgrid[-reach:reach + 1, -reach:reach + 1]
+    inside = dx**2 + dy**2 <= max(radius, 0.5)**2
+    dx, dy = dx[inside], dy[inside]
+
+    x = (np.rint(centres[:, 0]).astype(np.intp)[:, None] + dx).ravel()
+    y = (np.rint(centres[:, 1]).astype(np.intp)[:, None] + dy).ravel()
+    colours = np.broadcast_to(colours.reshape(-1, 1, 3),
+                              (len(centres), len(dx), 3)).reshape(-1, 3)
+
+    keep = (x >= 0) & (x < image.shape[1]) & (y >= 0) & (y < image.shape[0])
+    image[y[keep], x[keep]] = colours[keep]
+
+def encode_png(image, level=6):
+    '''
+    Encode an (height, width, 3) uint8 image as PNG bytes
+    '''
+    height, width = image.shape[:2]
+    rows = np.empty((height, width*3 + 1), dtype=np.uint8)
+    #Filter type 0 on every row
+    rows[:, 0] = 0
+    rows[:, 1:] = image.reshape(height, width*3)
+
+    def chunk(tag, data):
+        return (struct.pack('>I', len(data)) + tag + data
+                + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff))
+
+    return b''.join((b'\x89PNG\r\n\x1a\n',
+                     chunk(b'IHDR', struct.pack('>IIBBBBB', width, height,
+                                                8, 2, 0, 0, 0)),
+                     chunk(b'IDAT', zlib.compress(rows.tobytes(), level)),
+                     chunk(b'IEND', b'')))
+
+def write_png(output_path, paths, **options):
+    '''
+    Render paths and write them as a PNG
+
+    Parameters
+    ----------
+    output_path : str, pathlib.Path or file object
+        Where to write the PNG, a file object is left open.
+    paths : list of numpy.ndarray
+        (N, 2) points of each path.
+    **options
+        Passed to render.
+
+    Returns
+    -------
+    None.
+
+    '''
+    data = encode_png(render(paths, **options))
+    if hasattr(output_path, 'write'):
+        output_path.write(data)
+    else:
+        with open(output_path, 'wb') as f:
+            f.write(data)
@@ -0,0 +1,163 @@
+'''
+Stage level timing and memory instrumentation for the conversion pipeline
+
+    report = vector_object(input_path).onshape2shaper(output_path, 
+                                                      profile=True)
+    print(report)
+    report.to_json('report.json')
+
+Every stage records its wall time, the peak memory traced by tracemalloc
+while it ran, and the number of groups, polylines, vertices and paths in 
+the document once it finished.
+'''
+import json
+import time
+import tracemalloc
+
+class stage_record():
+    '''
+    Measurements of one pipeline stage
+    '''
+    __slots__ = ('name', 'seconds', 'peak_bytes', 'groups', 'polylines', 
+                 'vertices', 'paths')
+    
+    def __init__(self, name, seconds, peak_bytes=None, groups=0, 
+                 polylines=0, vertices=0, paths=0):
+        
+        self.name = name
+        self.seconds = seconds
+        self.peak_bytes = peak_bytes
+        self.groups = groups
+        self.polylines = polylines
+        self.vertices = vertices
+        self.paths = paths
+        
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+        
+class conversion_report():
+    '''
+    Stage records of one conversion, in the order the stages ran
+    '''
+    
+    def __init__(self, input_path=None):
+        
+        self.input_path = None if input_path is None else str(input_path)
+        self.stages = []
+        
+    @property
+    def total_seconds(self):
+        return sum(stage.seconds for stage in self.stages)
+    
+    @property
+    def peak_bytes(self):
+        peaks = [stage.peak_bytes for stage in self.stages 
+                 if stage.peak_bytes is not None]
+        return max(peaks) if peaks else None
+    
+    def stage(self, name):
+        '''
+        Record of the first stage called name, None if it did not run
+        '''
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        return None
+    
+    def to_dict(self):
+        return {'input_path': self.input_path,
+                'total_seconds': self.total_seconds,
+                'peak_bytes': self.peak_bytes,
+                'stages': [stage.to_dict() for stage in self.stages]}
+    
+    def to_json(self, path=None, indent=2):
+        '''
+        Serialize the report, and write it to path if one is given
+
+        Parameters
+        ----------
+        path : str or pathlib.Path, optional
+            File to write. The default is None.
+        indent : int, optional
+            JSON indent. The default is 2.
+
+        Returns
+        -------
+        str
+            The JSON text.
+
+        '''
+        text = json.dumps(self.to_dict(), indent=indent)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+    
+    def __str__(self):
+        lines = ['{:<24}{:>10}{:>12}{:>8}{:>11}{:>10}{:>8}'.format(
+            'stage', 'ms', 'peak KiB', 'groups', 'polylines', 'vertices', 
+            'paths')]
+        for stage in self.stages:
+            peak = '-' if stage.peak_bytes is None \
+                else '{:.1f}'.format(stage.peak_bytes/1024)
+            lines.append('{:<24}{:>10.2f}{:>12}{:>8}{:>11}{:>10}{:>8}'.format(
+                stage.name, stage.seconds*1e3, peak, stage.groups, 
+                stage.polylines, stage.vertices, stage.paths))
+        lines.append('{:<24}{:>10.2f}'.format('total', 
+                                              self.total_seconds*1e3))
+        return '\n'.join(lines)
+    
+class stage_profiler():
+    '''
+    Runs pipeline stages and records them into a conversion_report
+
+    Parameters
+    ----------
+    counter : callable
+        Returns a dict of groups, polylines, vertices and paths counts for 
+        the current document, called after each stage.
+    input_path : str or pathlib.Path, optional
+        Recorded in the report. The default is None.
+    trace_memory : bool, optional
+        Record peak memory with tracemalloc, which slows the conversion 
+        down noticeably. The default is True.
+    '''
+    
+    def __init__(self, counter, input_path=None, trace_memory=True):
+        
+        self.counter = counter
+        self.trace_memory = trace_memory
+        self.report = conversion_report(input_path)
+        self._started_tracing = False
+        
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+            
+    def run(self, name, function, *args, **kwargs):
+        '''
+        Call function(*args, **kwargs) as the stage called name
+        '''
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        
+        peak_bytes = None
+        if self.trace_memory:
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+        
+        self.report.stages.append(stage_record(name, seconds, peak_bytes, 
+                                               **self.counter()))
+        return result
+    
+    def finish(self):
+        '''
+        Stop tracing memory if this profiler started it, return the report
+        '''
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return self.report
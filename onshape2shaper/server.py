@@ -0,0 +1,567 @@
+'''
+Long running conversion server with warm worker processes
+
+    onshape2shaper-server --port 8765 --workers 4
+    curl --data-binary @drawing.svg http://127.0.0.1:8765/convert > out.svg
+
+POST /convert converts the SVG in the request body, with vector_object
+options such as ?precision=3&pretty=false in the query string. GET /metrics
+reports request counts, latency histograms and queue depth as JSON, GET
+/health answers ok.
+
+The workers are started, with the conversion modules imported, before the
+server accepts requests. A request waits for a free worker in a bounded
+queue and is turned away with 503 when the queue is full. A worker that
+runs past the request timeout is killed and replaced.
+'''
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from onshape2shaper import __version__
+from onshape2shaper.cli import (add_conversion_arguments, 
+                                check_conversion_arguments, 
+                                conversion_options)
+
+logger = logging.getLogger(__name__)
+
+#Modules the workers import before they are ready
+WARM_MODULES = ('numpy', 'xmltodict', 'xml.sax.saxutils',
+                'onshape2shaper.svg2svg', 'onshape2shaper.model')
+
+#Query string options of POST /convert and their types
+OPTION_TYPES = {'stitcher': str, 'join_tolerance': float, 'precision': int,
+                'relative_paths': bool, 'drop_collinear': bool,
+                'pretty': bool, 'compress': bool, 'order_paths': bool,
+                'simplify': float, 'fit_arcs': bool, 
+                'normalize_winding': bool, 'dedup': bool}
+
+#Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+                   30, 60)
+
+def _worker_main(connection):
+    # Convert (data, options) messages until None or the pipe closes
+    import importlib
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for module in WARM_MODULES:
+        importlib.import_module(module)
+    from onshape2shaper.svg2svg import convert
+
+    connection.send('ready')
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+
+        data, options = message
+        try:
+            result = ('ok', convert(data, **options))
+        except Exception as error:
+            result = ('error', '{}: {}'.format(type(error).__name__, error))
+        connection.send(result)
+
+def _context():
+    # forkserver forks workers from a clean process with the modules
+    # already imported, spawn where it is not available
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(list(WARM_MODULES))
+        return context
+    return multiprocessing.get_context('spawn')
+
+class worker_pool():
+    '''
+    Pre-started conversion processes, each handling one request at a time
+
+    Parameters
+    ----------
+    workers : int, optional
+        Number of worker processes. The default is the number of CPUs.
+    timeout : float, optional
+        Seconds a request may wait for a worker and be converted in. The
+        default is 60.
+    queue_size : int, optional
+        Requests that may wait for a free worker, more are refused with
+        queue.Full. The default is 16.
+    '''
+
+    def __init__(self, workers=None, timeout=60, queue_size=16):
+
+        self.size = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.queue_size = queue_size
+        self.context = _context()
+
+        self.idle = queue.Queue()
+        self.processes = set()
+        self.restarts = 0
+        self.waiting = 0
+        self.busy = 0
+        self._lock = threading.Lock()
+        #Requests either converting or waiting for a worker
+        self._slots = threading.BoundedSemaphore(self.size + queue_size)
+
+        for _ in range(self.size):
+            self.idle.put(self._start())
+
+    def _start(self):
+        parent, child = self.context.Pipe()
+        process = self.context.Process(target=_worker_main, args=(child,),
+                                       daemon=True)
+        process.start()
+        child.close()
+
+        try:
+            ready = parent.recv() == 'ready'
+        except EOFError:
+            ready = False
+        if not ready:
+            process.join()
+            raise RuntimeError('conversion worker failed to start')
+        with self._lock:
+            self.processes.add(process)
+        return process, parent
+
+    def _stop(self, worker):
+        process, connection = worker
+        process.kill()
+        process.join()
+        connection.close()
+        with self._lock:
+            self.processes.discard(process)
+
+    def _replace(self, worker):
+        self._stop(worker)
+        with self._lock:
+            self.restarts += 1
+        self.idle.put(self._start())
+
+    def convert(self, data, options=None):
+        '''
+        Convert an SVG in a worker
+
+        Parameters
+        ----------
+        data : bytes
+            The Onshape SVG.
+        options : dict, optional
+            Passed to svg2svg.convert. The default is None.
+
+        Raises
+        ------
+        queue.Full
+            Too many requests are already waiting.
+        TimeoutError
+            No worker became free, or the conversion did not finish,
+            within the timeout.
+        ValueError
+            The conversion failed, with the worker's error message.
+        RuntimeError
+            The worker died.
+
+        Returns
+        -------
+        bytes
+            The Shaper SVG.
+
+        '''
+        if not self._slots.acquire(blocking=False):
+            raise queue.Full('{} requests already queued'.format(
+                self.queue_size))
+        try:
+            deadline = time.monotonic() + self.timeout
+            worker = self._acquire(deadline)
+            return self._run(worker, data, options or {}, deadline)
+        finally:
+            self._slots.release()
+
+    def _acquire(self, deadline):
+        with self._lock:
+            self.waiting += 1
+        try:
+            return self.idle.get(timeout=max(0, deadline - time.monotonic()))
+        except queue.Empty:
+            raise TimeoutError('no worker was free within {}s'.format(
+                self.timeout)) from None
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def _run(self, worker, data, options, deadline):
+        process, connection = worker
+        if deadline <= time.monotonic():
+            self.idle.put(worker)
+            raise TimeoutError('no worker was free within {}s'.format(
+                self.timeout))
+        
+        with self._lock:
+            self.busy += 1
+        try:
+            try:
+                connection.send((data, options))
+                reply = None
+                if connection.poll(max(0, deadline - time.monotonic())):
+                    reply = connection.recv()
+            except (EOFError, OSError):
+                self._replace(worker)
+                raise RuntimeError('conversion worker exited') from None
+
+            if reply is None:
+                self._replace(worker)
+                raise TimeoutError('conversion took longer than {}s'.format(
+                    self.timeout))
+            self.idle.put(worker)
+        finally:
+            with self._lock:
+                self.busy -= 1
+
+        status, result = reply
+        if status == 'error':
+            raise ValueError(result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {'workers': self.size, 'busy': self.busy,
+                    'queue_depth': self.waiting,
+                    'queue_size': self.queue_size,
+                    'restarts': self.restarts}
+
+    def close(self):
+        '''
+        Stop every worker, idle ones are asked to exit first
+        '''
+        while True:
+            try:
+                process, connection = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+            process.join(1)
+            self._stop((process, connection))
+
+        with self._lock:
+            remaining = list(self.processes)
+        for process in remaining:
+            process.kill()
+            process.join()
+
+class server_metrics():
+    '''
+    Request counts by endpoint and status, and a latency histogram per
+    endpoint
+    '''
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+
+        self.buckets = buckets
+        self.started = time.time()
+        self.requests = {}
+        self.latency = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, status, seconds, bytes_in=0, bytes_out=0):
+        with self._lock:
+            counts = self.requests.setdefault(endpoint, {})
+            counts[status] = counts.get(status, 0) + 1
+
+            histogram = self.latency.setdefault(
+                endpoint, {'counts': [0]*(len(self.buckets) + 1),
+                           'sum': 0.0})
+            index = 0
+            while index < len(self.buckets) and seconds > self.buckets[index]:
+                index += 1
+            histogram['counts'][index] += 1
+            histogram['sum'] += seconds
+
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    def snapshot(self):
+        '''
+        The metrics as a dict, histogram buckets are cumulative counts of
+        requests that took at most that many seconds
+        '''
+        with self._lock:
+            latency = {}
+            for endpoint, histogram in self.latency.items():
+                cumulative = 0
+                buckets = {}
+                for bound, count in zip(self.buckets + ('+Inf',),
+                                        histogram['counts']):
+                    cumulative += count
+                    buckets[str(bound)] = cumulative
+                latency[endpoint] = {'buckets': buckets,
+                                     'count': cumulative,
+                                     'sum': histogram['sum']}
+
+            return {'uptime': time.time() - self.started,
+                    'requests': {endpoint: {str(status): count
+                                            for status, count in
+                                            counts.items()}
+                                 for endpoint, counts in
+                                 self.requests.items()},
+                    'latency_seconds': latency,
+                    'bytes_in': self.bytes_in,
+                    'bytes_out': self.bytes_out}
+
+def parse_options(query, defaults=None):
+    '''
+    Conversion options from a query string, over the server defaults
+
+    Raises
+    ------
+    ValueError
+        Unknown option or a value of the wrong type.
+    '''
+    options = dict(defaults or {})
+    for name, value in parse_qsl(query, keep_blank_values=True):
+        if name not in OPTION_TYPES:
+            raise ValueError('unknown option {!r}'.format(name))
+        if OPTION_TYPES[name] is bool:
+            if value.lower() not in ('', '1', 'true', 'yes', 'on', '0',
+                                     'false', 'no', 'off'):
+                raise ValueError('{} must be true or false'.format(name))
+            options[name] = value.lower() in ('', '1', 'true', 'yes', 'on')
+        else:
+            try:
+                options[name] = OPTION_TYPES[name](value)
+            except ValueError:
+                raise ValueError('{} must be a {}'.format(
+                    name, OPTION_TYPES[name].__name__)) from None
+    return options
+
+class conversion_handler(BaseHTTPRequestHandler):
+
+    server_version = 'onshape2shaper/' + __version__
+
+    def do_GET(self):
+        start = time.perf_counter()
+        path = urlsplit(self.path).path
+
+        if path == '/metrics':
+            metrics = self.server.metrics.snapshot()
+            metrics['pool'] = self.server.pool.stats()
+            status = self._reply(200, json.dumps(metrics, indent=2).encode(),
+                                 'application/json')
+        elif path == '/health':
+            status = self._reply(200, b'ok\n')
+        else:
+            status = self._reply(404, b'not found\n')
+
+        self.server.metrics.observe(path if status != 404 else 'other',
+                                    status, time.perf_counter() - start)
+
+    def do_POST(self):
+        start = time.perf_counter()
+        url = urlsplit(self.path)
+        length = 0
+        body = b''
+
+        try:
+            if url.path != '/convert':
+                raise _reply_error(404, 'not found')
+            length = self._content_length()
+            try:
+                options = parse_options(url.query, self.server.options)
+            except ValueError as error:
+                raise _reply_error(400, str(error)) from None
+            data = self.rfile.read(length)
+
+            body = self.server.pool.convert(data, options)
+            headers = {}
+            if options.get('compress'):
+                headers['Content-Encoding'] = 'gzip'
+            status = self._reply(200, body, 'image/svg+xml', headers)
+
+        except _reply_error as error:
+            status = self._reply(error.status, error.message + '\n')
+        except queue.Full as error:
+            status = self._reply(503, 'busy: {}\n'.format(error),
+                                 headers={'Retry-After': '1'})
+        except TimeoutError as error:
+            status = self._reply(504, 'timeout: {}\n'.format(error))
+        except ValueError as error:
+            #The worker could not convert the document
+            status = self._reply(422, '{}\n'.format(error))
+        except RuntimeError as error:
+            status = self._reply(500, '{}\n'.format(error))
+
+        self.server.metrics.observe('/convert' if url.path == '/convert'
+                                    else 'other', status,
+                                    time.perf_counter() - start,
+                                    length, len(body))
+
+    def _content_length(self):
+        value = self.headers.get('Content-Length')
+        if value is None:
+            raise _reply_error(411, 'Content-Length required')
+        try:
+            length = int(value)
+        except ValueError:
+            raise _reply_error(400, 'bad Content-Length') from None
+        if length < 0:
+            raise _reply_error(400, 'bad Content-Length')
+        if length > self.server.max_bytes:
+            # The body is not read, so the connection cannot be reused
+            self.close_connection = True
+            raise _reply_error(413, 'request larger than {} bytes'.format(
+                self.server.max_bytes))
+        return length
+
+    def _reply(self, status, body, content_type='text/plain; charset=utf-8',
+               headers=None):
+        if isinstance(body, str):
+            body = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        return status
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        logger.info('%s - %s', self.address_string(), format % args)
+
+class _reply_error(Exception):
+    # An HTTP error reply raised while checking a request
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def _configure(server, pool, max_bytes, options):
+    server.pool = pool
+    server.metrics = server_metrics()
+    server.max_bytes = max_bytes
+    server.options = dict(options or {})
+
+class conversion_server(ThreadingHTTPServer):
+    '''
+    HTTP conversion server on a TCP address, see the module docstring
+
+    Parameters
+    ----------
+    address : tuple
+        (host, port) to listen on, port 0 picks a free one.
+    pool : worker_pool
+        Workers the requests are converted in.
+    max_bytes : int, optional
+        Largest request body accepted. The default is 32 MiB.
+    options : dict, optional
+        Default vector_object options. The default is None.
+    '''
+
+    daemon_threads = True
+
+    def __init__(self, address, pool, max_bytes=32 << 20, options=None):
+
+        _configure(self, pool, max_bytes, options)
+        super().__init__(address, conversion_handler)
+
+class unix_conversion_server(socketserver.ThreadingMixIn,
+                             socketserver.UnixStreamServer):
+    '''
+    The conversion server on a Unix socket, a stale socket file at path is
+    replaced
+    '''
+
+    daemon_threads = True
+
+    def __init__(self, path, pool, max_bytes=32 << 20, options=None):
+
+        _configure(self, pool, max_bytes, options)
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, conversion_handler)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='onshape2shaper-server',
+        description='Serve Onshape to Shaper SVG conversions over HTTP.')
+
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765,
+                        help='port to listen on (default: 8765)')
+    parser.add_argument('--unix', default=None, metavar='PATH',
+                        help='listen on this Unix socket instead')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                        help='worker processes (default: number of CPUs)')
+    parser.add_argument('--queue-size', type=int, default=16,
+                        help='requests that may wait for a worker '
+                             '(default: 16)')
+    parser.add_argument('--timeout', type=float, default=60,
+                        help='seconds per request (default: 60)')
+    parser.add_argument('--max-size', type=float, default=32, metavar='MB',
+                        help='largest request accepted (default: 32)')
+    add_conversion_arguments(parser)
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    check_conversion_arguments(parser, args)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    pool = worker_pool(args.workers, args.timeout, args.queue_size)
+    max_bytes = int(args.max_size*(1 << 20))
+    options = conversion_options(args)
+    try:
+        if args.unix:
+            server = unix_conversion_server(args.unix, pool, max_bytes,
+                                            options)
+        else:
+            server = conversion_server((args.host, args.port), pool,
+                                       max_bytes, options)
+    except OSError:
+        pool.close()
+        raise
+
+    logger.info('serving on %s with %d workers',
+                args.unix or 'http://{}:{}'.format(*server.server_address),
+                pool.size)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.close()
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
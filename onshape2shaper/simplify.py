@@ -0,0 +1,433 @@
+'''
+Simplify stitched paths within a tolerance
+
+    vector_object(input_path, simplify=0.05,
+                  fit_arcs=True).onshape2shaper(output_path)
+
+Onshape writes arcs and splines as many short segments. With fit_arcs, runs
+of points that stay within the tolerance of a circle, along the whole of
+every segment, are written as one SVG arc command. The straight runs left
+are reduced with Ramer-Douglas-Peucker, which splits every run of every
+path at the same time: each level of the recursion is one numpy pass over
+all the intervals still being split.
+
+Simplified paths only keep original points, so how far they stray from the
+original geometry is measured exactly by max_deviation.
+'''
+import math
+
+import numpy as np
+
+#Columns of the arc array: centre x, centre y, radius, large arc and sweep
+#flags, and the largest distance of the original segments from the arc. Row
+#k describes the arc ending at point k, NaN where none does
+ARC_COLUMNS = 6
+
+def segment_distances(points, start, end):
+    '''
+    Distance of each point to the segment from the matching start to end
+    point
+
+    Parameters
+    ----------
+    points, start, end : numpy.ndarray
+        (N, 2) points and segment ends, row by row.
+
+    Returns
+    -------
+    numpy.ndarray
+        (N,) distances.
+
+    '''
+    direction = end - start
+    length_sq = np.einsum('ij,ij->i', direction, direction)
+    t = np.einsum('ij,ij->i', points - start, direction)
+    t = np.clip(np.divide(t, length_sq, out=np.zeros_like(t),
+                          where=length_sq > 0), 0, 1)
+    nearest = start + direction*t[:, None]
+    return np.hypot(*(points - nearest).T)
+
+def douglas_peucker(points, low, high, tolerance, keep=None):
+    '''
+    Ramer-Douglas-Peucker over many runs of points at once
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        (N, 2) points.
+    low, high : numpy.ndarray
+        First and last index of each run.
+    tolerance : float
+        Largest distance a removed point may be from the simplified run.
+    keep : numpy.ndarray, optional
+        (N,) mask to add the kept points to. The default is a new one.
+
+    Returns
+    -------
+    numpy.ndarray
+        (N,) True for the points kept.
+
+    '''
+    if keep is None:
+        keep = np.zeros(len(points), dtype=bool)
+    low = np.asarray(low, dtype=np.intp)
+    high = np.asarray(high, dtype=np.intp)
+    keep[low] = True
+    keep[high] = True
+
+    while True:
+        is_open = high - low > 1
+        low, high = low[is_open], high[is_open]
+        if not len(low):
+            return keep
+
+        # Every point strictly inside every interval, with its interval
+        counts = high - low - 1
+        owner = np.repeat(np.arange(len(low)), counts)
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        index = np.arange(len(owner)) - first + low[owner] + 1
+
+        distances = segment_distances(points[index], points[low[owner]],
+                                      points[high[owner]])
+
+        # Furthest point of each interval, the first one on ties
+        furthest = np.maximum.reduceat(distances, np.cumsum(counts) - counts)
+        candidates = np.flatnonzero(distances == furthest[owner])
+        _, first_candidate = np.unique(owner[candidates], return_index=True)
+        split = index[candidates[first_candidate]]
+
+        is_split = furthest > tolerance
+        split = split[is_split]
+        keep[split] = True
+        low, high = (np.concatenate((low[is_split], split)),
+                     np.concatenate((split, high[is_split])))
+
+def _curving_runs(points, start, stop, max_turn=math.pi/4):
+    # Runs (first, last) of points inside which every vertex turns the
+    #same way by a small angle, the only places an arc can fit
+    if stop - start < 2:
+        return []
+
+    before = points[start + 1:stop] - points[start:stop - 1]
+    after = points[start + 2:stop + 1] - points[start + 1:stop]
+    cross = before[:, 0]*after[:, 1] - before[:, 1]*after[:, 0]
+    dot = np.einsum('ij,ij->i', before, after)
+    turn = np.arctan2(cross, dot)
+
+    sign = np.where((np.abs(turn) < max_turn) & (cross != 0),
+                    np.sign(cross), 0)
+    runs = []
+    k = 0
+    while k < len(sign):
+        if sign[k] == 0:
+            k += 1
+            continue
+        end = k
+        while end + 1 < len(sign) and sign[end + 1] == sign[k]:
+            end += 1
+        # Vertices k..end are start + 1 + k.., the run includes the ends
+        runs.append((start + k, start + end + 2))
+        k = end + 1
+    return runs
+
+def _arc(points, first, last, tolerance):
+    '''
+    Circle through the ends and middle of points[first:last + 1], if every
+    point and every segment between them is within tolerance of it
+
+    Returns (centre x, centre y, radius, large, sweep, deviation) or None.
+    '''
+    run = points[first:last + 1]
+    x0, y0 = run[0].tolist()
+    bx, by = run[len(run)//2].tolist()
+    cx, cy = run[-1].tolist()
+    bx, by, cx, cy = bx - x0, by - y0, cx - x0, cy - y0
+
+    d = 2*(bx*cy - by*cx)
+    if d == 0:
+        return None
+    b_sq = bx*bx + by*by
+    c_sq = cx*cx + cy*cy
+    centre = ((cy*b_sq - by*c_sq)/d + x0, (bx*c_sq - cx*b_sq)/d + y0)
+    radius = math.hypot(x0 - centre[0], y0 - centre[1])
+
+    offset = run - centre
+    deviation = np.abs(np.hypot(offset[:, 0], offset[:, 1]) - radius).max()
+    if deviation > tolerance:
+        return None
+
+    # Points must go round the centre one way, less than a full turn
+    steps = np.arctan2(offset[:-1, 0]*offset[1:, 1] 
+                       - offset[:-1, 1]*offset[1:, 0],
+                       offset[:-1, 0]*offset[1:, 0] 
+                       + offset[:-1, 1]*offset[1:, 1])
+    if not (steps.min() > 0 or steps.max() < 0):
+        return None
+    sweep_angle = abs(steps.sum())
+    if sweep_angle >= 2*math.pi - 1e-6:
+        return None
+
+    # The arc bulges away from each original segment by its sagitta
+    sagitta = radius*(1 - math.cos(np.abs(steps).max()/2))
+    deviation = max(deviation, sagitta)
+    if deviation > tolerance:
+        return None
+
+    return (centre[0], centre[1], radius, float(sweep_angle > math.pi),
+            float(steps[0] > 0), float(deviation))
+
+def fit_arcs(points, start, stop, tolerance, min_points=4):
+    '''
+    Greedily cover points[start:stop + 1] with arcs, each as long as it can
+    be while within tolerance
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        (N, 2) points.
+    start, stop : int
+        First and last index of one path.
+    tolerance : float
+        Largest distance the arc may be from the original segments.
+    min_points : int, optional
+        Fewest points an arc replaces. The default is 4.
+
+    Returns
+    -------
+    list of tuple
+        (first, last, centre x, centre y, radius, large, sweep, deviation)
+        of each arc, in order.
+
+    '''
+    arcs = []
+    for run_start, run_stop in _curving_runs(points, start, stop):
+        # Runs curving opposite ways share the segment between them
+        first = max(run_start, arcs[-1][1]) if arcs else run_start
+        while run_stop - first >= min_points - 1:
+            good = None
+            step = min_points - 1
+            # Grow the arc by doubling, then bisect for its end
+            while True:
+                last = min(first + step, run_stop)
+                fitted = _arc(points, first, last, tolerance)
+                if fitted is None:
+                    bad = last
+                    break
+                good = (last, fitted)
+                if last == run_stop:
+                    bad = run_stop + 1
+                    break
+                step *= 2
+
+            if good is None:
+                first += 1
+                continue
+
+            low = good[0]
+            while bad - low > 1:
+                middle = (low + bad)//2
+                fitted = _arc(points, first, middle, tolerance)
+                if fitted is None:
+                    bad = middle
+                else:
+                    low = middle
+                    good = (middle, fitted)
+
+            arcs.append((first,) + good[:1] + good[1])
+            first = good[0]
+    return arcs
+
+def simplify_points(points, offsets, tolerance, arcs=False):
+    '''
+    Simplify packed paths
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        (N, 2) points of all paths.
+    offsets : numpy.ndarray
+        Path i is points[offsets[i]:offsets[i+1]].
+    tolerance : float
+        Largest distance from the original geometry.
+    arcs : bool, optional
+        Replace runs of points with arcs where they fit. The default is
+        False.
+
+    Returns
+    -------
+    keep : numpy.ndarray
+        (N,) True for the points kept.
+    arc_array : numpy.ndarray
+        (N, ARC_COLUMNS) arc ending at each point, NaN rows for lines.
+
+    '''
+    arc_array = np.full((len(points), ARC_COLUMNS), np.nan)
+    low = []
+    high = []
+    for start, stop in zip(offsets[:-1].tolist(), (offsets[1:] - 1).tolist()):
+        if stop < start:
+            continue
+
+        fitted = fit_arcs(points, start, stop, tolerance) if arcs else []
+
+        # Straight runs are what is left between the arcs
+        previous = start
+        for first, last, *arc in fitted:
+            low.append(previous)
+            high.append(first)
+            arc_array[last] = arc
+            previous = last
+        low.append(previous)
+        high.append(stop)
+
+    keep = douglas_peucker(points, low, high, tolerance)
+
+    return keep, arc_array
+
+def max_deviation(points, offsets, keep, arc_array):
+    '''
+    Largest distance of an original point from the simplified paths
+
+    Every point lies between two kept points, its distance is taken to the
+    segment or arc joining them. Arcs also bulge away from the original
+    segments between the points, by as much as fit_arcs recorded.
+
+    Parameters
+    ----------
+    points, offsets : numpy.ndarray
+        The original paths, see simplify_points.
+    keep, arc_array : numpy.ndarray
+        Returned by simplify_points.
+
+    Returns
+    -------
+    float
+        The deviation, 0 when nothing was removed.
+
+    '''
+    if not len(points):
+        return 0.0
+
+    index = np.arange(len(points))
+    previous = np.maximum.accumulate(np.where(keep, index, 0))
+    following = np.minimum.accumulate(
+        np.where(keep, index, len(points) - 1)[::-1])[::-1]
+
+    distances = segment_distances(points, points[previous],
+                                  points[following])
+
+    arc = arc_array[following]
+    on_arc = ~np.isnan(arc[:, 2]) & ~keep
+    distances[on_arc] = np.abs(np.hypot(*(points[on_arc]
+                                          - arc[on_arc, :2]).T)
+                               - arc[on_arc, 2])
+
+    deviation = distances.max()
+    if np.any(on_arc):
+        deviation = max(deviation, np.nanmax(arc_array[:, 5]))
+    return float(deviation)
+
+def arc_points(start, end, radius, large, sweep, max_step=math.pi/36):
+    '''
+    Points along an SVG arc command with equal radii and no rotation, as
+    written by format_arc_paths
+
+    Parameters
+    ----------
+    start, end : array_like
+        Points the arc goes from and to.
+    radius : float
+        Radius, scaled up as SVG does when too small to reach the end.
+    large, sweep : float
+        Large arc and sweep flags.
+    max_step : float, optional
+        Largest angle in radians between points. The default is 5 degrees.
+
+    Returns
+    -------
+    numpy.ndarray
+        (N, 2) points after start, the last one end.
+
+    '''
+    start = np.asarray(start, dtype=np.float64)
+    end = np.asarray(end, dtype=np.float64)
+    chord = end - start
+    half = math.hypot(*chord)/2
+    if half == 0 or radius == 0:
+        return end[None]
+
+    radius = max(abs(radius), half)
+    # Centre on the bisector of the chord, on the side the flags pick
+    middle = (start + end)/2
+    normal = np.array((-chord[1], chord[0]))/(2*half)
+    distance = math.sqrt(max(radius*radius - half*half, 0))
+    if bool(large) == bool(sweep):
+        distance = -distance
+    centre = middle + normal*distance
+
+    first = math.atan2(*(start - centre)[::-1])
+    turn = math.atan2(*(end - centre)[::-1]) - first
+    if sweep and turn < 0:
+        turn += 2*math.pi
+    elif not sweep and turn > 0:
+        turn -= 2*math.pi
+
+    steps = max(1, math.ceil(abs(turn)/max_step))
+    angle = first + turn*np.arange(1, steps + 1)/steps
+    points = centre + radius*np.stack((np.cos(angle), np.sin(angle)), axis=1)
+    points[-1] = end
+    return points
+
+def format_arc_paths(points, offsets, arc_array, precision=2):
+    '''
+    Path data of packed paths, with an A command for every point an arc
+    ends at and L for the rest. Coordinates are absolute, closed paths end
+    in z as in format_paths.
+
+    Parameters
+    ----------
+    points, offsets : numpy.ndarray
+        Packed paths.
+    arc_array : numpy.ndarray
+        (N, 3) radius, large arc and sweep flags of the arc ending at each
+        point, radius 0 for a line.
+    precision : int, optional
+        Decimal places. The default is 2.
+
+    Returns
+    -------
+    list of str
+        Path data for each path.
+
+    '''
+    pair = '%.{0}f,%.{0}f'.format(precision)
+    arc = 'A' + pair + ' 0 %d,%d ' + pair
+
+    templates = []
+    values = []
+    for start, stop in zip(offsets[:-1].tolist(), offsets[1:].tolist()):
+        if stop == start:
+            templates.append('')
+            continue
+
+        commands = ['M' + pair]
+        values.extend(points[start].tolist())
+        after_arc = False
+        for k in range(start + 1, stop):
+            x, y = points[k].tolist()
+            radius, large, sweep = arc_array[k].tolist()
+            if radius > 0:
+                commands.append(arc)
+                values.extend((radius, radius, large, sweep, x, y))
+                after_arc = True
+            else:
+                commands.append('L' + pair if after_arc else pair)
+                values.extend((x, y))
+                after_arc = False
+
+        template = ' '.join(commands)
+        if np.array_equal(points[start], points[stop - 1]):
+            template += 'z'
+        templates.append(template)
+
+    return ('\n'.join(templates) % tuple(values)).split('\n')
@@ -1,42 +1,496 @@
-import xmltodict
-import copy
+import contextlib
+import gzip
+import io
+import logging
+import pathlib
 import re
+from xml.parsers import expat
 
-import networkx as nx
-from collections import OrderedDict
 
 import numpy as np
 
+logger = logging.getLogger(__name__)
+
+#Attributes polylines are grouped by, everything else is dropped
+STYLE_KEYS = ("@stroke", "@fill", "@stroke-width")
+
+#Options stream_onshape2shaper does not implement, it raises ValueError
+STREAM_UNSUPPORTED = ('order_paths', 'simplify', 'fit_arcs', 
+                      'normalize_winding', 'dedup')
+
 class vector_object():
     
-    def __init__(self, input_path):
+    def __init__(self, input_path, stitcher='native', join_tolerance=None,
+                 precision=2, relative_paths=False, drop_collinear=False,
+                 group_cache=None, pretty=True, order_paths=False,
+                 simplify=None, fit_arcs=False, normalize_winding=False,
+                 dedup=False):
         
         self.input_path = input_path
+        self.stitcher = stitcher
+        #Distance in mm under which polyline endpoints are joined
+        self.join_tolerance = join_tolerance
+        self.snap_report = []
+        #Styles decode_styles could not fully decode
+        self.style_report = []
+        
+        #Path data options, see format_paths
+        self.precision = precision
+        self.relative_paths = relative_paths
+        self.drop_collinear = drop_collinear
+        
+        #Optional onshape2shaper.cache.group_cache of stitched groups
+        self.group_cache = group_cache
+        self.group_stats = {'reused': 0, 'stitched': 0}
+        
+        #Indented output like xmltodict.unparse(pretty=True), else compact
+        self.pretty = pretty
+        
+        #Reorder paths to cut down travel, see order_toolpath
+        self.order_paths = order_paths
+        self.travel_report = None
+        
+        #Tolerance in mm paths are simplified to, see simplify_paths
+        self.simplify = simplify
+        self.fit_arcs = fit_arcs
+        if fit_arcs and (relative_paths or drop_collinear):
+            raise ValueError('fit_arcs writes absolute path data, it cannot '
+                             'be combined with relative_paths or '
+                             'drop_collinear')
+        self.simplify_report = None
+        
+        #Reverse contours wound the wrong way for their nesting, see 
+        #validate_paths
+        self.normalize_winding = normalize_winding
+        self.validation_report = None
+        
+        #Drop duplicated and overlapping segments, see dedup_groups
+        self.dedup = dedup
+        self.dedup_report = None
+        
+        #The svg attributes, for the stages that read them
         self.svg_dict = {}
-        self.original_svg_dict = {}
-        self.vector_grouped_dict = {}
-        self.polylines = []
-        self.removed_polyline_index = []
+        #onshape2shaper.model.svg_document onshape2shaper works on
+        self.document = None
         
         self.pixels_per_mm = 5
         self.is_shaper_added = False
         
-    def read_svg(self):
+    def read_document(self):
+        '''
+        Read the SVG from the input path, or file object, into the compact
+        model of onshape2shaper.model. The svg attributes are also made 
+        available as svg_dict for the stages that read them.
+
+        Returns
+        -------
+        None.
+
+        '''
+        from onshape2shaper.model import read_document
+        
+        with open_input(self.input_path, 'rb') as f:
+            self.document = read_document(f)
+            
+        self.svg_dict = {'svg': self.document.attributes}
+        
+    def group_styles(self):
+        '''
+        Merge the records of groups sharing a stroke, fill and stroke width,
+        in order of first appearance. A style is only kept when its first 
+        group has polylines.
+
+        Returns
+        -------
+        None.
+
+        '''
+        from onshape2shaper.model import merge_records
+        
+        styles = {}
+        kept = []
+        for record in self.document.records:
+            key = style_key(record.attributes)
+            if key in styles:
+                styles[key].append(record)
+                continue
+            
+            styles[key] = [record]
+            if record.points is not None:
+                kept.append(styles[key])
+                
+        self.document.records = [merge_records(records) for records in kept]
+        
+    def dedup_groups(self):
+        '''
+        Drop the polylines and segments of every record that repeat others,
+        and keep the stretches where collinear segments overlap once, see 
+        onshape2shaper.dedup. Ends within the join tolerance are the same
+        point, or within onshape2shaper.dedup.DEFAULT_QUANTUM without one.
+        
+        What was dropped, with the removed length in mm, is kept in 
+        dedup_report.
+
+        Returns
+        -------
+        None.
+
+        '''
+        from onshape2shaper.dedup import DEFAULT_QUANTUM, dedup_segments
+        
+        quantum = self._join_tolerance_px() or DEFAULT_QUANTUM
+        report = {'duplicate_polylines': 0, 'duplicate_segments': 0, 
+                  'overlapping_segments': 0, 'removed_length': 0.0}
+        for record in self.document.records:
+            if record.is_anchor or record.points is None:
+                continue
+            
+            record.points, record.offsets, removed = dedup_segments(
+                record.points, record.offsets, quantum)
+            for key, value in removed.items():
+                report[key] += value
+        
+        report['removed_length'] /= self.pixels_per_mm
+        self.dedup_report = report
+        logger.info('Dropped %d duplicate polyline(s) and %d duplicate '
+                    'segment(s), split %d overlapping segment(s), removing '
+                    '%.1fmm', report['duplicate_polylines'], 
+                    report['duplicate_segments'], 
+                    report['overlapping_segments'], 
+                    report['removed_length'])
+        
+    def stitch_groups(self, workers=None):
+        '''
+        Stitch the polylines of every record into paths. Anchors are 
+        cleaned down to their three corners.
+
+        Parameters
+        ----------
+        workers : int, optional
+            Stitch the groups in this many worker processes. The default 
+            of None stitches them one by one in this process.
+
+        Returns
+        -------
+        None.
+
+        '''
+        records = self.document.records
+        
+        if workers and workers > 1:
+            self._stitch_records_parallel(records, workers)
+        else:
+            for record in records:
+                self._finish_record(record, self.to_merge_polylines(
+                    record.attributes, record.points, record.offsets))
+        
+        if self.group_cache is not None:
+            logger.info('Reused %d group(s), stitched %d', 
+                        self.group_stats['reused'], 
+                        self.group_stats['stitched'])
+            
+    def _stitch_records_parallel(self, records, workers):
+        '''
+        Stitch the path records in a process pool, which also formats 
+        their path data, anchors and cached groups in this process. Results
+        are taken in record order.
+        '''
+        import concurrent.futures
+        
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) \
+          as pool:
+            futures = {}
+            for count, record in enumerate(records):
+                if record.is_anchor:
+                    continue
+                key = self._group_key(record.attributes, record.points, 
+                                      record.offsets)
+                merged_polylines = self._cached_group(record.attributes, key)
+                if merged_polylines is not None:
+                    self._finish_record(record, merged_polylines)
+                    continue
+                
+                futures[count] = (key, pool.submit(
+                    stitch_points, record.points, record.offsets, 
+                    self.stitcher, self._join_tolerance_px(), 
+                    self.precision, self.relative_paths, 
+                    self.drop_collinear))
+                
+            for count, record in enumerate(records):
+                if record.is_anchor:
+                    self._finish_record(record, self.to_merge_polylines(
+                        record.attributes, record.points, record.offsets))
+                elif count in futures:
+                    key, future = futures[count]
+                    (record.points, record.offsets, snaps, 
+                     record.path_data) = future.result()
+                    record.is_stitched = True
+                    self._record_snaps(record.attributes, snaps)
+                    self._store_group(key, snaps, record.polylines())
+        
+    def _finish_record(self, record, merged_polylines):
+        if record.is_anchor:
+            #If Shaper orgin start accepting multiple, this check can be 
+            #removed
+            if len(merged_polylines) > 1:
+                raise Exception(
+                    "Shaper currently accepts only one custom anchor")
+            merged_polylines = [clean_anchor(polyline) 
+                                for polyline in merged_polylines]
+            
+        record.set_polylines(merged_polylines)
+        record.is_stitched = True
+        
+    def decode_styles(self):
+        '''
+        Resolve the Shaper cut type and depth of every record from a table
+        of the document's styles, see onshape2shaper.model.style_table. 
+        The attributes are rewritten when the document is written.
+
+        Returns
+        -------
+        None.
+
+        '''
+        records = self.document.records
+        table = self._style_table([(record.attributes.get('@stroke'),
+                                    record.attributes.get('@stroke-width'))
+                                   for record in records])
+        
+        for record in records:
+            record.cut, depth = table.lookup(
+                record.attributes.get('@stroke'), 
+                record.attributes.get('@stroke-width'))
+            if not record.is_anchor and self.is_shaper_added:
+                record.depth = depth
+                
+    def validate_paths(self):
+        '''
+        Check the stitched paths, see onshape2shaper.validation: open paths
+        in interior, exterior and pocket groups, paths of those groups 
+        crossing themselves or each other, and closed contours wound the 
+        wrong way for how deeply they are nested. Crossings involving 
+        other cuts, such as on-line ones, are kept as line_crossings 
+        warnings. With normalize_winding those contours are
+        reversed. Guides and the anchor are not checked.
+        
+        The findings are kept in validation_report.
+
+        Returns
+        -------
+        None.
+
+        '''
+        from onshape2shaper.model import cut_type
+        from onshape2shaper.validation import CLOSED_CUTS, misoriented, \
+            nesting_depths, open_paths, segment_intersections, \
+            signed_areas, validation_report
+        
+        report = validation_report(self.input_path)
+        checked = []
+        for count, record in enumerate(self.document.records):
+            report.groups.append({
+                'stroke': record.attributes.get('@stroke'),
+                'stroke-width': record.attributes.get('@stroke-width'),
+                'cut': None if record.cut is None else record.cut.name,
+                'depth': record.depth})
+            if (not record.is_anchor and record.points is not None 
+                    and record.cut != cut_type.guide):
+                checked.append(count)
+        
+        records = [self.document.records[count] for count in checked]
+        lengths = [np.diff(record.offsets) for record in records]
+        offsets = np.zeros(sum(map(len, lengths)) + 1, dtype=np.int64)
+        if records:
+            np.cumsum(np.concatenate(lengths), out=offsets[1:])
+            points = np.concatenate([record.points for record in records])
+        else:
+            points = np.empty((0, 2))
+        group = np.repeat(checked, [len(record) for record in records])
+        path = np.concatenate([np.arange(len(record)) for record in records] 
+                              or [np.zeros(0, dtype=np.intp)])
+        report.paths = len(group)
+        
+        is_open = open_paths(points, offsets)
+        needs_closed = np.repeat([record.cut in CLOSED_CUTS 
+                                  for record in records], 
+                                 [len(record) for record in records])
+        for index in np.flatnonzero(is_open & needs_closed).tolist():
+            report.open_paths.append({
+                'group': int(group[index]), 'path': int(path[index]),
+                'start': points[offsets[index]].tolist(),
+                'end': points[offsets[index + 1] - 1].tolist()})
+            
+        for a, b, point in zip(*segment_intersections(points, offsets)):
+            if not (needs_closed[a] and needs_closed[b]):
+                report.line_crossings.append({
+                    'groups': [int(group[a]), int(group[b])], 
+                    'paths': [int(path[a]), int(path[b])], 
+                    'point': point.tolist()})
+            elif a == b:
+                report.self_intersections.append({
+                    'group': int(group[a]), 'path': int(path[a]), 
+                    'point': point.tolist()})
+            else:
+                report.intersections.append({
+                    'groups': [int(group[a]), int(group[b])], 
+                    'paths': [int(path[a]), int(path[b])], 
+                    'point': point.tolist()})
+                
+        depths = nesting_depths(points, offsets, ~is_open)
+        wrong = misoriented(signed_areas(points, offsets), depths)
+        reverse = {}
+        for index in np.flatnonzero(wrong).tolist():
+            report.winding.append({
+                'group': int(group[index]), 'path': int(path[index]),
+                'depth': int(depths[index]), 
+                'reversed': bool(self.normalize_winding)})
+            reverse.setdefault(int(group[index]), []).append(
+                int(path[index]))
+            
+        if self.normalize_winding:
+            for count, paths in reverse.items():
+                record = self.document.records[count]
+                polylines = record.polylines()
+                for index in paths:
+                    polylines[index] = polylines[index][::-1]
+                record.set_polylines(polylines)
+        
+        self.validation_report = report
+        if report.is_valid:
+            logger.info('Validated %s', report)
+        else:
+            logger.warning('Validated %s', report)
+        
+    def order_toolpath(self):
         '''
-        Read an SVG from the input path, convert it to dictionary
+        Order the records inside out and shallow before deep, and the paths
+        of each to cut down the travel between them, see 
+        onshape2shaper.toolpath. The tool starts at the drawing's origin 
+        and carries on from the end of each record into the next.
+        
+        The travel before and after, in mm, is kept in travel_report.
 
         Returns
         -------
         None.
 
         '''
-        # Step 1: Read the SVG file
-        with open(self.input_path, 'r') as f:
-            svg_string = f.read()
+        from onshape2shaper.toolpath import cut_rank, order_paths, \
+            travel_distance
+        
+        anchors = [record for record in self.document.records 
+                   if record.is_anchor]
+        records = [record for record in self.document.records 
+                   if not record.is_anchor]
+        before = travel_distance([path for record in records 
+                                  for path in record.polylines()])
+        
+        records.sort(key=lambda record: cut_rank(record.cut, record.depth))
+        position = (0, 0)
+        for record in records:
+            paths = record.polylines()
+            order, reverse = order_paths(paths, position)
+            paths = [paths[count][::-1] if flip else paths[count] 
+                     for count, flip in zip(order, reverse)]
+            record.set_polylines(paths)
+            if len(record.points):
+                position = tuple(record.points[-1].tolist())
+                
+        self.document.records = anchors + records
+        after = travel_distance([path for record in records 
+                                 for path in record.polylines()])
+        
+        self.travel_report = {'paths': sum(len(record) for record in records),
+                              'before': before/self.pixels_per_mm, 
+                              'after': after/self.pixels_per_mm}
+        logger.info('Travel between %d path(s) cut from %.1fmm to %.1fmm', 
+                    self.travel_report['paths'], 
+                    self.travel_report['before'], 
+                    self.travel_report['after'])
+        
+    def simplify_paths(self):
+        '''
+        Drop points of every path that are within simplify mm of the path 
+        without them, and with fit_arcs write runs of points that follow a
+        circle as arcs, see onshape2shaper.simplify.
+        
+        The vertices and path data bytes before and after, the arcs fitted 
+        and the largest distance in mm of an original point from the 
+        simplified paths are kept in simplify_report.
+
+        Returns
+        -------
+        None.
+
+        '''
+        from onshape2shaper.simplify import max_deviation, simplify_points
+        
+        tolerance = self.simplify*self.pixels_per_mm
+        report = {'vertices_before': 0, 'vertices_after': 0, 
+                  'bytes_before': 0, 'bytes_after': 0, 'arcs': 0, 
+                  'max_deviation': 0.0}
+        for record in self.document.records:
+            if record.is_anchor or record.points is None:
+                continue
+            
+            report['vertices_before'] += len(record.points)
+            report['bytes_before'] += sum(map(len, self._path_strings(record)))
+            
+            keep, arcs = simplify_points(record.points, record.offsets, 
+                                         tolerance, self.fit_arcs)
+            deviation = max_deviation(record.points, record.offsets, keep, 
+                                      arcs)
+            report['max_deviation'] = max(report['max_deviation'], 
+                                          deviation/self.pixels_per_mm)
+            
+            kept = np.concatenate(([0], np.cumsum(keep)))
+            record.points = record.points[keep]
+            record.offsets = kept[record.offsets]
+            record.path_data = None
+            if self.fit_arcs:
+                record.arcs = np.nan_to_num(arcs[keep, 2:5])
+                report['arcs'] += int(np.count_nonzero(record.arcs[:, 0]))
+            
+            report['vertices_after'] += len(record.points)
+            report['bytes_after'] += sum(map(len, self._path_strings(record)))
+            
+        self.simplify_report = report
+        logger.info('Simplified %d to %d vertices and %d to %d path bytes '
+                    'with %d arc(s), at most %.4fmm from the original', 
+                    report['vertices_before'], report['vertices_after'], 
+                    report['bytes_before'], report['bytes_after'], 
+                    report['arcs'], report['max_deviation'])
+        
+    def _path_strings(self, record):
+        '''
+        Path data of each path of a record
+        '''
+        if record.path_data is not None:
+            return record.path_data
+        elif record.arcs is not None:
+            from onshape2shaper.simplify import format_arc_paths
+            
+            return format_arc_paths(record.points, record.offsets, 
+                                    record.arcs, self.precision)
+        return format_paths(record.polylines(), self.precision,
+                            self.relative_paths, self.drop_collinear)
+        
+    def _style_table(self, styles):
+        '''
+        Decode the distinct styles once, logging and keeping in 
+        style_report those that could not be fully decoded
+        '''
+        from onshape2shaper.model import style_table
+        
+        table = style_table(styles, self.pixels_per_mm)
+        for problem in table.problems:
+            logger.warning('Style stroke=%s stroke-width=%s: %s', 
+                           problem['stroke'], problem['stroke-width'], 
+                           problem['problem'])
+        self.style_report.extend(table.problems)
         
-        # Step 2: Parse the SVG file using xmltodict
-        self.svg_dict = xmltodict.parse(svg_string)
-        self.original_svg_dict = copy.deepcopy(self.svg_dict)
+        return table
         
     def _add_shaper_xmlns(self):
         self.svg_dict['svg']['@xmlns:shaper']\
@@ -65,358 +519,754 @@ class vector_object():
             
         else:
             height_in_mm = match[0]
-            height_in_pixels = float(string2numpy(
-                self.svg_dict['svg']['@viewBox'])[3])
+            height_in_pixels = parse_numbers(
+                self.svg_dict['svg']['@viewBox'])[3]
             
             self.pixels_per_mm = height_in_pixels/height_in_mm
         
-    def polyline_to_path(self):
-        '''
-        Take all polylines in the dictionary, convert them to paths
+    def to_merge_polylines(self, group, points, offsets):
+        key = self._group_key(group, points, offsets)
+        merged_polylines = self._cached_group(group, key)
+        if merged_polylines is not None:
+            return merged_polylines
         
-        Returns
-        -------
-        None.
-
-        '''
-        cleaned_dicts = remove_at_keys(copy.deepcopy(self.svg_dict))
-        for _dict in enumerate(zip(cleaned_dicts['svg']['g']['g'], 
-                         self.svg_dict['svg']['g']['g'])):
-            if _dict[1][0]:
-                
-                entity_type = list(_dict[1][0].keys())[0]
-                stroke_colour = _dict[1][1]['@stroke']
-                if (entity_type == 'polyline')\
-                  and (stroke_colour.strip('#') == 'ff0000'):
-                        
-                    merged_polylines = self.to_merge_polylines(_dict)
-                    
-                    self.to_anchor(_dict, merged_polylines)
-                
-                elif entity_type == 'polyline':
-                    
-                    merged_polylines = self.to_merge_polylines(_dict)
-                    self.to_paths(_dict, merged_polylines)
-                    
-        for index in sorted(self.removed_polyline_index, reverse=True):
-            del self.svg_dict['svg']['g']['g'][index]
-            
-    def to_merge_polylines(self, _dict):
-        polyline_list = _dict[1][1]['polyline']
-        polyline_list_cleaned = _dict[1][0]['polyline']
-        polyline_matricies = []
-        if type(polyline_list) != list:
-            polyline_list = [polyline_list]
-            
-        for (points_dict, 
-             points_dict_cleaned) in zip(polyline_list, 
-                                         polyline_list_cleaned):
-                                         
-            if points_dict_cleaned:
-                polyline_matricies.append(string2numpy(points_dict['@points']))
-                
         #Merged polyline is the ordered list to make into a path
-        merged_polylines = order_polylines(polyline_matricies)
+        merged_polylines, snaps = merge_polylines(
+            np.split(points, offsets[1:-1]), self.stitcher, 
+            self._join_tolerance_px())
+        self._record_snaps(group, snaps)
+        self._store_group(key, snaps, merged_polylines)
         
         return merged_polylines
+    
+    def _group_key(self, group, points, offsets):
+        if self.group_cache is None:
+            return None
         
-    def to_paths(self, _dict, merged_polylines):
-        empty_group_dict = OrderedDict([('@d', None)])
-        
-        for path in merged_polylines:
-            
-            path_string = numpy2pathstring(path)
-            
-            new_dict = copy.deepcopy(_dict[1][1])
-            del new_dict["polyline"]
-            new_dict['path'] = copy.deepcopy(empty_group_dict)
-            
-            new_dict['path']['@d'] = path_string
-            
-            self.svg_dict['svg']['g']['g'].append(new_dict)
-        
-        self.removed_polyline_index.append(_dict[0])
-        
-    def to_anchor(self, _dict, merged_polylines):
-        
-        self.svg_dict['svg']['g']['g'][_dict[0]]['polygon']=[]
-        
-        #If Shaper orgin start accepting multiple, this check can be removed
-        if len(merged_polylines) > 1:
-            raise Exception("Shaper currently accepts only one custom anchor")
-            
-        for polyline in merged_polylines:
-            cleaned_polyline = clean_anchor(polyline)
-            
-
-            # Create a new 'polygon' dictionary with the desired attributes
-            polygon_dict = {
-                '@points': to_points_string(cleaned_polyline),
-                '@fill': '#ff0000'
-            }
-            
-            # Replace the 'polyline' dictionary with the 'polygon' dictionary
-            self.svg_dict['svg']['g']['g'][_dict[0]]['polygon'].append(polygon_dict)
-            
-        del self.svg_dict['svg']['g']['g'][_dict[0]]['polyline']
-            
+        return self.group_cache.key(points, offsets, style_key(group),
+                                    (self.stitcher, 
+                                     self._join_tolerance_px()))
     
-    def sort_colours(self):
-        global groups, idx
+    def _cached_group(self, group, key):
         '''
-        Identify all polylines with the same properties, and merge them
-
-        Returns
-        -------
-        groups : TYPE
-            DESCRIPTION.
-        idxs : TYPE
-            DESCRIPTION.
-
+        Stitched polylines of an unchanged group, None if it needs stitching
         '''
-        self.svg_dict['svg']['g']['g'] = filter_dict_keys(self.svg_dict['svg']['g']['g'], 'polyline')
-        groups, idxs = get_grouped_dicts(self.svg_dict['svg']['g']['g'], 'polyline')
+        if key is None:
+            return None
         
-        self.svg_dict['svg']['g']['g'] = []
+        cached = self.group_cache.get(key)
+        if cached is None:
+            return None
         
-        for i, group in enumerate(groups):
-            if (len(group) > 1) and ('polyline' in group[0].keys()):
-                merged_group = copy.deepcopy(group[0])
-                merged_group['polyline'] = merge_dicts_with_polyline(group)
-                self.svg_dict['svg']['g']['g'].append(merged_group)
-            elif (len(group) == 1) and ('polyline' in group[0].keys()):
-                self.svg_dict['svg']['g']['g'].append(group[0])
+        merged_polylines, snaps = cached
+        self._record_snaps(group, snaps)
+        self.group_stats['reused'] += 1
         
-        return groups, idxs
-            
-    def tosvg(self, output_path):
+        return merged_polylines
+    
+    def _store_group(self, key, snaps, merged_polylines=None):
+        self.group_stats['stitched'] += 1
+        if key is not None:
+            self.group_cache.put(key, merged_polylines, snaps)
+    
+    def _join_tolerance_px(self):
+        if self.join_tolerance:
+            return self.join_tolerance*self.pixels_per_mm
+        return None
+    
+    def _record_snaps(self, group, snaps):
+        if snaps is None:
+            return
+        
+        self.snap_report.append({'stroke': group.get('@stroke'),
+                                 'stroke-width': group.get('@stroke-width'),
+                                 'snaps': snaps})
+        logger.info('Snapped %d endpoint(s) in group stroke=%s '
+                    'stroke-width=%s', snaps, group.get('@stroke'),
+                    group.get('@stroke-width'))
+        
+    def tosvg(self, output_path, pretty=None, compress=None):
         '''
-        export the xml back to svg
+        export the document back to svg
+        
+        The document is serialized once and written in a single binary 
+        write.
 
         Parameters
         ----------
-        output_path : TYPE
-            DESCRIPTION.
+        output_path : str or pathlib.Path
+            Where to write the SVG.
+        pretty : bool, optional
+            Indent the output, compact when False. The default is None, 
+            which uses self.pretty.
+        compress : bool, optional
+            Write gzip compressed SVG. The default is None, which compresses
+            when output_path ends in .svgz.
 
         Returns
         -------
         None.
 
         '''
-        
-        xml_str = xmltodict.unparse(self.svg_dict, pretty=True)
-        
-        # Write the XML string to a file with .svg extension
-        with open(output_path, 'w') as f:
-            f.write(xml_str)
+        if pretty is None:
+            pretty = self.pretty
             
-    def decode_format(self):
+        self._write_document(output_path, pretty, compress)
+            
+    def _write_document(self, output_path, pretty, compress):
         '''
-        re-format translating from OnShape to colours to shaper depth and cut
-
-        Returns
-        -------
-        None.
-
+        Serialize the model, then write it in a single binary write
         '''
-        #line width is type
-            #0.2mm - inside
-            #0.4mm - outside
-            #0.6mm - pocket
-            #0.8mm - on-line
-            #1.0mm - Guide
-            #1.2mm - Anchor
+        from onshape2shaper.model import write_document
         
+        sink = io.StringIO()
+        writer = pretty_xml_writer(sink, pretty=pretty)
+        write_document(self.document, writer, 
+                       lambda record: self._write_record(writer, record))
         
-        #line colour is depth
-            #color in hex is in 1/10th mm
+        with open_output(output_path, compress) as f:
+            f.write(sink.getvalue().encode('utf-8'))
             
-        #IMPORTANT! Depth should be first because color is used and will be 
-        #changed after because shaper uses color to define cut type
-        
-        #Define the Shaper Formats
-        formats = {
-            'interior': {'fill': 'white', 'stroke': 'black'},
-            'exterior': {'fill': 'black', 'stroke': 'black'},
-            'pocket': {'fill': 'grey', 'stroke': 'none'},
-            'on line': {'fill': 'none', 'stroke': 'grey'},
-            'guide': {'fill': 'none', 'stroke': 'blue'},
-            'anchor': {'fill': '#ff0000', 'stroke': '#ff0000'},
-            }
+    def _write_record(self, writer, record):
+        '''
+        Write the anchor group of a record, or one group per path
+        '''
+        attributes = record.output_attributes()
         
+        if record.is_anchor:
+            writer.start('g', attributes)
+            for polygon in record.polylines():
+                writer.start('polygon', {
+                    '@points': to_points_string(polygon, self.precision),
+                    '@fill': '#ff0000'})
+                writer.end()
+            writer.end()
+            return
         
-        for count, _dict in enumerate(self.svg_dict['svg']['g']['g']):
-            if '@stroke' in _dict:
-                colour = _dict['@stroke']
-                colour = colour.strip('#')
-                
-                try:
-                    depth = float(colour)/10
-                    
-                    if 'path' in self.svg_dict['svg']['g']['g'][count]\
-                        and self.is_shaper_added:
-                        self.svg_dict['svg']['g']['g'][count]['path']['@shaper:cutDepth'] \
-                            = str(depth) + 'mm'
-                        
-                except:
-                    pass
-                    
-            if colour.strip('#') == 'ff0000':
-                _type = 6
-                
-                key = list(formats.keys())[_type-1]
-                
-                del self.svg_dict['svg']['g']['g'][count]['@stroke'] #\
-                    #= formats[key]['stroke']
-                self.svg_dict['svg']['g']['g'][count]['@fill'] \
-                    = formats[key]['fill']
-                
-            elif '@stroke-width' in _dict:
-                _type = int(round((float(_dict['@stroke-width'])\
-                                   /self.pixels_per_mm)*10)/2)
-                
-                if (_type < 1) or (_type > 6):
-                    _type = 4
-                
-                key = list(formats.keys())[_type-1]
-                
-                self.svg_dict['svg']['g']['g'][count]['@stroke'] \
-                    = formats[key]['stroke']
-                self.svg_dict['svg']['g']['g'][count]['@fill'] \
-                    = formats[key]['fill']
-                
-                '''
-                #at some point return stroke width to normal
-                self.svg_dict['svg']['g']['g'][count]['@stroke'] \
-                    = formats[key]['stroke']
-                '''
-                
+        path_strings = self._path_strings(record)
+        path = {}
+        if record.depth is not None:
+            path['@shaper:cutDepth'] = str(record.depth) + 'mm'
+            
+        for path_string in path_strings:
+            writer.start('g', attributes)
+            writer.start('path', {'@d': path_string, **path})
+            writer.end()
+            writer.end()
+            
     def remove_default_stroke(self):
-        del self.svg_dict['svg']['g']['@stroke']
-    
-    def flatten_groups(self):
-        self.svg_dict = {**self.svg_dict, **self.svg_dict['svg']['g']['g']}
+        del self.document.group['@stroke']
     
-    def _remove_boarder(self):
+    def plot_paths_rand_color(self, output_path):
         '''
-        remove the rectangle OnShape outputs automatically but is not part of sketch
+        Plot the paths in distinct colours to make sure the joins happen 
+        where expected. Written as a PNG preview, see preview, so nothing
+        waits on a display.
+
+        Parameters
+        ----------
+        output_path : str, pathlib.Path or file object
+            Where to write the PNG.
 
         Returns
         -------
         None.
 
         '''
-        for count, _dict in enumerate(self.svg_dict['svg']['g']['g']):
-            if 'rect' in _dict:
-                del self.svg_dict['svg']['g']['g'][count]
-                break
-            
-    def _list_single_polylines(self):
-        for count, _dict in enumerate(self.svg_dict['svg']['g']['g']):
-            if 'polyline' in _dict:
-                if type(_dict['polyline']) is OrderedDict:
-                    self.svg_dict['svg']['g']['g'][count]['polyline'] = \
-                        [self.svg_dict['svg']['g']['g'][count]['polyline']]
-    
-    def plot_paths_rand_color(self):
+        self.preview(output_path)
+        
+    def preview(self, output_path, **options):
         '''
-        plot lines with random colors to make sure the joins happen where expected
+        Write a PNG of the paths without a display, each path in its own 
+        colour and the ends of open paths marked in red
+        
+        The stitched arrays are drawn when they were kept, otherwise the 
+        path data is parsed.
+
+        Parameters
+        ----------
+        output_path : str, pathlib.Path or file object
+            Where to write the PNG.
+        **options
+            Passed to onshape2shaper.preview.render, e.g. width.
 
         Returns
         -------
         None.
 
         '''
-        import matplotlib.pyplot as plt
-        from  matplotlib.lines import Line2D
+        from onshape2shaper.preview import write_png
         
-        paths = []
-        for _dict in self.svg_dict['svg']['g']['g']:
-            if 'path' in _dict:
-                paths.append(_dict)
+        write_png(output_path, self._stitched_paths(), **options)
         
-        # Create a figure and axis
-        fig, ax = plt.subplots()
-        
-        max_x = None
-        min_x = None
+    def _stitched_paths(self):
+        '''
+        Points of every path in the model. Arcs are sampled from their path
+        data, as are the paths of an already converted document, which 
+        only has path data
+        '''
+        paths = []
+        for record in self.document.records:
+            if record.is_anchor:
+                continue
+            if record.points is not None and record.arcs is None:
+                paths.extend(record.polylines())
+            elif record.points is not None or record.path_data is not None:
+                paths.extend(map(parse_path, self._path_strings(record)))
+        return paths
         
-        max_y = None
-        min_y = None
+    def onshape2shaper(self, output_path, plot_line_checker=False, 
+                       workers=None, profile=False, profile_json=None,
+                       compress=None, preview_png=None, validate=False,
+                       validation_json=None):
+        '''
+        A one liner to call methods in order
         
-        # Plot each path
-        for path_data in paths:
-            path_str = path_data['path']["@d"]
+        The document is read into the compact model of 
+        onshape2shaper.model, every stage works on its records and the SVG
+        is only built again by tosvg.
+
+        Parameters
+        ----------
+        output_path : TYPE
+            DESCRIPTION.
+        plot_line_checker : bool, optional
+            Also write the preview beside output_path, with a .png suffix,
+            see plot_paths_rand_color. output_path must then be a path. The
+            default is False.
+        workers : int, optional
+            Stitch and serialize the colour groups in this many worker 
+            processes, see stitch_groups. The default is None.
+        profile : bool, optional
+            Time each stage, trace its peak memory and count the document
+            after it, see onshape2shaper.profiling. The default is False.
+        profile_json : str or pathlib.Path, optional
+            Write the profile report to this JSON file, implies profile. 
+            The default is None.
+        compress : bool, optional
+            Write gzip compressed SVG, see tosvg. The default is None.
+        preview_png : str, pathlib.Path or file object, optional
+            Also write a PNG preview of the paths, see preview. The default
+            is None.
+        validate : bool, optional
+            Check the stitched paths into validation_report, see 
+            validate_paths. This also runs when normalize_winding is set.
+            The default is False.
+        validation_json : str or pathlib.Path, optional
+            Write the validation report to this JSON file, implies 
+            validate. The default is None.
+
+        Returns
+        -------
+        onshape2shaper.profiling.conversion_report or None
+            The stage report when profiling.
+
+        '''
+        profiler = None
+        run = _run_stage
+        if profile or profile_json:
+            from onshape2shaper.profiling import stage_profiler
+            
+            profiler = stage_profiler(self._counts, self.input_path)
+            run = profiler.run
             
-            path_str = path_str.strip('M')
-            path_str = path_str.strip('z')
+        try:
+            run('read_document', self.read_document)
+            run('_get_pixels_per_mm', self._get_pixels_per_mm)
+            run('_add_shaper_xmlns', self._add_shaper_xmlns)
+            run('group_styles', self.group_styles)
+            if self.dedup:
+                run('dedup_groups', self.dedup_groups)
             
-            col = (np.random.random(), np.random.random(), np.random.random())
+            run('stitch_groups', self.stitch_groups, workers)
+            run('decode_styles', self.decode_styles)
+            if validate or validation_json or self.normalize_winding:
+                run('validate_paths', self.validate_paths)
+                if validation_json:
+                    self.validation_report.to_json(validation_json)
+            if self.order_paths:
+                run('order_toolpath', self.order_toolpath)
+            if self.simplify:
+                run('simplify_paths', self.simplify_paths)
             
-            path = string2numpy(path_str)
-            path_patch = Line2D(path[:, 0], path[:, 1], color=col)
+            run('remove_default_stroke', self.remove_default_stroke)
             
-            ax.add_line(path_patch)
+            run('tosvg', self.tosvg, output_path, None, compress)
             
-            if max_x == None:
-                max_x = np.max(path[:, 0])
-            if min_x == None:
-                min_x = np.min(path[:, 0])
-            if max_y == None:
-                max_y = np.max(path[:, 1])
-            if min_y == None:
-                min_y = np.min(path[:, 1])
+            if preview_png:
+                run('preview', self.preview, preview_png)
             
-            if np.max(path[:, 0]) > max_x:
-                max_x = np.max(path[:, 0])
-            if np.min(path[:, 0]) < min_x:
-                min_x = np.min(path[:, 0])
-            if np.max(path[:, 1]) > max_y:
-                max_y = np.max(path[:, 1])
-            if np.min(path[:, 1]) < min_y:
-                min_y = np.min(path[:, 1])
+            if plot_line_checker:
+                run('plot_paths_rand_color', self.plot_paths_rand_color, 
+                    pathlib.Path(output_path).with_suffix('.png'))
+        finally:
+            #Memory tracing must not outlive a stage that raised
+            if profiler is not None:
+                report = profiler.finish()
+        
+        if profiler is None:
+            return None
         
-        ax.set_xlim(max_x*1.1, min_x - np.abs(min_x*0.1))
-        ax.set_ylim(max_y*1.1, min_y - np.abs(min_y*0.1))
+        if profile_json:
+            report.to_json(profile_json)
+        return report
         
-        # Show the plot
-        plt.show()
+    def _counts(self):
+        return self.document.counts()
         
-    def onshape2shaper(self, output_path, plot_line_checker=False):
+    def stream_onshape2shaper(self, output_path, chunk_size=65536, 
+                              compress=None):
         '''
-        A one liner to call methods in order
+        Convert without holding the whole document in memory. The input is
+        parsed incrementally and each run of consecutive <g> groups sharing
+        a stroke, fill and stroke width is read into records, put through 
+        the same stages as onshape2shaper as soon as the run ends, then 
+        written out. Peak memory is bounded by the largest run rather than
+        the drawing.
+        
+        Onshape writes each style as one group so the output matches 
+        onshape2shaper, except that groups of the same style which are not
+        next to each other are stitched separately and anchors are written
+        in document order. The options in STREAM_UNSUPPORTED are not 
+        implemented here and raise ValueError.
 
         Parameters
         ----------
-        output_path : TYPE
-            DESCRIPTION.
-        plot_line_checker : TYPE, optional
-            DESCRIPTION. The default is False.
+        output_path : str or pathlib.Path
+            Where to write the Shaper SVG.
+        chunk_size : int, optional
+            Bytes read from the input at a time. The default is 65536.
+        compress : bool, optional
+            Write gzip compressed SVG. The default is None, which compresses
+            when output_path ends in .svgz.
 
         Returns
         -------
         None.
 
         '''
-        self.read_svg()
-        self._get_pixels_per_mm()
-        self._add_shaper_xmlns()
-        self._list_single_polylines()
-        self.sort_colours()
-
-        self.polyline_to_path()
-        self._remove_boarder()
-        self.decode_format()
+        from onshape2shaper.model import read_group, svg_document
+        
+        unsupported = [name for name in STREAM_UNSUPPORTED 
+                       if getattr(self, name)]
+        if unsupported:
+            raise ValueError('{} cannot be combined with streaming'.format(
+                ', '.join(unsupported)))
+        
+        run = []
+        run_key = None
+        self.document = svg_document()
+        
+        with open_input(self.input_path, 'rb') as source, \
+             open_output(output_path, compress) as output:
+            #Detached at the end so a caller's sink is not closed with it
+            sink = io.TextIOWrapper(output, encoding='utf-8', newline='\n')
+            writer = pretty_xml_writer(sink, pretty=self.pretty)
+            try:
+                for event, path, value in iter_svg_items(source, 
+                                                         _is_stream_item,
+                                                         chunk_size):
+                    depth = len(path)
+                
+                    if event == 'item' and depth == 3 and path[1] == 'g' \
+                      and path[2] == 'g':
+                        record = read_group(value)
+                        if run and style_key(record.attributes) != run_key:
+                            self._write_run(writer, run)
+                            run = []
+                        run.append(record)
+                        run_key = style_key(record.attributes)
+                    
+                    elif event == 'item':
+                        writer.element(path[-1], value)
+                    
+                    elif event == 'start':
+                        if depth == 1:
+                            self.document.attributes = value
+                            self.svg_dict = {'svg': value}
+                            self._get_pixels_per_mm()
+                            self._add_shaper_xmlns()
+                        elif depth == 2 and path[1] == 'g':
+                            self.document.group = value
+                            self.remove_default_stroke()
+                        writer.start(path[-1], value)
+                    
+                    elif event == 'end':
+                        if run:
+                            self._write_run(writer, run)
+                            run = []
+                        writer.end()
+            finally:
+                sink.detach()
+                    
+    def _write_run(self, writer, records):
+        '''
+        Run the record stages on a document holding only these records, 
+        then write them
+        '''
+        self.document.records = records
+        
+        self.group_styles()
+        self.stitch_groups()
+        self.decode_styles()
+        
+        for record in self.document.records:
+            self._write_record(writer, record)
+        self.document.records = []
+        
+def convert(data, compress=False, **options):
+    '''
+    Convert an Onshape SVG held in memory, without touching the disk
+
+    Parameters
+    ----------
+    data : bytes, str or file object
+        The SVG document, or a file object to read it from.
+    compress : bool, optional
+        Return gzip compressed SVG. The default is False.
+    **options
+        Passed to vector_object, e.g. precision or pretty.
+
+    Returns
+    -------
+    bytes
+        The Shaper SVG.
+
+    '''
+    sink = io.BytesIO()
+    vector_object(_input_object(data), **options).onshape2shaper(
+        sink, compress=compress)
+    return sink.getvalue()
+
+def convert_stream(data, sink, compress=False, chunk_size=65536, 
+                   **options):
+    '''
+    Convert an Onshape SVG with stream_onshape2shaper, writing the result 
+    to sink as it is produced
+
+    Parameters
+    ----------
+    data : bytes, str or file object
+        The SVG document, or a file object to read it from incrementally.
+    sink : file object
+        Binary file object written to, left open.
+    compress : bool, optional
+        Write gzip compressed SVG. The default is False.
+    chunk_size : int, optional
+        Bytes read from data at a time. The default is 65536.
+    **options
+        Passed to vector_object.
+
+    Returns
+    -------
+    None.
+
+    '''
+    vector_object(_input_object(data), **options).stream_onshape2shaper(
+        sink, chunk_size, compress)
+
+def _input_object(data):
+    # vector_object takes a str as a path, in memory documents as files
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return io.BytesIO(data)
+    elif isinstance(data, str):
+        return io.StringIO(data)
+    return data
+
+def _run_stage(name, function, *args):
+    # Stage runner used when onshape2shaper is not profiling
+    return function(*args)
+
+def group_points(group):
+    '''
+    Parse the points of every polyline in a group in one go
+
+    Parameters
+    ----------
+    group : dict
+        Group with a 'polyline' dict or list.
+
+    Returns
+    -------
+    points : numpy.ndarray
+        (N, 2) points of all polylines.
+    offsets : numpy.ndarray
+        Polyline i is points[offsets[i]:offsets[i+1]].
+
+    '''
+    polyline_list = group['polyline']
+    if type(polyline_list) != list:
+        polyline_list = [polyline_list]
+        
+    points_strings = [points_dict['@points'] for points_dict in polyline_list
+                      if points_dict and '@points' in points_dict]
+    
+    return parse_points_batch(points_strings)
+
+def merge_polylines(polyline_list, method='native', join_tolerance=None):
+    '''
+    Snap polyline ends together if a tolerance is given, then stitch them
+
+    Parameters
+    ----------
+    polyline_list : list of numpy.ndarray
+        (N, 2) points of each polyline.
+    method : str, optional
+        Stitching engine, see order_polylines. The default is 'native'.
+    join_tolerance : float, optional
+        Join distance in pixels. The default of None only joins equal 
+        points.
+
+    Returns
+    -------
+    merged_polylines : list of numpy.ndarray
+        Stitched paths.
+    snaps : int or None
+        Number of endpoints snapped, None without a tolerance.
+
+    '''
+    snaps = None
+    if join_tolerance:
+        polyline_list, snaps = snap_polyline_ends(polyline_list, 
+                                                  join_tolerance)
+    
+    return order_polylines(polyline_list, method=method), snaps
+
+def stitch_points(points, offsets, method='native', join_tolerance=None,
+                  precision=2, relative=False, drop_collinear=False):
+    '''
+    Stitch one group given as packed arrays and format its paths, so the
+    whole group can run in a worker process
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        (N, 2) points of all polylines in the group.
+    offsets : numpy.ndarray
+        Polyline i is points[offsets[i]:offsets[i+1]].
+    method, join_tolerance : optional
+        See merge_polylines.
+    precision, relative, drop_collinear : optional
+        See format_paths.
+
+    Returns
+    -------
+    points : numpy.ndarray
+        (N, 2) points of all stitched paths.
+    offsets : numpy.ndarray
+        Path i is points[offsets[i]:offsets[i+1]].
+    snaps : int or None
+        Number of endpoints snapped.
+    path_strings : list of str
+        Path data of each stitched path.
+
+    '''
+    from onshape2shaper.model import pack_polylines
+    
+    merged_polylines, snaps = merge_polylines(np.split(points, offsets[1:-1]), 
+                                              method, join_tolerance)
+    path_strings = format_paths(merged_polylines, precision, relative, 
+                                drop_collinear)
+    
+    return pack_polylines(merged_polylines) + (snaps, path_strings)
+
+def _is_stream_item(path):
+    # Groups inside the outer group, and anything beside the outer group,
+    #are collected whole. Everything above them is streamed
+    return len(path) == 3 or (len(path) == 2 and path[1] != 'g')
+
+def iter_svg_items(source, is_item, chunk_size=65536):
+    '''
+    Parse an XML file incrementally with expat. Elements for which is_item
+    returns True are collected whole into the same dict layout 
+    xmltodict.parse produces, every other element is only reported when it
+    starts and ends.
+
+    Parameters
+    ----------
+    source : file
+        Binary file object to read.
+    is_item : callable
+        Called with the tuple of element names from the root to an element,
+        returns True to collect that element whole.
+    chunk_size : int, optional
+        Bytes read at a time. The default is 65536.
+
+    Yields
+    ------
+    event : str
+        'start', 'end' or 'item'.
+    path : tuple of str
+        Element names from the root to this element.
+    value : dict or None
+        Attributes for 'start', the collected element for 'item', None for
+        'end'.
+
+    '''
+    parser = expat.ParserCreate()
+    parser.ordered_attributes = True
+    
+    events = []
+    path = []
+    #Element being collected, as [attributes and children, text]
+    stack = []
+    
+    def start(name, attrs):
+        path.append(name)
+        attrs = {'@' + attrs[i]: attrs[i + 1] 
+                 for i in range(0, len(attrs), 2)}
+        
+        if stack or is_item(tuple(path)):
+            stack.append([attrs, []])
+        else:
+            events.append(('start', tuple(path), attrs))
+            
+    def end(name):
+        if stack:
+            item, text = stack.pop()
+            text = ''.join(text).strip()
+            if text and item:
+                item['#text'] = text
+            elif text:
+                item = text
+            elif not item:
+                item = None
+                
+            if stack:
+                parent = stack[-1][0]
+                if name not in parent:
+                    parent[name] = item
+                elif isinstance(parent[name], list):
+                    parent[name].append(item)
+                else:
+                    parent[name] = [parent[name], item]
+            else:
+                events.append(('item', tuple(path), item))
+        else:
+            events.append(('end', tuple(path), None))
+        path.pop()
+        
+    def characters(data):
+        if stack:
+            stack[-1][1].append(data)
+    
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = characters
+    
+    while True:
+        chunk = source.read(chunk_size)
+        parser.Parse(chunk, not chunk)
+        yield from events
+        events.clear()
+        if not chunk:
+            break
+        
+class pretty_xml_writer():
+    '''
+    Write XML incrementally in the layout of xmltodict.unparse(pretty=True),
+    so a streamed document matches one written by tosvg. With pretty False
+    it matches the compact layout of xmltodict.unparse instead.
+    '''
+    
+    def __init__(self, sink, indent='\t', pretty=True):
+        
+        self.sink = sink
+        self.pretty = pretty
+        self.indent = indent if pretty else ''
+        self.newline = '\n' if pretty else ''
+        #Open elements as [name, has children]
+        self.open = []
+        
+        self.sink.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        
+    def _child(self):
+        if self.open and not self.open[-1][1]:
+            self.sink.write(self.newline)
+            self.open[-1][1] = True
+    
+    def start(self, name, attrs=None):
+        from xml.sax.saxutils import quoteattr
+        
+        self._child()
+        
+        tag = [self.indent*len(self.open), '<', name]
+        for key, value in (attrs or {}).items():
+            tag.append(' {}={}'.format(key[1:], quoteattr(value)))
+        tag.append('>')
+        
+        self.sink.write(''.join(tag))
+        self.open.append([name, False])
+        
+    def end(self):
+        name, has_children = self.open.pop()
+        if has_children:
+            self.sink.write(self.indent*len(self.open))
+        self.sink.write('</{}>'.format(name))
+        if self.open:
+            self.sink.write(self.newline)
+            
+    def element(self, name, value):
+        '''
+        Write a whole element given in xmltodict layout
+        '''
+        import xmltodict
         
-        self.remove_default_stroke()
+        self._child()
         
-        self.tosvg(output_path)
+        xml_str = xmltodict.unparse({name: value}, full_document=False, 
+                                    pretty=self.pretty, indent=self.indent)
+        if not self.pretty:
+            self.sink.write(xml_str)
+            return
         
-        if plot_line_checker:
-            self.plot_paths_rand_color()
+        margin = self.indent*len(self.open)
+        self.sink.write(''.join(margin + line + '\n' 
+                                for line in xml_str.split('\n')))
         
-        self.tosvg(output_path)
+def open_input(input_path, mode='rb'):
+    '''
+    Open input_path for reading, a file object is used as it is and left 
+    open
+    '''
+    if hasattr(input_path, 'read'):
+        return contextlib.nullcontext(input_path)
+    return open(input_path, mode)
+
+def open_output(output_path, compress=None):
+    '''
+    Open output_path for binary writing, gzip compressed when compress is
+    True, or when it is None and the path ends in .svgz. The gzip header
+    carries no timestamp so identical documents compress identically.
+    
+    output_path can also be a binary file object, which is written to and
+    left open.
+    '''
+    is_sink = hasattr(output_path, 'write')
+    if compress is None:
+        name = getattr(output_path, 'name', '') if is_sink else output_path
+        compress = str(name).lower().endswith('.svgz')
         
+    if is_sink and compress:
+        return gzip.GzipFile(fileobj=output_path, mode='wb', mtime=0)
+    elif is_sink:
+        return contextlib.nullcontext(output_path)
+    elif compress:
+        return gzip.GzipFile(output_path, 'wb', mtime=0)
+    return open(output_path, 'wb')
+    
+def style_key(group):
+    '''
+    Hashable key of the attributes group_styles merges records by
+    '''
+    return tuple((key, group[key]) for key in STYLE_KEYS if key in group)
+    
+def is_anchor(group):
+    '''
+    Onshape groups drawn in pure red are the Shaper anchor
+    '''
+    return group.get('@stroke', '').strip('#') == 'ff0000'
+
 def remove_at_keys(d):
     '''
     Clean a dictionary of keys prepended with @
@@ -440,42 +1290,133 @@ def remove_at_keys(d):
     else:
         return d
     
-def string2numpy(s):
+#Path commands and commas are treated as whitespace by the number parser
+_SEPARATORS = str.maketrans(',MmLlZz', '       ')
+_NUMBER = re.compile(r'nan|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+def parse_numbers(s):
     '''
-    Take a string of comma seperated, space row delimited table and return numpy array
+    Parse every number in an SVG attribute string in one pass. Commas and 
+    any whitespace separate numbers, M/L/z path commands are skipped.
 
     Parameters
     ----------
-    s : TYPE
-        DESCRIPTION.
+    s : str
+        A points, d or viewBox attribute.
 
     Returns
     -------
-    arr : TYPE
-        DESCRIPTION.
+    numpy.ndarray
+        1D float64 array of the numbers in order.
+
+    '''
+    try:
+        return np.array(s.translate(_SEPARATORS).split(), dtype=np.float64)
+    except ValueError:
+        # Compact forms such as '1-2' or '.5.5' need a real tokenizer
+        return np.array(_NUMBER.findall(s), dtype=np.float64)
+
+def parse_points(s):
+    '''
+    Parse a points or d attribute into an (N, 2) array of coordinates
+
+    Parameters
+    ----------
+    s : str
+        Coordinate pairs, e.g. 'M1,2 3,4z' or '1 2,3 4'.
+
+    Returns
+    -------
+    numpy.ndarray
+        (N, 2) float64 array.
+
+    '''
+    values = parse_numbers(s)
+    if len(values) % 2:
+        raise ValueError('Odd number of coordinates in points string')
+        
+    return values.reshape(-1, 2)
+
+def parse_points_batch(strings):
+    '''
+    Parse many points strings at once. The strings are concatenated with a 
+    NaN sentinel between them, parsed in a single call and split on the 
+    sentinels.
+
+    Parameters
+    ----------
+    strings : list of str
+        Points or d attributes.
+
+    Returns
+    -------
+    points : numpy.ndarray
+        (N, 2) coordinates of all strings, one after the other.
+    offsets : numpy.ndarray
+        (len(strings) + 1,) string i is points[offsets[i]:offsets[i+1]].
 
     '''
-    # split the string into rows
-    rows = s.split(' ')
+    if not strings:
+        return np.empty((0, 2)), np.zeros(1, dtype=np.int64)
+    
+    values = parse_numbers(' nan '.join(strings))
+    is_sentinel = np.isnan(values)
     
-    # split each row into elements and convert to float
-    arr = np.array([list(map(float, filter(lambda x: x != '', 
-                                           row.split(','))\
-                             )) for row in rows if row != ''])
+    counts = np.diff(np.concatenate(([-1], np.flatnonzero(is_sentinel), 
+                                     [len(values)]))) - 1
+    if len(counts) != len(strings):
+        raise ValueError('Points strings must not contain NaN')
+    if np.any(counts % 2):
+        raise ValueError('Odd number of coordinates in points string')
     
-    return arr
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    np.cumsum(counts//2, out=offsets[1:])
+    
+    return values[~is_sentinel].reshape(-1, 2), offsets
+
+def string2numpy(s):
+    '''
+    Take a string of comma seperated, space row delimited table and return numpy array
+
+    Kept for existing callers, parsing is done by parse_points.
+
+    Parameters
+    ----------
+    s : str
+        Points string.
+
+    Returns
+    -------
+    arr : numpy.ndarray
+        (N, 2) float64 array.
 
-def order_polylines(polyline_list):
+    '''
+    return parse_points(s)
+
+def order_polylines(polyline_list, method='native'):
     """
     Orders the points within each polyline and merges connected polylines in a list of 2D polylines.
     
     Args:
         polyline_list (list): List of polylines, where each polyline is represented as a list of points.
             Each point is a 2D coordinate represented as a list or tuple.
+        method (str): 'native' stitches on NumPy arrays through an endpoint-hash
+            adjacency, 'networkx' builds a networkx.Graph. Both are kept so the
+            results can be compared.
     
     Returns:
         list: List of ordered and merged polylines, where each polyline is represented as a list of points.
     """
+    if method == 'native':
+        return stitch_polylines(polyline_list)
+    elif method == 'networkx':
+        return _order_polylines_networkx(polyline_list)
+    else:
+        raise ValueError("Unknown stitching method '{}'".format(method))
+
+def _order_polylines_networkx(polyline_list):
+    import networkx as nx
+    
     # Step 1: Build the graph
     graph = nx.Graph()
     for polyline in polyline_list:
@@ -485,195 +1426,597 @@ def order_polylines(polyline_list):
             point2 = tuple(polyline[i + 1])
             graph.add_edge(point1, point2)
 
-    # Step 2: Identify connected components
-    connected_components = list(nx.connected_components(graph))
-
-    # Step 3: Merge and order polylines within each connected component
-    merged_polylines = []
-    for component in connected_components:
-        merged_polyline = []
-        endpoint_nodes = []
-        for point in component:
-            degree = graph.degree[point]
-            if degree == 1 or degree > 2:
-                endpoint_nodes.append(point)
-        if len(endpoint_nodes) >= 2:
-            start_point, end_point = endpoint_nodes[0], endpoint_nodes[1]
-            dfs_traversal(graph, start_point, end_point, merged_polyline)
-        elif len(endpoint_nodes) == 0:
-            start_point = list(component)[0]
-            dfs_traversal(graph, 
-                          start_point, 
-                          start_point, 
-                          merged_polyline, 
-                          is_closed=True)
-        else:
-            raise ValueError("Endpoint detection failed for a polyline.")
-        if merged_polyline:
-            merged_polylines.append(np.array(merged_polyline))
+    # Step 2: Number the nodes and hand the edges to the chain walker
+    nodes = list(graph.nodes)
+    if not nodes:
+        return []
+    node_index = {node: i for i, node in enumerate(nodes)}
+    edges = np.array([(node_index[point1], node_index[point2]) 
+                      for point1, point2 in graph.edges], 
+                     dtype=np.int64).reshape(-1, 2)
+    
+    indptr, indices, edge_ids = build_adjacency(edges[:, 0], edges[:, 1],
+                                                len(nodes))
 
-    return merged_polylines
+    # Step 3: Merge and order polylines along each chain
+    return chains_to_polylines(np.array(nodes, dtype=np.float64), 
+                               *walk_chains(indptr, indices, edge_ids))
 
-def dfs_traversal(graph, 
-                  start_point, 
-                  end_point, 
-                  merged_polyline, 
-                  is_closed=False):
-    """
-    Performs depth-first traversal on a graph starting from the start_point and ending at the end_point.
-    Appends the visited points to the merged_polyline.
+def stitch_polylines(polyline_list, quantum=None):
+    '''
+    Merge connected polylines without building a graph object. Every segment
+    endpoint is hashed to an integer key, the keys become node ids and the
+    segments a CSR adjacency which is walked with integer indices.
+
+    Parameters
+    ----------
+    polyline_list : list of numpy.ndarray
+        (N, 2) arrays of points, one per polyline.
+    quantum : float, optional
+        Grid size used to quantize endpoints. The default of None only joins
+        points whose coordinates are exactly equal.
+
+    Returns
+    -------
+    list of numpy.ndarray
+        Ordered points of each merged polyline, closed loops repeat their 
+        first point at the end.
+
+    '''
+    starts, ends = polylines_to_segments(polyline_list)
+    if len(starts) == 0:
+        return []
     
-    Args:
-        graph (networkx.Graph): Graph representing the connectivity between points.
-        start_point: Starting point for the traversal.
-        end_point: Ending point for the traversal.
-        merged_polyline (list): List to store the merged polyline points.
-    """
-    stack = [start_point]
-    visited = set()
-    while stack:
-        current_point = stack.pop()
-        visited.add(current_point)
-        merged_polyline.append(list(current_point))
-        if current_point == end_point and len(visited) == len(graph.nodes):
-            break
-        neighbors = list(graph.neighbors(current_point))
-        for neighbor in neighbors:
-            if neighbor not in visited:
-                stack.append(neighbor)
-        
-    if is_closed:
-        merged_polyline.append(list(start_point))
+    # Interleave so the points are in the order they appear in the drawing
+    points = np.stack((starts, ends), axis=1).reshape(-1, 2)
+    node_ids, first = index_endpoints(quantize_points(points, quantum))
+    node_points = points[first]
+    
+    indptr, indices, edge_ids = build_adjacency(node_ids[0::2], 
+                                                node_ids[1::2], 
+                                                len(first))
+    
+    return chains_to_polylines(node_points, 
+                               *walk_chains(indptr, indices, edge_ids))
+
+def polylines_to_segments(polyline_list):
+    '''
+    Stack the consecutive point pairs of every polyline into segment arrays
+
+    Parameters
+    ----------
+    polyline_list : list of numpy.ndarray
+        (N, 2) arrays of points, one per polyline.
 
+    Returns
+    -------
+    starts : numpy.ndarray
+        (M, 2) start point of every segment.
+    ends : numpy.ndarray
+        (M, 2) end point of every segment.
 
-def numpy2pathstring(points):
     '''
-    Take a numpy array, convert them back to comma space seperated strings, prepending M
+    starts = []
+    ends = []
+    for polyline in polyline_list:
+        polyline = np.asarray(polyline, dtype=np.float64).reshape(-1, 2)
+        if len(polyline) > 1:
+            starts.append(polyline[:-1])
+            ends.append(polyline[1:])
+            
+    if not starts:
+        return np.empty((0, 2)), np.empty((0, 2))
+    
+    return np.concatenate(starts), np.concatenate(ends)
+
+def quantize_points(points, quantum=None):
+    '''
+    Turn point coordinates into integer keys that compare equal when the 
+    points should be joined
 
     Parameters
     ----------
-    points : TYPE
-        DESCRIPTION.
+    points : numpy.ndarray
+        (N, 2) point coordinates.
+    quantum : float, optional
+        Grid size to snap to. The default of None keys on the exact float 
+        value.
 
     Returns
     -------
-    TYPE
-        DESCRIPTION.
+    numpy.ndarray
+        (N, 2) int64 keys.
+
+    '''
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    if quantum is None:
+        # Adding 0.0 folds -0.0 onto 0.0 so equal values share a bit pattern
+        return (points + 0.0).view(np.int64)
+    
+    return np.round(points/quantum).astype(np.int64)
+
+def index_endpoints(keys):
+    '''
+    Give every distinct key a node id, numbered in order of first appearance
+
+    Parameters
+    ----------
+    keys : numpy.ndarray
+        (N, 2) integer keys from quantize_points.
+
+    Returns
+    -------
+    node_ids : numpy.ndarray
+        (N,) node id of every key.
+    first : numpy.ndarray
+        (K,) index into keys of the first occurrence of each node.
+
+    '''
+    if len(keys) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    
+    order = np.lexsort((keys[:, 1], keys[:, 0]))
+    sorted_keys = keys[order]
+    
+    is_new = np.ones(len(keys), dtype=bool)
+    is_new[1:] = np.any(sorted_keys[1:] != sorted_keys[:-1], axis=1)
+    sorted_ids = np.cumsum(is_new) - 1
+    
+    # lexsort is stable, so the head of each run is the first occurrence
+    first = order[is_new]
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first, kind='stable')] = np.arange(len(first))
+    
+    node_ids = np.empty(len(keys), dtype=np.int64)
+    node_ids[order] = rank[sorted_ids]
+    
+    return node_ids, np.sort(first)
+
+def build_adjacency(u, v, n_nodes):
+    '''
+    Build a CSR adjacency for undirected edges u-v. Duplicate edges and 
+    zero length edges are dropped, as networkx.Graph would collapse them.
+
+    Parameters
+    ----------
+    u : numpy.ndarray
+        (M,) node id at one end of each edge.
+    v : numpy.ndarray
+        (M,) node id at the other end of each edge.
+    n_nodes : int
+        Number of nodes.
+
+    Returns
+    -------
+    indptr : numpy.ndarray
+        (n_nodes + 1,) offsets, the neighbours of node i are 
+        indices[indptr[i]:indptr[i+1]].
+    indices : numpy.ndarray
+        Neighbour node ids, in the order the edges were given.
+    edge_ids : numpy.ndarray
+        Edge number of each entry in indices, both directions of an edge 
+        share a number.
+
+    '''
+    keep = u != v
+    u = u[keep]
+    v = v[keep]
+    
+    edge_keys = np.minimum(u, v)*n_nodes + np.maximum(u, v)
+    _, first = np.unique(edge_keys, return_index=True)
+    first.sort()
+    u = u[first]
+    v = v[first]
+    
+    src = np.column_stack((u, v)).ravel()
+    dst = np.column_stack((v, u)).ravel()
+    
+    order = np.argsort(src, kind='stable')
+    indices = dst[order]
+    edge_ids = order//2
+    
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n_nodes), out=indptr[1:])
+    
+    return indptr, indices, edge_ids
+
+def walk_chains(indptr, indices, edge_ids):
+    '''
+    Walk a CSR adjacency as chains of degree 2 nodes. Chains start and stop
+    at nodes which are not degree 2, so open polylines run end to end and 
+    junctions split a component into sub-chains. Components where every
+    node is degree 2 are closed loops and repeat their first node at the 
+    end. Every edge is walked exactly once, so this is O(n).
+
+    Parameters
+    ----------
+    indptr : numpy.ndarray
+        CSR offsets from build_adjacency.
+    indices : numpy.ndarray
+        CSR neighbours from build_adjacency.
+    edge_ids : numpy.ndarray
+        Edge number of each neighbour entry from build_adjacency.
+
+    Returns
+    -------
+    node_order : numpy.ndarray
+        Node ids of all chains, one after the other.
+    offsets : numpy.ndarray
+        (n_chains + 1,) chain i is node_order[offsets[i]:offsets[i+1]].
 
     '''
-    # Convert to string with comma separated x and y values and space 
-    #separated between each coordinate
-    points_string = ' '.join([f"{x:.2f},{y:.2f}" for x, y in points])
+    n_nodes = len(indptr) - 1
+    n_edges = len(indices)//2
+    degree = np.diff(indptr)
     
-    points_string = 'M' + points_string
+    # Every chain holds one node more than it has edges. Open chains are 
+    #counted from their ends, each loop needs at least 3 degree 2 nodes
+    is_end = degree != 2
+    n_open = int(degree[is_end].sum())//2
+    n_loop = int(np.count_nonzero(~is_end))//3
+    node_order = np.empty(n_edges + n_open + n_loop, dtype=np.int64)
+    offsets = np.empty(n_open + n_loop + 1, dtype=np.int64)
+    offsets[0] = 0
     
-    first_point = points[0, :]
-    last_point = points[-1, :]
-    if ((first_point[0] == last_point[0]) and (first_point[1] == last_point[1])):
-        points_string = points_string + 'z'
+    indptr = indptr.tolist()
+    indices = indices.tolist()
+    edge_ids = edge_ids.tolist()
+    degree = degree.tolist()
+    used = bytearray(n_edges)
+    
+    position = 0
+    n_chains = 0
+    
+    def follow(start, k):
+        nonlocal position, n_chains
+        node_order[position] = start
+        position += 1
         
-    return points_string
+        while True:
+            used[edge_ids[k]] = 1
+            current = indices[k]
+            node_order[position] = current
+            position += 1
+            
+            if degree[current] != 2 or current == start:
+                break
+            
+            # Leave through the other edge of the degree 2 node
+            k = indptr[current]
+            if used[edge_ids[k]]:
+                k += 1
+                
+        n_chains += 1
+        offsets[n_chains] = position
+    
+    # Open chains and sub-chains between junctions
+    for node in range(n_nodes):
+        if degree[node] != 2:
+            for k in range(indptr[node], indptr[node + 1]):
+                if not used[edge_ids[k]]:
+                    follow(node, k)
+    
+    # Anything left is a closed loop
+    for node in range(n_nodes):
+        if degree[node] == 2 and not used[edge_ids[indptr[node]]]:
+            follow(node, indptr[node])
+            
+    return node_order[:position], offsets[:n_chains + 1]
 
-def to_points_string(points):
+def chains_to_polylines(node_points, node_order, offsets):
     '''
-    Take a numpy array, convert them back to comma space seperated strings, prepending M
+    Gather the coordinates of walked chains into one array per polyline
 
     Parameters
     ----------
-    points : TYPE
-        DESCRIPTION.
+    node_points : numpy.ndarray
+        (K, 2) coordinates of each node.
+    node_order : numpy.ndarray
+        Node ids from walk_chains.
+    offsets : numpy.ndarray
+        Chain offsets from walk_chains.
 
     Returns
     -------
-    TYPE
-        DESCRIPTION.
+    list of numpy.ndarray
+        (N, 2) points of each chain, views into one gathered array. Empty
+        when there are no chains.
+
+    '''
+    if len(offsets) < 2:
+        return []
+    
+    points = node_points[node_order]
+    
+    return np.split(points, offsets[1:-1])
 
+class point_grid():
+    '''
+    Uniform grid spatial index over 2D points. Points are bucketed into 
+    square cells so a radius query only looks at the neighbouring cells.
     '''
-    # Convert to string with comma separated x and y values and space 
-    #separated between each coordinate
-    points_string = ' '.join([f"{x:.2f},{y:.2f}" for x, y in points])
     
-    return points_string
+    def __init__(self, cell_size):
+        
+        self.cell_size = float(cell_size)
+        self.cells = {}
+        self.points = {}
+        
+    def _cell(self, x, y):
+        return (int(np.floor(x/self.cell_size)), 
+                int(np.floor(y/self.cell_size)))
+        
+    def insert(self, index, x, y):
+        self.points[index] = (x, y)
+        self.cells.setdefault(self._cell(x, y), []).append(index)
+        
+    def remove(self, index):
+        x, y = self.points.pop(index)
+        self.cells[self._cell(x, y)].remove(index)
+        
+    def query(self, x, y, radius):
+        '''
+        Indices of the points within radius of (x, y), in insertion order 
+        per cell
+        '''
+        cx0, cy0 = self._cell(x - radius, y - radius)
+        cx1, cy1 = self._cell(x + radius, y + radius)
+        radius_sq = radius*radius
+        
+        found = []
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for index in self.cells.get((cx, cy), ()):
+                    px, py = self.points[index]
+                    if (px - x)**2 + (py - y)**2 <= radius_sq:
+                        found.append(index)
+        return found
 
-def compare_dicts(dict1, dict2, key_to_ignore):
+def snap_points(points, tolerance):
     '''
-    Take two dicts, compare if their properties are identical except for one key
+    Move every point onto the first earlier point within tolerance of it.
+    Points are compared against the cluster representatives only, so 
+    clusters cannot creep further than the tolerance.
 
     Parameters
     ----------
-    dict1 : TYPE
-        DESCRIPTION.
-    dict2 : TYPE
-        DESCRIPTION.
-    key_to_ignore : TYPE
-        DESCRIPTION.
+    points : numpy.ndarray
+        (N, 2) point coordinates.
+    tolerance : float
+        Join distance in the same units as points.
 
     Returns
     -------
-    bool
-        DESCRIPTION.
+    snapped : numpy.ndarray
+        (N, 2) points moved onto their representative.
+    moved : numpy.ndarray
+        (N,) True where a point was snapped to a different coordinate.
 
     '''
-    # Check if the dictionaries have the same keys (except for the ignored key)
-    dict1_keys = set(dict1.keys()) - {key_to_ignore}
-    dict2_keys = set(dict2.keys()) - {key_to_ignore}
-    if dict1_keys != dict2_keys:
-        return False
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    node_ids, first = index_endpoints(quantize_points(points))
+    unique_points = points[first]
+    
+    grid = point_grid(tolerance)
+    representative = np.arange(len(unique_points))
+    for i, (x, y) in enumerate(unique_points.tolist()):
+        near = grid.query(x, y, tolerance)
+        if near:
+            #The query goes cell by cell, the earliest point is the lowest
+            #index rather than the first found
+            representative[i] = min(near)
+        else:
+            grid.insert(i, x, y)
+    
+    snapped_ids = representative[node_ids]
+    
+    return unique_points[snapped_ids], snapped_ids != node_ids
 
-    # Check if the values of all keys (except for the ignored key) are the same
-    for key in dict1_keys:
-        if dict1[key] != dict2[key]:
-            return False
+def snap_polyline_ends(polyline_list, tolerance):
+    '''
+    Join polyline endpoints that are within tolerance of each other so 
+    Onshape's rounding noise does not leave paths open
 
-    # Check if the ignored key is present in both dictionaries
-    if key_to_ignore not in dict1 or key_to_ignore not in dict2:
-        return False
+    Parameters
+    ----------
+    polyline_list : list of numpy.ndarray
+        (N, 2) arrays of points, one per polyline.
+    tolerance : float
+        Join distance in pixels.
 
-    # Check if the values of the ignored key are different
-    if dict1[key_to_ignore] == dict2[key_to_ignore]:
-        return False
+    Returns
+    -------
+    snapped_list : list of numpy.ndarray
+        Polylines with their ends moved, inputs are not modified.
+    snaps : int
+        Number of endpoints that were moved.
 
-    # If we've gotten this far, the dictionaries are identical except for the 
-    #ignored key
-    return True
+    '''
+    polyline_list = [np.asarray(polyline, dtype=np.float64).reshape(-1, 2)
+                     for polyline in polyline_list]
+    has_ends = [i for i, polyline in enumerate(polyline_list) 
+                if len(polyline) > 1]
+    if not has_ends:
+        return polyline_list, 0
+    
+    ends = np.array([(polyline_list[i][0], polyline_list[i][-1]) 
+                     for i in has_ends]).reshape(-1, 2)
+    snapped, moved = snap_points(ends, tolerance)
+    
+    moved = moved.reshape(-1, 2)
+    snapped = snapped.reshape(-1, 2, 2)
+    for row in np.flatnonzero(moved.any(axis=1)):
+        polyline = polyline_list[has_ends[row]].copy()
+        polyline[0] = snapped[row, 0]
+        polyline[-1] = snapped[row, 1]
+        polyline_list[has_ends[row]] = polyline
+    
+    return polyline_list, int(moved.sum())
 
-def get_grouped_dicts(dict_list, key_to_ignore):
+def numpy2pathstring(points, precision=2, relative=False, 
+                     drop_collinear=False):
     '''
-    Takes a list of dicts, returns a list of groups
+    Take a numpy array, convert them back to comma space seperated strings, prepending M
 
     Parameters
     ----------
-    dict_list : TYPE
-        DESCRIPTION.
-    key_to_ignore : TYPE
-        DESCRIPTION.
+    points : numpy.ndarray
+        (N, 2) points of one path.
+    precision, relative, drop_collinear : optional
+        See format_paths.
 
     Returns
     -------
-    groups : TYPE
-        DESCRIPTION.
-    indices : TYPE
-        DESCRIPTION.
+    str
+        SVG path data, closed paths end in z.
+
+    '''
+    return format_paths([points], precision, relative, drop_collinear)[0]
+
+def to_points_string(points, precision=2):
+    '''
+    Take a numpy array, convert them back to comma space seperated strings
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        (N, 2) points.
+    precision : int, optional
+        Decimal places. The default is 2.
+
+    Returns
+    -------
+    str
+        Points attribute string.
 
     '''
-    # Initialize an empty list to store the groups of similar dictionaries
-    groups = []
-    indices = []
+    pair = '%.{0}f,%.{0}f'.format(precision)
     
-    for i, d in enumerate(dict_list):
-        found = False
-        for g in groups:
-            if all(d[k] == g[0][k] for k in d if k != key_to_ignore):
-                g.append(d)
-                found = True
-                break
-        if not found:
-            groups.append([d])
-            indices.append([i])
+    return ' '.join([pair]*len(points)) % tuple(np.ravel(points).tolist())
+
+def format_paths(paths, precision=2, relative=False, drop_collinear=False):
+    '''
+    Serialize many paths to SVG path data with a single string formatting 
+    call. A template is built for every path, all of them are filled from 
+    one flat tuple of coordinates and the buffer is split back into paths.
+    With the options off the output matches numpy2pathstring byte for byte.
+
+    Parameters
+    ----------
+    paths : list of numpy.ndarray
+        (N, 2) points of each path.
+    precision : int, optional
+        Decimal places written for each coordinate. The default is 2.
+    relative : bool, optional
+        Write the first point absolute and the rest as relative l commands.
+        The default is False.
+    drop_collinear : bool, optional
+        Leave out points that lie on the straight line between their 
+        neighbours once rounded to precision, and repeated points. The 
+        default is False.
+
+    Returns
+    -------
+    list of str
+        Path data for each path.
+
+    '''
+    if not len(paths):
+        return []
+    
+    pair = '%.{0}f,%.{0}f'.format(precision)
+    scale = 10**precision
+    
+    templates = []
+    values = []
+    for points in paths:
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        is_closed = (points[0, 0] == points[-1, 0]) \
+            and (points[0, 1] == points[-1, 1])
+        
+        if relative or drop_collinear:
+            # Work on the rounded integers so relative steps add up exactly
+            #to the absolute positions that would have been written
+            points = np.round(points*scale).astype(np.int64)
+            if drop_collinear:
+                points = _drop_collinear(points)
+            if relative:
+                points[1:] = np.diff(points, axis=0)
+            points = points/scale
+        
+        n_points = len(points)
+        if relative and n_points > 1:
+            template = 'M' + pair + 'l' + ' '.join([pair]*(n_points - 1))
         else:
-            indices[groups.index(g)].append(i)
+            template = 'M' + ' '.join([pair]*n_points)
+        if is_closed:
+            template += 'z'
             
-    return groups, indices
+        templates.append(template)
+        values.append(points.ravel())
+        
+    # Paths never contain a newline, so it can separate them in the buffer
+    buffer = '\n'.join(templates) % tuple(np.concatenate(values).tolist())
+    
+    return buffer.split('\n')
+
+def _drop_collinear(points):
+    '''
+    Remove interior points of an integer (N, 2) array that continue straight
+    on from the previous point, or repeat it
+    '''
+    if len(points) < 3:
+        return points
+    
+    before = points[1:-1] - points[:-2]
+    after = points[2:] - points[1:-1]
+    cross = before[:, 0]*after[:, 1] - before[:, 1]*after[:, 0]
+    dot = before[:, 0]*after[:, 0] + before[:, 1]*after[:, 1]
+    
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:-1] = (cross != 0) | (dot < 0)
+    
+    return points[keep]
+
+def parse_path(d):
+    '''
+    Parse path data written by format_paths or format_arc_paths back into 
+    absolute points
+
+    Parameters
+    ----------
+    d : str
+        Path data, with or without relative l commands, or absolute with A
+        commands. Arcs are approximated by points every few degrees.
+
+    Returns
+    -------
+    numpy.ndarray
+        (N, 2) absolute points.
+
+    '''
+    if 'A' in d:
+        from onshape2shaper.simplify import arc_points
+        
+        points = []
+        for command, arguments in re.findall(r'([MLA])([^MLAz]*)', d):
+            values = parse_numbers(arguments)
+            if command != 'A':
+                points.extend(values.reshape(-1, 2))
+                continue
+            #A rx,ry rotation large,sweep x,y, written with rx equal to ry
+            for radius, _, _, large, sweep, x, y in values.reshape(-1, 7):
+                points.extend(arc_points(points[-1], (x, y), radius, large, 
+                                         sweep))
+        return np.array(points)
+    
+    absolute, is_relative, steps = d.partition('l')
+    points = parse_points(absolute)
+    if is_relative:
+        steps = np.cumsum(parse_points(steps), axis=0) + points[-1]
+        points = np.concatenate((points, steps))
+        
+    return points
 
 def check_identical_polyline(polyline1, polyline2):
     '''
@@ -719,47 +2062,6 @@ def clean_anchor(polyline):
     else:
         return filtered_polyline
     
-def filter_dict_keys(dict_list, key_to_keep):
-    """
-    Filters a dictionary to retain only the keys that are "@stroke", "@fill", "@line-width",
-    and a specified key_to_keep.
-    
-    Args:
-        dictionary (dict): The input dictionary.
-        key_to_keep (str): The key that should be retained in the filtered dictionary.
-        
-    Returns:
-        dict: A new dictionary containing only the filtered keys.
-    """
-    for i, d in enumerate(dict_list):
-        keys_to_filter = ["@stroke", "@fill", "@stroke-width"]
-        keys_to_filter.append(key_to_keep)
-        
-        dict_list[i] = {key: value for key, value in d.items() if key in keys_to_filter}
-    return dict_list
-
-def merge_dicts_with_polyline(dicts_list):
-    """
-    Merges a list of dictionaries by joining the 'polyline' lists.
-
-    Args:
-        dicts_list (list): List of dictionaries, where each dictionary has a 'polyline' key with a list value.
-
-    Returns:
-        dict: A new dictionary with the 'polyline' list joined from all input dictionaries.
-    """
-    #merged_dict = {}
-    merged_polyline = []
-    
-    for dictionary in dicts_list:
-        if 'polyline' in dictionary and type(dictionary['polyline']) == list:
-            merged_polyline.extend(dictionary['polyline'])
-        elif 'polyline' in dictionary and type(dictionary['polyline']) == dict:
-                merged_polyline.append(dictionary['polyline'])
-            
-    #merged_dict['polyline'] = merged_polyline
-    return merged_polyline
-    
 if __name__ == "__main__":
     test=False
     
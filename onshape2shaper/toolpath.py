@@ -0,0 +1,283 @@
+'''
+Order stitched paths so the tool travels less between cuts
+
+    vector_object(input_path, order_paths=True).onshape2shaper(output_path)
+
+Groups are cut inside out and shallow before deep: pockets, then interior,
+on line and exterior cuts, guides last, each from the shallowest depth.
+Within a group a nearest neighbour tour is built over the path ends with a
+grid spatial index, then improved with 2-opt moves, which reverse a run of
+paths. Moves are only tried towards the paths nearest each end, so the
+work grows about linearly with the number of paths. Open paths may be cut
+in either direction, closed paths keep theirs.
+'''
+import math
+
+import numpy as np
+
+from onshape2shaper.model import cut_type
+from onshape2shaper.svg2svg import point_grid
+
+#Order groups are cut in, undecoded groups are cut with on line
+CUT_ORDER = {cut_type.pocket: 0, cut_type.interior: 1, None: 2,
+             cut_type.on_line: 2, cut_type.exterior: 3, cut_type.guide: 4,
+             cut_type.anchor: 5}
+
+def cut_rank(cut, depth):
+    '''
+    Sort key of a group: inside out, then shallow before deep
+    '''
+    return (CUT_ORDER[cut], 0 if depth is None else depth)
+
+def travel_distance(paths, origin=(0, 0)):
+    '''
+    Distance travelled between paths cut in order, starting from origin
+
+    Parameters
+    ----------
+    paths : list of numpy.ndarray
+        (N, 2) points of each path, in the direction they are cut.
+    origin : tuple, optional
+        Where the tool starts. The default is (0, 0).
+
+    Returns
+    -------
+    float
+        Total distance between the end of each path and the start of the
+        next.
+
+    '''
+    paths = [path for path in paths if len(path)]
+    if not paths:
+        return 0.0
+
+    starts = np.array([path[0] for path in paths])
+    exits = np.array([origin] + [path[-1] for path in paths[:-1]])
+
+    return float(np.hypot(*(starts - exits).T).sum())
+
+def order_paths(paths, origin=(0, 0), neighbours=8, max_passes=10):
+    '''
+    Order paths to shorten the travel between them
+
+    Parameters
+    ----------
+    paths : list of numpy.ndarray
+        (N, 2) points of each path.
+    origin : tuple, optional
+        Where the tool starts. The default is (0, 0).
+    neighbours : int, optional
+        Nearby paths each path tries 2-opt moves with. The default is 8.
+    max_passes : int, optional
+        Most 2-opt passes over the tour. The default is 10.
+
+    Returns
+    -------
+    order : list of int
+        Index of the path cut at each step.
+    reverse : list of bool
+        Whether the path at each step is cut backwards.
+
+    '''
+    lengths = [len(path) for path in paths]
+    order = [count for count, length in enumerate(lengths) if not length]
+    reverse = [False]*len(order)
+
+    kept = [count for count, length in enumerate(lengths) if length]
+    if not kept:
+        return order, reverse
+
+    starts = np.array([paths[count][0] for count in kept], dtype=np.float64)
+    ends = np.array([paths[count][-1] for count in kept], dtype=np.float64)
+
+    tour, flipped = nearest_neighbour_tour(starts, ends, origin)
+    tour, flipped = two_opt(starts, ends, tour, flipped, neighbours,
+                            max_passes)
+
+    is_closed = np.all(starts == ends, axis=1)
+    for count, flip in zip(tour, flipped):
+        order.append(kept[count])
+        reverse.append(bool(flip and not is_closed[count]))
+
+    return order, reverse
+
+def _endpoint_grid(starts, ends, indices):
+    # Both ends of each path, end k + n is the end of path k. Cells hold
+    #about one path each
+    points = np.concatenate((starts, ends))
+    span = np.ptp(points, axis=0) if len(points) else np.zeros(2)
+    cell_size = max(math.sqrt(max(span[0], 1e-9)*max(span[1], 1e-9)
+                              /max(len(indices), 1)), 1e-6)
+
+    grid = point_grid(cell_size)
+    n = len(starts)
+    for count in indices:
+        grid.insert(count, *starts[count].tolist())
+        if np.any(starts[count] != ends[count]):
+            grid.insert(count + n, *ends[count].tolist())
+    return grid
+
+def _closest(grid, x, y, count=1):
+    # The count points of the grid nearest (x, y). The search radius grows
+    #until enough are found, every point is compared once that is cheaper
+    #than scanning the cells
+    wanted = min(count, len(grid.points))
+    radius = grid.cell_size
+    while True:
+        if (2*radius/grid.cell_size + 1)**2 >= 4*len(grid.points):
+            found = list(grid.points)
+        else:
+            found = grid.query(x, y, radius)
+        if len(found) >= wanted:
+            break
+        radius *= 2
+
+    found.sort(key=lambda index: ((grid.points[index][0] - x)**2
+                                  + (grid.points[index][1] - y)**2, index))
+    return found[:count]
+
+def nearest_neighbour_tour(starts, ends, origin=(0, 0)):
+    '''
+    Visit paths by always going to the closest free path end
+
+    Parameters
+    ----------
+    starts, ends : numpy.ndarray
+        (N, 2) first and last point of each path.
+    origin : tuple, optional
+        Where the tool starts. The default is (0, 0).
+
+    Returns
+    -------
+    tour : list of int
+        Path visited at each step.
+    flipped : list of bool
+        Whether the path was entered at its end.
+
+    '''
+    n = len(starts)
+    remaining = list(range(n))
+    grid = _endpoint_grid(starts, ends, remaining)
+    built = n
+
+    tour = []
+    flipped = []
+    x, y = origin
+    is_free = np.ones(n, dtype=bool)
+    for step in range(n):
+        # Rebuild coarser once most paths are used, so searches do not
+        #scan more and more empty cells
+        if (n - step)*4 < built:
+            remaining = np.flatnonzero(is_free).tolist()
+            grid = _endpoint_grid(starts, ends, remaining)
+            built = len(remaining)
+
+        index, = _closest(grid, x, y)
+        count = index % n
+        flip = index >= n
+
+        grid.remove(count)
+        if count + n in grid.points:
+            grid.remove(count + n)
+        is_free[count] = False
+
+        tour.append(count)
+        flipped.append(flip)
+        x, y = (starts if flip else ends)[count].tolist()
+
+    return tour, flipped
+
+def _neighbour_lists(starts, ends, neighbours):
+    # The nearest other paths to either end of each path
+    n = len(starts)
+    grid = _endpoint_grid(starts, ends, range(n))
+
+    lists = []
+    for count in range(n):
+        near = set()
+        for x, y in (starts[count].tolist(), ends[count].tolist()):
+            near.update(index % n 
+                        for index in _closest(grid, x, y, neighbours + 2))
+        near.discard(count)
+        lists.append(sorted(near))
+    return lists
+
+def two_opt(starts, ends, tour, flipped, neighbours=8, max_passes=10):
+    '''
+    Improve a tour by reversing runs of paths while that shortens it
+
+    Reversing the run from step i + 1 to step j only changes the two
+    travel moves around it, so each move is checked in constant time. The
+    run is only ended at paths near the end of step i.
+
+    Parameters
+    ----------
+    starts, ends : numpy.ndarray
+        (N, 2) first and last point of each path.
+    tour, flipped : list
+        Tour to improve, see nearest_neighbour_tour. The first path
+        stays first.
+    neighbours : int, optional
+        Nearby paths tried for each step. The default is 8.
+    max_passes : int, optional
+        Most passes over the tour. The default is 10.
+
+    Returns
+    -------
+    tour, flipped : list
+        The improved tour.
+
+    '''
+    n = len(tour)
+    if n < 2:
+        return list(tour), list(flipped)
+
+    tour = list(tour)
+    flipped = list(flipped)
+    position = [0]*n
+    for step, count in enumerate(tour):
+        position[count] = step
+
+    start_points = starts.tolist()
+    end_points = ends.tolist()
+    near = _neighbour_lists(starts, ends, neighbours)
+
+    def entry(step):
+        count = tour[step]
+        return end_points[count] if flipped[step] else start_points[count]
+
+    def exit_(step):
+        count = tour[step]
+        return start_points[count] if flipped[step] else end_points[count]
+
+    for _ in range(max_passes):
+        improved = False
+        for i in range(n - 1):
+            a = exit_(i)
+            b = entry(i + 1)
+            for count in near[tour[i]]:
+                j = position[count]
+                if j <= i:
+                    continue
+
+                c = exit_(j)
+                old = math.dist(a, b)
+                new = math.dist(a, c)
+                if j + 1 < n:
+                    d = entry(j + 1)
+                    old += math.dist(c, d)
+                    new += math.dist(b, d)
+
+                if new < old - 1e-9:
+                    tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1]
+                    flipped[i + 1:j + 1] = [not flip for flip
+                                            in flipped[i + 1:j + 1][::-1]]
+                    for step in range(i + 1, j + 1):
+                        position[tour[step]] = step
+                    b = entry(i + 1)
+                    improved = True
+
+        if not improved:
+            break
+
+    return tour, flipped
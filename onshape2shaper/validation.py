@@ -0,0 +1,389 @@
+'''
+Geometry checks on the stitched paths
+
+    report = vector_object(input_path).onshape2shaper(output_path,
+                                                      validate=True)
+    svg.validation_report.to_json('drawing.validation.json')
+
+Shaper cuts interior, exterior and pocket groups around closed contours, so
+open paths in them are flagged. Crossings between segments, of a path with
+itself or with another path, are found by bucketing samples of every
+segment into a grid and only testing segments that share or neighbour a
+cell. Only crossings between those contours make a report invalid, ones
+involving an on-line or other open cut are listed as line crossings. Closed contours are nested by testing a point of each against the
+contours whose bounds hold it, and contours wound the wrong way for their
+depth can be reversed: outer contours clockwise on screen, the contours in
+them anticlockwise, alternating inwards.
+
+Every step works on the packed points of all paths at once, points in the
+report are in drawing units.
+'''
+import json
+
+import numpy as np
+
+from onshape2shaper.model import cut_type
+
+#Cut types Shaper needs closed contours for
+CLOSED_CUTS = (cut_type.interior, cut_type.exterior, cut_type.pocket)
+
+#Sign of signed_areas for contours at an even nesting depth, positive is
+#clockwise on screen as SVG y points down
+OUTER_WINDING = 1
+
+class validation_report():
+    '''
+    Problems found in the paths of one conversion, see validate_paths
+
+    Groups are referred to by their index in groups and paths by their
+    index in the group.
+    '''
+
+    def __init__(self, input_path=None):
+
+        self.input_path = None if input_path is None else str(input_path)
+        #Style, cut type and depth of each group
+        self.groups = []
+        self.paths = 0
+        self.open_paths = []
+        self.self_intersections = []
+        self.intersections = []
+        #Crossings involving a path outside CLOSED_CUTS, warnings only
+        self.line_crossings = []
+        #Contours wound the wrong way for their nesting depth
+        self.winding = []
+
+    @property
+    def is_valid(self):
+        '''
+        No open cuts or crossings of closed cuts, winding can always be 
+        normalized and line crossings are only warnings
+        '''
+        return not (self.open_paths or self.self_intersections
+                    or self.intersections)
+
+    def to_dict(self):
+        return {'input_path': self.input_path, 'is_valid': self.is_valid,
+                'paths': self.paths, 'groups': self.groups,
+                'open_paths': self.open_paths,
+                'self_intersections': self.self_intersections,
+                'intersections': self.intersections,
+                'line_crossings': self.line_crossings,
+                'winding': self.winding}
+
+    def to_json(self, path=None, indent=2):
+        '''
+        Serialize the report, and write it to path if one is given
+
+        Parameters
+        ----------
+        path : str or pathlib.Path, optional
+            File to write. The default is None.
+        indent : int, optional
+            JSON indent. The default is 2.
+
+        Returns
+        -------
+        str
+            The JSON text.
+
+        '''
+        text = json.dumps(self.to_dict(), indent=indent)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+
+    def __str__(self):
+        return ('{} path(s): {} open, {} self intersection(s), {} '
+                'intersection(s), {} line crossing(s), {} wound the wrong '
+                'way'.format(
+                    self.paths, len(self.open_paths),
+                    len(self.self_intersections), len(self.intersections),
+                    len(self.line_crossings), len(self.winding)))
+
+def open_paths(points, offsets):
+    '''
+    Paths whose last point is not their first
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        (N, 2) points of all paths.
+    offsets : numpy.ndarray
+        Path i is points[offsets[i]:offsets[i+1]].
+
+    Returns
+    -------
+    numpy.ndarray
+        (M,) True for each open path, paths without points are not open.
+
+    '''
+    lengths = np.diff(offsets)
+    is_open = np.zeros(len(lengths), dtype=bool)
+    filled = lengths > 0
+    is_open[filled] = np.any(points[offsets[:-1][filled]]
+                             != points[offsets[1:][filled] - 1], axis=1)
+    return is_open
+
+def signed_areas(points, offsets):
+    '''
+    Shoelace area of each path as if closed, positive when clockwise on
+    screen
+
+    Parameters
+    ----------
+    points, offsets : numpy.ndarray
+        Packed paths, see open_paths.
+
+    Returns
+    -------
+    numpy.ndarray
+        (M,) areas.
+
+    '''
+    lengths = np.diff(offsets)
+    if not len(points):
+        return np.zeros(len(lengths))
+
+    #Each point to the next in its path, the last back to the first
+    following = np.arange(1, len(points) + 1)
+    ends = offsets[1:][lengths > 0] - 1
+    following[ends] = offsets[:-1][lengths > 0]
+
+    x, y = points.T
+    cross = x*y[following] - x[following]*y
+
+    areas = np.zeros(len(lengths))
+    path_of_point = np.repeat(np.arange(len(lengths)), lengths)
+    np.add.at(areas, path_of_point, cross)
+    return areas/2
+
+def _segments(points, offsets):
+    # Index of the first point of every segment of non zero length, and
+    #the path it is in
+    lengths = np.diff(offsets)
+    path_of_point = np.repeat(np.arange(len(lengths)), lengths)
+    is_segment = np.ones(len(points), dtype=bool)
+    is_segment[offsets[1:][lengths > 0] - 1] = False
+    segments = np.flatnonzero(is_segment)
+    segments = segments[np.any(points[segments] != points[segments + 1],
+                               axis=1)]
+    return segments, path_of_point[segments]
+
+def _candidate_pairs(start, end, cell_size):
+    '''
+    Pairs (i, j), i < j, of segments that come within a cell of each other
+
+    Every segment is sampled at half a cell spacing and each sample put in
+    its cell. Where two segments cross, a sample of each is within half a
+    cell of the crossing, so their cells are at most one apart: each
+    sample is looked up in the 3 x 3 cells around it.
+    '''
+    delta = end - start
+    steps = np.ceil(np.abs(delta).max(axis=1)/(cell_size/2)).astype(np.intp)
+    steps += 1
+
+    owner = np.repeat(np.arange(len(start)), steps)
+    first = np.repeat(np.cumsum(steps) - steps, steps)
+    t = (np.arange(len(owner)) - first)/np.repeat(np.maximum(steps - 1, 1),
+                                                   steps)
+    samples = start[owner] + delta[owner]*t[:, None]
+
+    cells = np.floor((samples - samples.min(axis=0))/cell_size)
+    cells = cells.astype(np.int64) + 1
+    width = int(cells[:, 1].max()) + 2
+
+    #One entry per segment and cell it has a sample in
+    entries = np.unique((cells[:, 0]*width + cells[:, 1])*len(start)
+                        + owner)
+    keys, owner = entries//len(start), entries % len(start)
+
+    #Entries come sorted by cell, each is looked up from the cells around
+    neighbours = (np.array([-1, 0, 1])[:, None]*width
+                  + np.array([-1, 0, 1])[None, :]).ravel()
+    query = (keys[:, None] + neighbours[None, :]).ravel()
+    query_owner = np.repeat(owner, len(neighbours))
+    low = np.searchsorted(keys, query, 'left')
+    counts = np.searchsorted(keys, query, 'right') - low
+
+    first = np.repeat(query_owner, counts)
+    within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts,
+                                                 counts)
+    second = owner[np.repeat(low, counts) + within]
+
+    is_pair = first < second
+    pairs = np.unique(first[is_pair]*len(start) + second[is_pair])
+    return pairs//len(start), pairs % len(start)
+
+def segment_intersections(points, offsets, cell_size=None):
+    '''
+    Points where segments of the paths cross
+
+    Only proper crossings are found: segments that touch at an end, such as
+    neighbours in a path, or that overlap along a line are not reported.
+
+    Parameters
+    ----------
+    points, offsets : numpy.ndarray
+        Packed paths, see open_paths.
+    cell_size : float, optional
+        Grid cell size. The default of None is the mean segment length,
+        which keeps the number of samples to about three per segment.
+
+    Returns
+    -------
+    path_a, path_b : numpy.ndarray
+        Paths of each crossing, path_a <= path_b, equal for a path that
+        crosses itself.
+    crossings : numpy.ndarray
+        (K, 2) crossing points.
+
+    '''
+    segments, path_of_segment = _segments(points, offsets)
+    if len(segments) < 2:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty, np.zeros((0, 2))
+
+    start = points[segments]
+    end = points[segments + 1]
+    if cell_size is None:
+        cell_size = np.hypot(*(end - start).T).mean()
+
+    i, j = _candidate_pairs(start, end, cell_size)
+
+    a, b = start[i], end[i]
+    c, d = start[j], end[j]
+    ab, cd = b - a, d - c
+
+    def cross(u, v):
+        return u[:, 0]*v[:, 1] - u[:, 1]*v[:, 0]
+
+    #Orientations of each segment's ends to the other, zero within
+    #rounding of the segment lengths
+    scale = 1e-9*np.hypot(*ab.T)*np.hypot(*cd.T)
+    sides = [np.where(np.abs(value) > scale, np.sign(value), 0)
+             for value in (cross(ab, c - a), cross(ab, d - a),
+                           cross(cd, a - c), cross(cd, b - c))]
+    crosses = (sides[0]*sides[1] < 0) & (sides[2]*sides[3] < 0)
+
+    i, j = i[crosses], j[crosses]
+    a, ab, cd = a[crosses], ab[crosses], cd[crosses]
+    t = cross(start[j] - a, cd)/cross(ab, cd)
+
+    path_a, path_b = path_of_segment[i], path_of_segment[j]
+    swap = path_a > path_b
+    path_a[swap], path_b[swap] = path_b[swap], path_a[swap]
+
+    return path_a, path_b, a + ab*t[:, None]
+
+def nesting_depths(points, offsets, is_contour):
+    '''
+    How many other contours each contour lies inside
+
+    A contour is inside another when its first point is, by the even-odd
+    rule. Only contours whose bounds hold the point are tested, found
+    through a grid of the contour bounds.
+
+    Parameters
+    ----------
+    points, offsets : numpy.ndarray
+        Packed paths, see open_paths.
+    is_contour : numpy.ndarray
+        (M,) True for the closed paths to nest, the rest get depth -1.
+
+    Returns
+    -------
+    numpy.ndarray
+        (M,) depth of each path, 0 for outermost contours.
+
+    '''
+    depths = np.full(len(offsets) - 1, -1, dtype=np.intp)
+    contours = np.flatnonzero(is_contour & (np.diff(offsets) > 2))
+    depths[contours] = 0
+    if len(contours) < 2:
+        return depths
+
+    starts, stops = offsets[contours], offsets[contours + 1]
+    lengths = stops - starts
+    path_of_point = np.repeat(np.arange(len(contours)), lengths)
+    index = (np.arange(lengths.sum())
+             - np.repeat(np.cumsum(lengths) - lengths, lengths)
+             + np.repeat(starts, lengths))
+    contour_points = points[index]
+    low = np.full((len(contours), 2), np.inf)
+    high = np.full((len(contours), 2), -np.inf)
+    np.minimum.at(low, path_of_point, contour_points)
+    np.maximum.at(high, path_of_point, contour_points)
+
+    #Bounds of every contour put in each cell they cover
+    origin = low.min(axis=0)
+    span = np.maximum(high.max(axis=0) - origin, 1e-9)
+    cell_size = max(np.sqrt(span[0]*span[1]/len(contours)), 1e-9)
+    cell_low = np.floor((low - origin)/cell_size).astype(np.int64)
+    cell_high = np.floor((high - origin)/cell_size).astype(np.int64)
+    width = int(cell_high[:, 1].max()) + 1
+    nx = cell_high[:, 0] - cell_low[:, 0] + 1
+    ny = cell_high[:, 1] - cell_low[:, 1] + 1
+    count = nx*ny
+
+    owner = np.repeat(np.arange(len(contours)), count)
+    local = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count,
+                                               count)
+    keys = ((cell_low[owner, 0] + local % nx[owner])*width
+            + cell_low[owner, 1] + local//nx[owner])
+    order = np.argsort(keys, kind='stable')
+    keys, owner = keys[order], owner[order]
+
+    #Contours whose bounds hold the first point of each contour
+    probe = points[starts]
+    probe_cells = np.floor((probe - origin)/cell_size).astype(np.int64)
+    probe_keys = probe_cells[:, 0]*width + probe_cells[:, 1]
+    first = np.searchsorted(keys, probe_keys, 'left')
+    counts = np.searchsorted(keys, probe_keys, 'right') - first
+    inner = np.repeat(np.arange(len(contours)), counts)
+    outer = owner[np.repeat(first, counts)
+                  + np.arange(counts.sum())
+                  - np.repeat(np.cumsum(counts) - counts, counts)]
+    holds = ((outer != inner)
+             & np.all(low[outer] <= probe[inner], axis=1)
+             & np.all(high[outer] >= probe[inner], axis=1))
+    inner, outer = inner[holds], outer[holds]
+
+    #Even-odd test of each probe against every edge of its candidates
+    edges = lengths[outer] - 1
+    pair = np.repeat(np.arange(len(inner)), edges)
+    edge = (np.arange(edges.sum()) - np.repeat(np.cumsum(edges) - edges,
+                                               edges)
+            + np.repeat(starts[outer], edges))
+    x, y = probe[inner[pair]].T
+    x1, y1 = points[edge].T
+    x2, y2 = points[edge + 1].T
+    straddles = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossing = x < x1 + (y - y1)*(x2 - x1)/(y2 - y1)
+    crossings = np.bincount(pair, straddles & crossing, len(inner))
+
+    inside = crossings.astype(np.intp) % 2 == 1
+    depths[contours] = np.bincount(inner[inside], minlength=len(contours))
+    return depths
+
+def misoriented(areas, depths):
+    '''
+    Contours wound the wrong way for their depth, see OUTER_WINDING
+
+    Parameters
+    ----------
+    areas : numpy.ndarray
+        signed_areas of the paths.
+    depths : numpy.ndarray
+        nesting_depths of the paths, -1 for paths that are not contours.
+
+    Returns
+    -------
+    numpy.ndarray
+        (M,) True for contours to reverse, never for zero area ones.
+
+    '''
+    expected = np.where(depths % 2 == 0, OUTER_WINDING, -OUTER_WINDING)
+    return (depths >= 0) & (areas != 0) & (np.sign(areas) != expected)
@@ -1,14 +1,31 @@
+import re
+
 from setuptools import setup, find_packages
 
+# Read the version from the package without importing it
+with open('onshape2shaper/__init__.py') as f:
+    version = re.search(r"^__version__ = '([^']+)'", f.read(), 
+                        re.MULTILINE).group(1)
+
 # Read in requirements.txt
 with open('requirements.txt') as f:
     requirements = f.read().splitlines()
 
 setup(
     name='onshape-to-shaper',
-    version='1.0.0',
+    version=version,
     description='A Python package to convert Onshape drawings to Shaper tool format.',
     author='Darren Lynch',
     packages=find_packages(),
     install_requires=requirements,
+    extras_require={
+        # The networkx stitcher, --stitcher networkx, kept for comparison
+        'legacy': ['networkx'],
+    },
+    entry_points={
+        'console_scripts': [
+            'onshape2shaper=onshape2shaper.cli:main',
+            'onshape2shaper-server=onshape2shaper.server:main',
+        ],
+    },
 )
@@ -0,0 +1,66 @@
+from onshape2shaper.cache import conversion_cache
+
+def test_extras_are_cached_with_the_entry(tmp_path):
+    output = tmp_path/'out.svg'
+    output.write_text('<svg/>')
+    report = tmp_path/'out.validation.json'
+    report.write_text('{}')
+    cache = conversion_cache(tmp_path/'cache')
+
+    cache.store('ab12', output)
+    assert not cache.fetch('ab12', tmp_path/'copy.svg', 
+                           {'validation': tmp_path/'copy.json'})
+
+    cache.store('ab12', output, {'validation': report})
+    assert cache.fetch('ab12', tmp_path/'copy.svg', 
+                       {'validation': tmp_path/'copy.json'})
+    assert (tmp_path/'copy.json').read_text() == '{}'
+    assert cache.size == len('<svg/>') + len('{}')
+
+    cache.max_bytes = 0
+    cache.evict()
+    assert cache.size == 0
+    assert not list((tmp_path/'cache').glob('*/*'))
+
+def test_miss_copies_no_extras(tmp_path):
+    output = tmp_path/'out.svg'
+    output.write_text('<svg/>')
+    report = tmp_path/'out.validation.json'
+    report.write_text('{}')
+    cache = conversion_cache(tmp_path/'cache')
+    
+    cache.store('ab12', output, {'validation': report})
+    cache._path('ab12').unlink()
+    assert not cache.fetch('ab12', tmp_path/'copy.svg', 
+                           {'validation': tmp_path/'copy.json'})
+    assert not (tmp_path/'copy.json').exists()
+    assert not (tmp_path/'copy.svg').exists()
+
+def test_key_changes_with_output_version(tmp_path, monkeypatch):
+    import onshape2shaper.cache as cache_module
+
+    drawing = tmp_path/'drawing.svg'
+    drawing.write_text('<svg/>')
+    cache = conversion_cache(tmp_path/'cache')
+    key = cache.key(drawing, {'precision': 2})
+    monkeypatch.setattr(cache_module, 'OUTPUT_VERSION', 
+                        cache_module.OUTPUT_VERSION + 1)
+    assert cache.key(drawing, {'precision': 2}) != key
+
+def test_group_cache_trims_disk_without_listing_it(tmp_path, monkeypatch):
+    import pathlib
+
+    import numpy as np
+
+    from onshape2shaper.cache import group_cache
+
+    cache = group_cache(tmp_path, max_entries=3)
+    monkeypatch.setattr(pathlib.Path, 'glob', None)
+    for count in range(5):
+        cache.put('key{}'.format(count), [np.zeros((2, 2))])
+    monkeypatch.undo()
+
+    assert sorted(path.stem for path in tmp_path.glob('*.npz')) == [
+        'key2', 'key3', 'key4']
+    reopened = group_cache(tmp_path, max_entries=3)
+    assert sorted(reopened.disk_entries) == ['key2', 'key3', 'key4']
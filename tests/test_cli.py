@@ -0,0 +1,79 @@
+import pathlib
+import shutil
+import subprocess
+import sys
+
+from onshape2shaper import cli
+
+ROOT = pathlib.Path(__file__).parent.parent
+EXAMPLE = ROOT/'examples'/'WallBrace.svg'
+
+def verbose_stderr(tmp_path, *options):
+    # In a fresh interpreter, so the logging set up by --verbose does not
+    #leak into other tests
+    completed = subprocess.run(
+        [sys.executable, '-m', 'onshape2shaper.cli', str(EXAMPLE), 
+         '-o', str(tmp_path), '-j', '1', '--verbose', *options],
+        capture_output=True, text=True, cwd=ROOT, check=True)
+    return completed.stderr
+
+def test_converts_and_exits_zero(tmp_path, capsys):
+    assert cli.main([str(EXAMPLE), '-o', str(tmp_path), '-j', '1']) == 0
+    assert (tmp_path/'WallBrace.svg').exists()
+    assert '1 converted, 0 failed' in capsys.readouterr().out
+
+def test_failure_exits_non_zero(tmp_path, capsys):
+    broken = tmp_path/'broken.svg'
+    broken.write_text('<svg><g>')
+    assert cli.main([str(broken), '-o', str(tmp_path/'out'), '-j', '1']) == 1
+    assert 'FAIL' in capsys.readouterr().out
+
+def test_unmatched_pattern_exits_non_zero(tmp_path):
+    assert cli.main([str(tmp_path/'*.svg'), '-o', str(tmp_path)]) == 1
+
+def test_refuses_to_overwrite_input(tmp_path, capsys):
+    drawing = tmp_path/'drawing.svg'
+    shutil.copyfile(EXAMPLE, drawing)
+    before = drawing.read_bytes()
+    assert cli.main([str(drawing), '-o', str(tmp_path)]) == 1
+    assert 'would be overwritten' in capsys.readouterr().err
+    assert drawing.read_bytes() == before
+
+def test_rejects_inputs_writing_the_same_output(tmp_path, capsys):
+    for directory in ('a', 'b'):
+        (tmp_path/directory).mkdir()
+        shutil.copyfile(EXAMPLE, tmp_path/directory/'x.svg')
+    assert cli.main([str(tmp_path/'a'/'x.svg'), str(tmp_path/'b'/'x.svg'),
+                     '-o', str(tmp_path/'out'), '-j', '2']) == 1
+    captured = capsys.readouterr()
+    assert '1 converted, 1 failed' in captured.out
+    assert 'rename one of them' in captured.err
+
+def test_verbose_reports_snapped_endpoints(tmp_path):
+    stderr = verbose_stderr(tmp_path, '--join-tolerance', '0.05')
+    assert 'Converting {}'.format(EXAMPLE) in stderr
+    assert 'Snapped 0 endpoint(s) in group stroke=#000000' in stderr
+
+def test_quiet_without_verbose(tmp_path, capsys):
+    assert cli.main([str(EXAMPLE), '-o', str(tmp_path), '-j', '1', 
+                     '--join-tolerance', '0.05']) == 0
+    assert 'Snapped' not in capsys.readouterr().err
+
+def test_verbose_reports_reused_groups(tmp_path):
+    group_cache_dir = str(tmp_path/'groups')
+    assert 'Reused 0 group(s), stitched 1' in verbose_stderr(
+        tmp_path/'first', '--group-cache-dir', group_cache_dir)
+    assert 'Reused 1 group(s), stitched 0' in verbose_stderr(
+        tmp_path/'second', '--group-cache-dir', group_cache_dir)
+
+def test_verbose_reports_travel(tmp_path):
+    assert 'Travel between 1 path(s) cut from' in verbose_stderr(
+        tmp_path, '--order-paths')
+
+def test_verbose_reports_simplification(tmp_path):
+    assert 'Simplified 100 to 48 vertices' in verbose_stderr(
+        tmp_path, '--simplify', '0.05')
+
+def test_verbose_reports_removed_duplicates(tmp_path):
+    assert 'Dropped 0 duplicate polyline(s)' in verbose_stderr(
+        tmp_path, '--dedup')
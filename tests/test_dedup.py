@@ -0,0 +1,68 @@
+import numpy as np
+
+import onshape2shaper.svg2svg as s2s
+from onshape2shaper.dedup import dedup_segments
+from onshape2shaper.model import pack_polylines
+
+def circle(segments, radius=50.):
+    angle = np.linspace(0, 2*np.pi, segments + 1)
+    points = radius*np.stack((np.cos(angle), np.sin(angle)), axis=1)
+    points[-1] = points[0]
+    return points
+
+def square(low, high):
+    return np.array([[low, low], [high, low], [high, high], [low, high],
+                     [low, low]])
+
+def test_clean_input_is_untouched():
+    points, offsets = pack_polylines([circle(2000), square(0., 10.),
+                                      square(20., 30.)])
+    new_points, new_offsets, report = dedup_segments(points, offsets)
+    assert new_points is points
+    assert new_offsets is offsets
+    assert report['overlapping_segments'] == 0
+    assert report['removed_length'] == 0
+
+def test_near_parallel_segments_are_untouched():
+    #Fan of segments from one point, each a little further round, and
+    #parallel lines closer than the segments are long
+    fan = [np.array([[0., 0.], [10*np.cos(a), 10*np.sin(a)]])
+           for a in np.arange(20)*3e-4]
+    parallel = [np.array([[0., 5 + 0.01*k], [100., 5 + 0.01*k]])
+                for k in range(20)]
+    points, offsets = pack_polylines(fan + parallel)
+    new_points, new_offsets, report = dedup_segments(points, offsets)
+    assert new_points is points
+    assert report['overlapping_segments'] == 0
+
+def test_closed_contour_stays_closed():
+    #A shared edge drawn again, partly overlapping the side of the square
+    #it lies on
+    points, offsets = pack_polylines([square(0., 10.),
+                                      np.array([[4., 0.], [15., 0.]])])
+    points, offsets, report = dedup_segments(points, offsets)
+    assert report['overlapping_segments'] == 2
+    assert np.isclose(report['removed_length'], 6)
+
+    polylines = s2s.stitch_polylines(np.split(points, offsets[1:-1]))
+    closed = [polyline for polyline in polylines
+              if np.array_equal(polyline[0], polyline[-1])]
+    assert len(closed) == 1
+    assert np.isclose(np.hypot(*np.diff(closed[0], axis=0).T).sum(), 40)
+    total = sum(np.hypot(*np.diff(polyline, axis=0).T).sum()
+                for polyline in polylines)
+    assert np.isclose(total, 45)
+
+def test_kept_copies_meet_the_ends_of_dropped_ones():
+    #A square below the first, sharing its top edge written a little off
+    below = np.array([[0., 1e-4], [10., 1e-4], [10., -10.], [0., -10.],
+                      [0., 1e-4]])
+    points, offsets = pack_polylines([square(0., 10.), below])
+    points, offsets, report = dedup_segments(points, offsets)
+    assert report['duplicate_segments'] == 1
+    assert len(np.unique(points, axis=0)) == 6
+    
+    polylines = s2s.stitch_polylines(np.split(points, offsets[1:-1]))
+    assert np.isclose(sum(np.hypot(*np.diff(polyline, axis=0).T).sum()
+                          for polyline in polylines), 70)
+    assert len(np.unique(np.concatenate(polylines), axis=0)) == 6
@@ -0,0 +1,50 @@
+import pathlib
+import struct
+import zlib
+
+import numpy as np
+
+import onshape2shaper.svg2svg as s2s
+from onshape2shaper import cli
+from onshape2shaper.preview import ENDPOINT_COLOUR, render
+
+EXAMPLE = pathlib.Path(__file__).parent.parent/'examples'/'WallBrace.svg'
+
+def read_png(data):
+    # Decode the PNGs encode_png writes: 8 bit RGB, filter 0 on every row
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    chunks = {}
+    position = 8
+    while position < len(data):
+        length, tag = struct.unpack('>I4s', data[position:position + 8])
+        chunks[tag] = data[position + 8:position + 8 + length]
+        position += length + 12
+    width, height = struct.unpack('>II', chunks[b'IHDR'][:8])
+    rows = np.frombuffer(zlib.decompress(chunks[b'IDAT']), dtype=np.uint8)
+    return rows.reshape(height, width*3 + 1)[:, 1:].reshape(height, width, 3)
+
+def test_conversion_writes_preview(tmp_path):
+    s2s.vector_object(EXAMPLE).onshape2shaper(tmp_path/'out.svg', 
+                                              preview_png=tmp_path/'out.png')
+    image = read_png((tmp_path/'out.png').read_bytes())
+    assert image.shape[1] == 1024
+    assert np.any(image != 255)
+
+def test_preview_of_converted_file_matches(tmp_path):
+    s2s.vector_object(EXAMPLE).onshape2shaper(
+        tmp_path/'out.svg', preview_png=tmp_path/'converting.png')
+    cli.preview_file(tmp_path/'out.svg', tmp_path/'converted.png')
+    assert ((tmp_path/'converted.png').read_bytes() 
+            == (tmp_path/'converting.png').read_bytes())
+
+def test_plot_line_checker_writes_png_beside_output(tmp_path):
+    s2s.vector_object(EXAMPLE).onshape2shaper(tmp_path/'out.svg', 
+                                              plot_line_checker=True)
+    image = read_png((tmp_path/'out.png').read_bytes())
+    assert np.any(image != 255)
+
+def test_open_path_ends_are_marked():
+    square = np.array([[0., 0.], [10., 0.], [10., 10.], [0., 10.], [0., 0.]])
+    is_red = lambda image: np.all(image == ENDPOINT_COLOUR, axis=-1).any()
+    assert not is_red(render([square], width=64))
+    assert is_red(render([square[:-1]], width=64))
@@ -0,0 +1,26 @@
+import io
+import pathlib
+import tracemalloc
+
+import pytest
+
+import onshape2shaper.svg2svg as s2s
+
+EXAMPLE = pathlib.Path(__file__).parent.parent/'examples'/'WallBrace.svg'
+
+def test_report_has_every_stage(tmp_path):
+    report = s2s.vector_object(EXAMPLE).onshape2shaper(tmp_path/'out.svg', 
+                                                       profile=True)
+    assert report.stage('stitch_groups') is not None
+    assert report.stage('tosvg').paths > 0
+    assert not tracemalloc.is_tracing()
+
+def test_stage_raising_stops_memory_tracing(monkeypatch):
+    def fail(self, workers=None):
+        raise RuntimeError('stitching failed')
+    monkeypatch.setattr(s2s.vector_object, 'stitch_groups', fail)
+
+    with pytest.raises(RuntimeError):
+        s2s.vector_object(EXAMPLE).onshape2shaper(io.BytesIO(), 
+                                                  profile=True)
+    assert not tracemalloc.is_tracing()
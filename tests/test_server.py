@@ -0,0 +1,91 @@
+import http.client
+import json
+import pathlib
+import threading
+
+import pytest
+
+from onshape2shaper.server import conversion_server, worker_pool
+
+EXAMPLE = pathlib.Path(__file__).parent.parent/'examples'/'WallBrace.svg'
+
+#Enough polylines that converting takes far longer than a millisecond
+LARGE_SVG = ('<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+             '<svg width="100mm" height="100mm" viewBox="0 0 1000 1000" '
+             'xmlns="http://www.w3.org/2000/svg">\n'
+             '<g fill="none" stroke="black" stroke-width="1">\n'
+             '<g fill="none" stroke="#000030" stroke-width="4">\n'
+             + ''.join('<polyline fill="none" points="{0},{1} {0},{2} " />\n'
+                       .format(x, y, y + 1) 
+                       for x in range(200) for y in range(200))
+             + '</g>\n</g>\n</svg>\n').encode()
+
+@pytest.fixture(scope='module')
+def pool():
+    pool = worker_pool(1, timeout=30, queue_size=0)
+    yield pool
+    pool.close()
+
+@pytest.fixture
+def server(pool):
+    server = conversion_server(('127.0.0.1', 0), pool)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def request(server, method, path, body=None):
+    connection = http.client.HTTPConnection(*server.server_address, 
+                                            timeout=30)
+    try:
+        connection.request(method, path, body)
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+def test_convert_and_metrics(server):
+    status, _, body = request(server, 'POST', '/convert', 
+                              EXAMPLE.read_bytes())
+    assert status == 200
+    assert b'<path' in body
+    
+    status, _, body = request(server, 'GET', '/metrics')
+    assert status == 200
+    metrics = json.loads(body)
+    assert metrics['requests']['/convert'] == {'200': 1}
+    assert metrics['latency_seconds']['/convert']['count'] == 1
+    assert metrics['bytes_in'] == EXAMPLE.stat().st_size
+    assert metrics['pool']['workers'] == 1
+
+def test_too_large_is_413(server):
+    server.max_bytes = 100
+    status, _, body = request(server, 'POST', '/convert', 
+                              EXAMPLE.read_bytes())
+    assert status == 413
+    assert b'larger than 100 bytes' in body
+
+def test_full_queue_is_503(server, pool):
+    #Take the only slot, as a request converting would
+    pool._slots.acquire()
+    try:
+        status, headers, _ = request(server, 'POST', '/convert', 
+                                     EXAMPLE.read_bytes())
+    finally:
+        pool._slots.release()
+    assert status == 503
+    assert headers['Retry-After'] == '1'
+
+def test_slow_conversion_is_504_and_worker_replaced(server, pool):
+    restarts = pool.restarts
+    pool.timeout = 0.001
+    try:
+        status, _, body = request(server, 'POST', '/convert', LARGE_SVG)
+    finally:
+        pool.timeout = 30
+    assert status == 504
+    assert pool.restarts == restarts + 1
+    
+    status, _, _ = request(server, 'POST', '/convert', EXAMPLE.read_bytes())
+    assert status == 200
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+import onshape2shaper.svg2svg as s2s
+from onshape2shaper.simplify import format_arc_paths, simplify_points
+
+def test_parse_path_follows_arcs():
+    angle = np.linspace(0, np.pi/2, 50)
+    points = 10*np.stack((np.cos(angle), np.sin(angle)), axis=1) + 20
+    offsets = np.array([0, len(points)])
+    keep, arcs = simplify_points(points, offsets, 0.01, arcs=True)
+    d, = format_arc_paths(points[keep], np.array([0, keep.sum()]),
+                          np.nan_to_num(arcs[keep, 2:5]), precision=4)
+    assert 'A' in d
+
+    parsed = s2s.parse_path(d)
+    assert len(parsed) > keep.sum()
+    assert np.allclose(parsed[[0, -1]], points[[0, -1]])
+    assert np.allclose(np.hypot(*(parsed - 20).T), 10, atol=0.01)
+
+def test_fit_arcs_rejects_relative_paths():
+    with pytest.raises(ValueError):
+        s2s.vector_object('drawing.svg', simplify=0.05, fit_arcs=True,
+                          relative_paths=True)
@@ -0,0 +1,48 @@
+import pathlib
+
+import numpy as np
+
+import onshape2shaper.svg2svg as s2s
+
+DEGENERATE_SVG = b'''<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<svg width="100mm" height="100mm" viewBox="0 0 1000 1000" xmlns="http://www.w3.org/2000/svg">
+<g fill="none" stroke="black" stroke-width="1">
+<g fill="none" stroke="#000030" stroke-width="5">
+<polyline fill="none" points="10,10 10,10 " />
+</g>
+</g>
+</svg>
+'''
+
+def test_zero_length_polyline_has_no_chains():
+    assert s2s.stitch_polylines([np.array([[10., 10.], [10., 10.]])]) == []
+
+def test_convert_group_of_zero_length_polylines():
+    output = s2s.convert(DEGENERATE_SVG).decode()
+    assert '<path' not in output
+
+def test_stitch_closes_square():
+    square = [np.array([[0., 0.], [1., 0.]]), np.array([[1., 1.], [1., 0.]]),
+              np.array([[1., 1.], [0., 1.], [0., 0.]])]
+    polylines = s2s.stitch_polylines(square)
+    assert len(polylines) == 1
+    assert len(polylines[0]) == 5
+    assert np.array_equal(polylines[0][0], polylines[0][-1])
+
+def test_parallel_stitching_matches_serial(tmp_path):
+    example = pathlib.Path(__file__).parent.parent/'examples'/'WallBrace.svg'
+    s2s.vector_object(example).onshape2shaper(tmp_path/'serial.svg')
+    svg = s2s.vector_object(example)
+    svg.onshape2shaper(tmp_path/'parallel.svg', workers=2)
+    assert all(record.path_data is not None 
+               for record in svg.document.records if not record.is_anchor)
+    assert ((tmp_path/'parallel.svg').read_bytes() 
+            == (tmp_path/'serial.svg').read_bytes())
+
+def test_snap_points_joins_the_earliest_point():
+    # Both earlier points are within tolerance of the last one, the grid 
+    #finds the later one first as it sits in a lower cell
+    points = np.array([[2.2, 0.5], [0.9, 0.5], [1.55, 0.5]])
+    snapped, moved = s2s.snap_points(points, 1.)
+    assert np.array_equal(snapped, points[[0, 1, 0]])
+    assert moved.tolist() == [False, False, True]
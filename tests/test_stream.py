@@ -0,0 +1,20 @@
+import io
+import pathlib
+
+import pytest
+
+import onshape2shaper.svg2svg as s2s
+
+EXAMPLE = pathlib.Path(__file__).parent.parent/'examples'/'WallBrace.svg'
+
+def test_stream_matches_onshape2shaper():
+    data = EXAMPLE.read_bytes()
+    sink = io.BytesIO()
+    s2s.convert_stream(data, sink)
+    assert sink.getvalue() == s2s.convert(data)
+
+@pytest.mark.parametrize('option', s2s.STREAM_UNSUPPORTED)
+def test_stream_rejects_whole_document_options(option):
+    with pytest.raises(ValueError):
+        s2s.convert_stream(EXAMPLE.read_bytes(), io.BytesIO(), 
+                           **{option: True})
@@ -0,0 +1,68 @@
+import io
+
+import numpy as np
+
+import onshape2shaper.svg2svg as s2s
+from onshape2shaper.model import cut_type
+from onshape2shaper.toolpath import order_paths, travel_distance
+
+#10 pixels per mm, a stroke width of 2 is interior, 4 exterior and 6 
+#pocket, the stroke colour is the depth in 1/10th mm
+DRAWING = '''<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<svg width="100mm" height="100mm" viewBox="0 0 1000 1000" xmlns="http://www.w3.org/2000/svg">
+<g fill="none" stroke="black" stroke-width="1">
+{}
+</g>
+</svg>
+'''
+
+def square(x0, y0, size):
+    corners = [(x0, y0), (x0 + size, y0), (x0 + size, y0 + size), 
+               (x0, y0 + size), (x0, y0)]
+    return '<polyline fill="none" points="{}" />'.format(
+        ' '.join('{},{}'.format(x, y) for x, y in corners))
+
+def scattered_segments(n, seed=0):
+    rng = np.random.default_rng(seed)
+    starts = rng.uniform(0, 1000, (n, 2))
+    return [np.array([start, start + rng.uniform(-5, 5, 2)]) 
+            for start in starts]
+
+def test_travel_distance():
+    paths = [np.array([[3., 4.], [10., 4.]]), np.array([[10., 8.], [0., 8.]])]
+    assert travel_distance(paths) == 5 + 4
+    assert travel_distance(paths, origin=(3, 0)) == 4 + 4
+
+def test_order_reduces_travel():
+    paths = scattered_segments(500)
+    order, reverse = order_paths(paths)
+    assert sorted(order) == list(range(len(paths)))
+    
+    ordered = [paths[count][::-1] if flip else paths[count] 
+               for count, flip in zip(order, reverse)]
+    assert travel_distance(ordered) < travel_distance(paths)/5
+
+def test_closed_paths_keep_their_direction():
+    paths = [np.array([[x, 0.], [x + 1, 0.], [x + 1, 1.], [x, 0.]]) 
+             for x in (30., 0., 20., 10.)]
+    order, reverse = order_paths(paths, origin=(40, 0))
+    assert order == [0, 2, 3, 1]
+    assert not any(reverse)
+
+def test_groups_are_cut_inside_out_and_shallow_first():
+    groups = [('#000030', 4, square(0, 0, 900)),
+              ('#000030', 2, square(500, 500, 100)), 
+              ('#000010', 2, square(100, 100, 100)),
+              ('#000020', 6, square(300, 300, 100))]
+    data = DRAWING.format('\n'.join(
+        '<g fill="none" stroke="{}" stroke-width="{}">\n{}\n</g>'.format(
+            *group) for group in groups))
+    
+    svg = s2s.vector_object(io.BytesIO(data.encode()), order_paths=True)
+    svg.onshape2shaper(io.BytesIO())
+    records = svg.document.records
+    assert [(record.cut, record.depth) for record in records] == [
+        (cut_type.pocket, 2), (cut_type.interior, 1), 
+        (cut_type.interior, 3), (cut_type.exterior, 3)]
+    #Cut order comes first, even where it adds travel
+    assert svg.travel_report['paths'] == 4
@@ -0,0 +1,65 @@
+import io
+import json
+
+import onshape2shaper.svg2svg as s2s
+
+#10 pixels per mm, so a stroke width of 2 is interior, 4 exterior and 8 
+#on line
+DRAWING = '''<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<svg width="100mm" height="100mm" viewBox="0 0 1000 1000" xmlns="http://www.w3.org/2000/svg">
+<g fill="none" stroke="black" stroke-width="1">
+{}
+</g>
+</svg>
+'''
+
+GROUP = '''<g fill="none" stroke="#000030" stroke-width="{}">
+{}
+</g>'''
+
+def square(x0, y0, x1, y1, clockwise=True):
+    corners = [(x0, y0), (x1, y0), (x1, y1), (x0, y1), (x0, y0)]
+    if not clockwise:
+        corners.reverse()
+    return '<polyline fill="none" points="{}" />'.format(
+        ' '.join('{},{}'.format(x, y) for x, y in corners))
+
+def validate(*groups, **options):
+    data = DRAWING.format('\n'.join(GROUP.format(width, '\n'.join(polylines))
+                                    for width, polylines in groups))
+    svg = s2s.vector_object(io.BytesIO(data.encode()), **options)
+    svg.onshape2shaper(io.BytesIO(), validate=True)
+    return svg.validation_report
+
+def test_clean_drawing_is_valid():
+    report = validate((4, [square(100, 100, 900, 900)]),
+                      (2, [square(300, 300, 700, 700, clockwise=False)]))
+    assert report.is_valid
+    assert report.paths == 2
+    assert not report.winding
+    assert json.loads(report.to_json())['is_valid']
+
+def test_open_and_crossing_cuts_are_invalid():
+    open_cut = '<polyline fill="none" points="750,750 850,750 850,850" />'
+    report = validate((4, [square(100, 100, 500, 500), 
+                           square(300, 300, 700, 700)]),
+                      (2, [open_cut]))
+    assert not report.is_valid
+    assert [entry['group'] for entry in report.open_paths] == [1]
+    assert len(report.intersections) == 2
+    assert not report.line_crossings
+
+def test_on_line_crossings_are_warnings():
+    line = '<polyline fill="none" points="0,500 1000,500" />'
+    report = validate((4, [square(100, 100, 900, 900)]), (8, [line]))
+    assert report.is_valid
+    assert len(report.line_crossings) == 2
+    assert not report.intersections
+
+def test_winding_is_reported_and_normalized():
+    groups = ((4, [square(100, 100, 900, 900)]), 
+              (2, [square(300, 300, 700, 700)]))
+    report = validate(*groups)
+    assert [entry['group'] for entry in report.winding] == [1]
+    assert report.is_valid
+    assert validate(*groups, normalize_winding=True).winding[0]['reversed']